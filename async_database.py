@@ -0,0 +1,224 @@
+"""
+Een asyncio-laag rond de TextDatabase class.
+
+`AsyncTextDatabase` biedt de operaties van `TextDatabase` als coroutines. Laden,
+opslaan, zoeken en grote bewerkingen gebeuren in een executor (standaard de
+thread-pool van de event loop), zodat de event loop intussen door kan.
+
+De toestand in het geheugen blijft consistent door een lees-schrijfslot:
+lezen (`get_tekst`, `preview`, `zoek`) en opslaan mogen tegelijk lopen, want
+opslaan verandert de items niet. Een wijziging wacht tot er niet meer gelezen of
+opgeslagen wordt. Zo hoeft een leesopdracht nooit op een `save()` te wachten.
+Alleen in lazy-modus wacht lezen wel op opslaan: daar wordt tijdens het opslaan
+het gemapte bestand vervangen. In lazy-modus gaan ook `get_tekst`, `teksten` en
+`preview` naar de executor, want dan lezen (en decomprimeren) ze uit het bestand.
+
+Voorbeeld:
+    async with await AsyncTextDatabase.open("db.txt") as db:
+        await db.voeg_tekst_toe("Nieuwe tekst")
+        print(await db.get_tekst(1))
+        await db.save()
+"""
+
+import asyncio
+import contextlib
+import functools
+
+from database import PREVIEW_BREEDTE, TextDatabase
+
+
+class _LeesSchrijfSlot:
+    """
+    Een slot voor asyncio: meerdere lezers tegelijk, of één schrijver.
+
+    Vrijgeven gebeurt zonder te wachten, zodat een geannuleerde taak het slot
+    altijd teruggeeft.
+    """
+
+    def __init__(self):
+        self._lezers = 0
+        self._schrijver = False
+        self._wachters = []
+
+    async def _wacht(self, voorwaarde):
+        """Wacht tot `voorwaarde()` waar is; na elke vrijgave wordt opnieuw gekeken."""
+        while not voorwaarde():
+            wachter = asyncio.get_running_loop().create_future()
+            self._wachters.append(wachter)
+            try:
+                await wachter
+            finally:
+                self._wachters.remove(wachter)
+
+    def _wek(self):
+        """Laat alle wachtende taken hun voorwaarde opnieuw bekijken."""
+        for wachter in self._wachters:
+            if not wachter.done():
+                wachter.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def lezen(self):
+        """Wacht tot er geen schrijver bezig is. Wachtende schrijvers houden lezers niet tegen."""
+        await self._wacht(lambda: not self._schrijver)
+        self._lezers += 1
+        try:
+            yield
+        finally:
+            self._lezers -= 1
+            self._wek()
+
+    @contextlib.asynccontextmanager
+    async def schrijven(self):
+        """Wacht tot er geen lezers en geen andere schrijver meer bezig zijn."""
+        await self._wacht(lambda: not self._schrijver and not self._lezers)
+        self._schrijver = True
+        try:
+            yield
+        finally:
+            self._schrijver = False
+            self._wek()
+
+
+class AsyncTextDatabase:
+    """
+    Een `TextDatabase` met awaitable methodes, voor gebruik in een asyncio-programma.
+
+    Open een database met `await AsyncTextDatabase.open(bestandsnaam, ...)`. Kleine
+    wijzigingen worden direct op de event loop uitgevoerd (ze kosten O(log N));
+    `voeg_teksten_toe` en `apply_operations` gaan, net als laden, opslaan en
+    zoeken, naar de executor.
+    """
+
+    def __init__(self, db, executor=None):
+        """
+        Args:
+            db (TextDatabase): De (al geladen) database.
+            executor (concurrent.futures.Executor): De executor voor het zware werk;
+                                                    standaard die van de event loop.
+        """
+        self.db = db
+        self._executor = executor
+        self._slot = _LeesSchrijfSlot()
+        # Eén save tegelijk, en één zoekopdracht tegelijk: de zoekindexen worden
+        # bij de eerste zoekopdracht opgebouwd.
+        self._opslaan = asyncio.Lock()
+        self._zoeken = asyncio.Lock()
+
+    @classmethod
+    async def open(cls, bestandsnaam, executor=None, **opties):
+        """
+        Laadt een database in de executor en geeft een AsyncTextDatabase terug.
+
+        `opties` gaan naar `TextDatabase` (bijvoorbeeld `lazy=True` of `processen=8`).
+        """
+        loop = asyncio.get_running_loop()
+        db = await loop.run_in_executor(executor, functools.partial(TextDatabase, bestandsnaam, **opties))
+        return cls(db, executor)
+
+    async def _voer_uit(self, functie, *args):
+        """Voert `functie` uit in de executor en wacht op het resultaat."""
+        toekomst = asyncio.get_running_loop().run_in_executor(self._executor, functie, *args)
+        try:
+            return await asyncio.shield(toekomst)
+        except asyncio.CancelledError:
+            # Een thread is niet te onderbreken: houd het slot vast tot hij klaar is
+            while not toekomst.done():
+                with contextlib.suppress(asyncio.CancelledError):
+                    await asyncio.wait({toekomst})
+            raise
+
+    def _slot_voor_opslaan(self):
+        """Opslaan leest alleen de items, behalve in lazy-modus (zie de moduledocumentatie)."""
+        return self._slot.schrijven() if self.db.lazy else self._slot.lezen()
+
+    async def close(self):
+        """Sluit de database (geeft in lazy-modus het gemapte bestand vrij)."""
+        async with self._slot.schrijven():
+            await self._voer_uit(self.db.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __len__(self):
+        """Geeft het aantal items in de database terug."""
+        return len(self.db)
+
+    @property
+    def dirty(self):
+        """True als er wijzigingen zijn die nog niet zijn opgeslagen."""
+        return self.db.dirty
+
+    async def save(self):
+        """Slaat de database op in de executor; lezen kan intussen doorgaan."""
+        async with self._opslaan, self._slot_voor_opslaan():
+            return await self._voer_uit(self.db.save)
+
+    async def checkpoint(self):
+        """Verwerkt het journaal in het databasebestand, in de executor."""
+        async with self._opslaan, self._slot_voor_opslaan():
+            return await self._voer_uit(self.db.checkpoint)
+
+    async def _lees(self, functie, *args):
+        """Voert een leesopdracht uit: direct, of in lazy-modus (waar hij het bestand leest) in de executor."""
+        async with self._slot.lezen():
+            if self.db.lazy:
+                return await self._voer_uit(functie, *args)
+            return functie(*args)
+
+    async def get_tekst(self, index_nummer):
+        """Haalt een tekst op basis van indexnummer op."""
+        return await self._lees(self.db.get_tekst, index_nummer)
+
+    def _teksten(self, begin, eind):
+        return [self.db.get_tekst(i) for i in range(max(begin, 1), min(eind, len(self.db)) + 1)]
+
+    async def teksten(self, begin, eind):
+        """Geeft de teksten met indexnummer `begin` tot en met `eind` als lijst (buiten bereik valt weg)."""
+        return await self._lees(self._teksten, begin, eind)
+
+    async def preview(self, index_nummer, breedte=PREVIEW_BREEDTE):
+        """Geeft het begin van een tekst als één regel (zie `TextDatabase.preview`)."""
+        return await self._lees(self.db.preview, index_nummer, breedte)
+
+    async def zoek(self, zoekterm, prefix=True, substring=False, binnen=None):
+        """Zoekt in de executor (zie `TextDatabase.zoek`)."""
+        async with self._zoeken, self._slot.lezen():
+            return await self._voer_uit(self.db.zoek, zoekterm, prefix, substring, binnen)
+
+    async def _wijzig(self, functie, *args):
+        """Voert een kleine wijziging direct uit, zodra er niet meer gelezen of opgeslagen wordt."""
+        async with self._slot.schrijven():
+            return functie(*args)
+
+    async def voeg_tekst_toe(self, tekst):
+        """Voegt een tekst toe aan het einde van de database."""
+        return await self._wijzig(self.db.voeg_tekst_toe, tekst)
+
+    async def voeg_tekst_op_index_toe(self, index, tekst):
+        """Voegt een tekst in op een specifieke index."""
+        return await self._wijzig(self.db.voeg_tekst_op_index_toe, index, tekst)
+
+    async def wijzig_tekst(self, index_nummer, nieuwe_tekst):
+        """Wijzigt de tekst van een bestaand item."""
+        return await self._wijzig(self.db.wijzig_tekst, index_nummer, nieuwe_tekst)
+
+    async def verwijder_tekst(self, index_nummer):
+        """Verwijdert een item."""
+        return await self._wijzig(self.db.verwijder_tekst, index_nummer)
+
+    async def move_item(self, source_index, dest_index):
+        """Verplaatst een item naar een nieuwe positie."""
+        return await self._wijzig(self.db.move_item, source_index, dest_index)
+
+    async def voeg_teksten_toe(self, teksten):
+        """Voegt alle teksten uit `teksten` achteraan toe, in de executor."""
+        async with self._slot.schrijven():
+            return await self._voer_uit(self.db.voeg_teksten_toe, teksten)
+
+    async def apply_operations(self, operaties):
+        """Voert een lijst operaties in één keer uit, in de executor (zie `TextDatabase.apply_operations`)."""
+        async with self._slot.schrijven():
+            return await self._voer_uit(self.db.apply_operations, operaties)
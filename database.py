@@ -1,5 +1,788 @@
+import codecs
+import contextlib
+import hashlib
+import itertools
+import json
 import logging
+import mmap
+import os
 import re
+import secrets
+import shutil
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+from opslagformaten import FORMAAT_TEKST, FORMATEN, herken_formaat, open_container, schrijf_container
+from zoekindex import TrigramIndex, WoordIndex, woorden
+
+# Markering waarmee elk item in het databasebestand begint.
+INDEX_MARKER = b"###INDEX:"
+_INDEX_MARKER_TEKST = INDEX_MARKER.decode()
+
+# Grootte van de stukken waarin een databasebestand wordt ingelezen (1 MiB).
+LEES_BUFFER_GROOTTE = 1 << 20
+# Bij het opslaan worden steeds zoveel items samen geserialiseerd en in één keer geschreven.
+SCHRIJF_BATCH_GROOTTE = 4096
+# Grootte van de stukken waarin een bestand wordt gekopieerd (1 MiB).
+KOPIEER_BUFFER_GROOTTE = 1 << 20
+# Met `processen` > 1 worden bestanden vanaf deze grootte parallel ingelezen (64 MiB).
+PARALLEL_MIN_BYTES = 64 << 20
+# Het aantal bereiken per proces: wat meer bereiken dan processen verdeelt het werk gelijkmatiger.
+PARALLEL_BEREIKEN_PER_PROCES = 4
+
+# Gewenste aantal items per deel van een `_BlokLijst`; een deel wordt gesplitst bij twee keer zoveel.
+BLOK_GROOTTE = 1024
+# Het standaard aantal tekens van een `preview`.
+PREVIEW_BREEDTE = 100
+# Het aantal items dat `zoek_per_stuk` per stuk doorzoekt.
+ZOEK_STUK_GROOTTE = 4096
+
+# Het indexbestand naast de database, met de posities van alle blokken.
+INDEX_EXTENSIE = ".idx"
+INDEX_HASH_BYTES = 1 << 16
+_INDEX_MAGIC = b"TDBIDX03"
+_INDEX_KOP = struct.Struct("<8sQq16sQ??")
+
+# Het journaal naast de database, met de wijzigingen sinds het laatste checkpoint.
+JOURNAL_EXTENSIE = ".journal"
+# Boven deze grootte wordt het journaal bij het opslaan in het databasebestand verwerkt.
+JOURNAL_MAX_BYTES = 32 << 20
+
+# Herstelbestand met de nieuwe staart van het databasebestand (zie `TextDatabase._save_staart`).
+STAART_EXTENSIE = ".staart"
+_STAART_MAGIC = b"TDBSTRT1"
+_STAART_VOET = struct.Struct("<8sQQ16s16s")  # magic, positie, lengte, hash van de staart, hash voor positie
+
+# De kopregel na de marker: het indexnummer, gevolgd door een regeleinde.
+_KOPREGEL_PATROON = re.compile(rb"\s*(\d+)[ \t\f\v]*[\r\n]")
+# Hetzelfde voor een kopregel met Unicode-witruimte of -cijfers, zoals de oude parser op str ze accepteerde.
+_KOPREGEL_PATROON_UNICODE = re.compile(r"\s*(\d+)\s*?[\r\n]")
+_KOPREGEL_MAX_BYTES = 1024
+_WITRUIMTE = b" \t\n\r\x0b\x0c"
+# Waarom een tekst met de marker niet in het tekstformaat past (zie `TextDatabase._past_in_formaat`)
+_MARKER_FOUT = "Een tekst met '%s' past niet in het tekstformaat: hij zou bij het laden in stukken uiteenvallen."
+
+
+def _lees_blokken(f, buffer_grootte=None, decodeer=True, voortgang=None):
+    """
+    Leest een binair geopend databasebestand in stukken van vaste grootte.
+
+    De `###INDEX:`-markeringen worden herkend terwijl het bestand binnenkomt, zodat
+    nooit meer dan één stuk plus het huidige blok in het geheugen staat. Per blok
+    wordt een tuple (indexnummer, marker, start, einde, tekst) opgeleverd, waarbij
+    marker de bestandspositie van de `###INDEX:`-markering is en start en einde die
+    van de tekst. Blokken zonder geldige kopregel worden overgeslagen, net als voorheen.
+
+    Args:
+        f: Een bestandsobject geopend in binaire modus.
+        buffer_grootte (int): Het aantal bytes per leesactie (standaard
+                              LEES_BUFFER_GROOTTE).
+        decodeer (bool): Indien False wordt de tekst niet gedecodeerd (tekst is
+                         dan None) en worden alleen de posities bepaald.
+        voortgang (callable): Wordt na elk gelezen stuk aangeroepen met de
+                              bestandspositie tot waar gelezen is, nadat de
+                              blokken uit dat stuk zijn opgeleverd.
+    """
+    buffer_grootte = buffer_grootte or LEES_BUFFER_GROOTTE
+    buffer = bytearray()
+    buffer_positie = f.tell()  # Bestandspositie van buffer[0]
+    blok_start = None  # Positie in de buffer direct na de marker van het open blok
+    zoek_vanaf = 0
+    while True:
+        stuk = f.read(buffer_grootte)
+        buffer += stuk
+
+        while (marker_pos := buffer.find(INDEX_MARKER, zoek_vanaf)) != -1:
+            if blok_start is not None and (blok := _parse_blok(buffer, blok_start, marker_pos, decodeer)):
+                yield _verschuif(blok, buffer_positie)
+            blok_start = zoek_vanaf = marker_pos + len(INDEX_MARKER)
+
+        if not stuk:  # Einde van het bestand: het laatste blok loopt tot het einde
+            if blok_start is not None and (blok := _parse_blok(buffer, blok_start, len(buffer), decodeer)):
+                yield _verschuif(blok, buffer_positie)
+            if voortgang is not None:
+                voortgang(buffer_positie + len(buffer))
+            return
+        if voortgang is not None:
+            voortgang(buffer_positie + len(buffer))
+
+        # Een marker kan over de grens van twee stukken vallen: zoek straks vanaf
+        # de laatste len(INDEX_MARKER) - 1 bytes opnieuw.
+        zoek_vanaf = max(zoek_vanaf, len(buffer) - len(INDEX_MARKER) + 1)
+        # Gooi alles weg wat vóór het open blok ligt.
+        weg = zoek_vanaf if blok_start is None else blok_start
+        del buffer[:weg]
+        buffer_positie += weg
+        zoek_vanaf -= weg
+        if blok_start is not None:
+            blok_start = 0
+
+
+def _verschuif(blok, buffer_positie):
+    """Zet de bufferposities van een geparseerd blok om naar bestandsposities."""
+    index_nummer, marker, start, einde, tekst = blok
+    return index_nummer, buffer_positie + marker, buffer_positie + start, buffer_positie + einde, tekst
+
+
+def _parse_blok(buffer, start, einde, decodeer=True):
+    """
+    Parseert één blok (de bytes tussen twee markers) tot (indexnummer, marker, start, einde, tekst).
+
+    De tekst wordt rechtstreeks uit de buffer gedecodeerd, zonder tussenkopie.
+    Geeft None terug als het blok geen geldige kopregel heeft.
+    """
+    marker = start - len(INDEX_MARKER)
+    if match := _KOPREGEL_PATROON.match(buffer, start, einde):
+        index_nummer = int(match.group(1))
+        start = match.end()
+    else:
+        # Zeldzaam: decodeer het begin van het blok en probeer het patroon op str
+        kop = str(buffer[start : min(einde, start + _KOPREGEL_MAX_BYTES)], "utf-8", "replace")
+        if not (match := _KOPREGEL_PATROON_UNICODE.match(kop)):
+            return None
+        index_nummer = int(match.group(1))
+        start += len(kop[: match.end()].encode("utf-8"))
+    while start < einde and buffer[start] in _WITRUIMTE:
+        start += 1
+    while einde > start and buffer[einde - 1] in _WITRUIMTE:
+        einde -= 1
+    tekst = None
+    if decodeer:
+        with memoryview(buffer) as view, view[start:einde] as tekst_bytes:
+            tekst = _decodeer(tekst_bytes)
+    return index_nummer, marker, start, einde, tekst
+
+
+def _decodeer(tekst_bytes):
+    """Decodeert de (al van ASCII-witruimte ontdane) bytes van één tekst."""
+    return _normaliseer(str(tekst_bytes, "utf-8"))
+
+
+def _normaliseer(tekst):
+    """Geeft een tekst zoals het tekstformaat hem na opslaan teruggeeft: met "\n" en zonder witruimte eromheen."""
+    if "\r" in tekst:
+        # Zelfde regeleinde-vertaling als het lezen in tekstmodus.
+        tekst = tekst.replace("\r\n", "\n").replace("\r", "\n")
+    return tekst.strip()
+
+
+def _controleer_tekst(tekst):
+    """
+    Geeft een TypeError als `tekst` geen str is.
+
+    Een ander type mag niet in `_blokken` terechtkomen: een int is daar in
+    lazy-modus een blok-nummer in het gemapte bestand.
+    """
+    if not isinstance(tekst, str):
+        raise TypeError(f"Een tekst moet een str zijn, geen {type(tekst).__name__}.")
+
+
+class _BegrensdBestand:
+    """Een binair geopend bestand dat vanaf de huidige positie maar tot `einde` gelezen wordt."""
+
+    def __init__(self, f, einde):
+        self._f = f
+        self._einde = einde
+
+    def tell(self):
+        """Geeft de huidige positie in het bestand terug."""
+        return self._f.tell()
+
+    def read(self, grootte):
+        """Leest hooguit `grootte` bytes, maar niet voorbij `einde`."""
+        return self._f.read(max(0, min(grootte, self._einde - self._f.tell())))
+
+
+def _bereik_grenzen(bestandsnaam, aantal):
+    """
+    Verdeelt een databasebestand in hooguit `aantal` bereiken van ongeveer gelijke grootte.
+
+    Geeft de grenzen terug, van 0 tot en met de bestandsgrootte. Elke grens daartussen
+    is de positie van een `###INDEX:`-markering, zodat geen blok over twee bereiken valt.
+    """
+    grootte = os.path.getsize(bestandsnaam)
+    grenzen = [0]
+    with open(bestandsnaam, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        for i in range(1, aantal):
+            marker = m.find(INDEX_MARKER, max(grootte * i // aantal, grenzen[-1] + 1))
+            if marker == -1:
+                break
+            grenzen.append(marker)
+    grenzen.append(grootte)
+    return grenzen
+
+
+def _lees_bereik(bestandsnaam, begin, einde):
+    """
+    Parseert de blokken tussen twee grenzen van `_bereik_grenzen`, in een apart proces.
+
+    Geeft (indexnummers, markers, starts, eindes, teksten) terug: per kolom een array
+    of lijst, omdat dat veel sneller terug naar het hoofdproces gaat dan een tuple per blok.
+    """
+    nummers, markers, starts, eindes, teksten = array("q"), array("q"), array("q"), array("q"), []
+    with open(bestandsnaam, "rb") as f:
+        f.seek(begin)
+        for index_nummer, marker, start, blok_einde, tekst in _lees_blokken(_BegrensdBestand(f, einde)):
+            nummers.append(index_nummer)
+            markers.append(marker)
+            starts.append(start)
+            eindes.append(blok_einde)
+            teksten.append(tekst)
+    return nummers, markers, starts, eindes, teksten
+
+
+def _schrijf_blokken(f, teksten, eerste_index=1, positie=0):
+    """
+    Schrijft de teksten (als bytes) in het `###INDEX:`-formaat, genummerd vanaf `eerste_index`.
+
+    Geeft drie arrays terug met per item de positie van de marker en het begin en
+    einde van de tekst in het bestand, waarbij `positie` de bestandspositie is
+    waarop het schrijven begint.
+
+    De items worden per SCHRIJF_BATCH_GROOTTE samengevoegd en met één `write`
+    geschreven, in plaats van drie writes per item. Ook de posities worden per
+    batch in één keer berekend.
+    """
+    markers, starts, eindes = array("q"), array("q"), array("q")
+    kop_formaat = INDEX_MARKER + b" %d\n"
+    teksten = iter(teksten)
+    index = eerste_index
+    while batch := list(itertools.islice(teksten, SCHRIJF_BATCH_GROOTTE)):
+        # Per item drie stukken: de kopregel, de tekst en de lege regel erna.
+        stukken = [b"\n\n"] * (3 * len(batch))
+        stukken[0::3] = [kop_formaat % i for i in range(index, index + len(batch))]
+        stukken[1::3] = batch
+        index += len(batch)
+        # De grenzen van alle stukken: marker, start en einde van elk item, en het einde van de batch.
+        grenzen = array("q", itertools.accumulate(map(len, stukken), initial=positie))
+        markers += grenzen[0:-1:3]
+        starts += grenzen[1::3]
+        eindes += grenzen[2::3]
+        positie = grenzen[-1]
+        f.write(b"".join(stukken))
+    return markers, starts, eindes
+
+
+def _bestand_kenmerk(bestandsnaam):
+    """
+    Bepaalt (grootte, mtime_ns, hash) van een bestand, om een indexbestand te valideren.
+
+    De hash gaat over de grootte en de eerste en laatste INDEX_HASH_BYTES bytes: zo
+    blijft het valideren goedkoop, ook voor bestanden van vele gigabytes.
+    """
+    status = os.stat(bestandsnaam)
+    digest = hashlib.blake2b(str(status.st_size).encode(), digest_size=16)
+    with open(bestandsnaam, "rb") as f:
+        digest.update(f.read(INDEX_HASH_BYTES))
+        if status.st_size > INDEX_HASH_BYTES:
+            f.seek(max(INDEX_HASH_BYTES, status.st_size - INDEX_HASH_BYTES))
+            digest.update(f.read(INDEX_HASH_BYTES))
+    return status.st_size, status.st_mtime_ns, digest.digest()
+
+
+def _naar_bytes(getallen):
+    """Geeft de inhoud van een array('q') terug als little-endian bytes."""
+    if sys.byteorder == "big":
+        getallen = array("q", getallen)
+        getallen.byteswap()
+    return getallen.tobytes()
+
+
+def _uit_bytes(data):
+    """Zet little-endian bytes om naar een array('q')."""
+    getallen = array("q", data)
+    if sys.byteorder == "big":
+        getallen.byteswap()
+    return getallen
+
+
+def _verweef(markers, starts, eindes):
+    """Zet de drie positie-arrays om naar één array('q') met per item (marker, start, einde)."""
+    tabel = array("q", bytes(24 * len(markers)))
+    for kolom, getallen in enumerate((markers, starts, eindes)):
+        tabel[kolom::3] = getallen if isinstance(getallen, array) else array("q", getallen)
+    return tabel
+
+
+def _schrijf_index(
+    bestandsnaam, markers, starts, eindes, herindexeerd=False, op_volgorde=True, vanaf=1, kenmerk_voor=None
+):
+    """
+    Schrijft het indexbestand (`<bestandsnaam>.idx`) met de posities van alle blokken.
+
+    `herindexeerd` en `op_volgorde` leggen vast of de indexnummers in het bestand
+    een aaneengesloten reeks vanaf 1 vormen, en of ze in die volgorde in het bestand staan.
+
+    Na het opslaan van alleen de staart geeft `kenmerk_voor` het kenmerk van het
+    databasebestand vóór het opslaan. Hoort het bestaande indexbestand daarbij, dan
+    worden alleen de kop en de posities vanaf item `vanaf` herschreven (24 bytes per
+    item); anders wordt het hele indexbestand geschreven.
+
+    Het indexbestand is een optimalisatie: als het niet geschreven kan worden, wordt
+    alleen een waarschuwing gelogd.
+    """
+    index_naam = bestandsnaam + INDEX_EXTENSIE
+    try:
+        kop = _INDEX_KOP.pack(_INDEX_MAGIC, *_bestand_kenmerk(bestandsnaam), len(markers), herindexeerd, op_volgorde)
+        posities = (markers, starts, eindes)
+        if kenmerk_voor is not None and _werk_index_bij(index_naam, kop, posities, vanaf, kenmerk_voor):
+            return
+        fd, tijdelijk = _tijdelijk_bestand(index_naam)
+        with open(fd, "wb") as f:
+            f.write(kop)
+            f.write(_naar_bytes(_verweef(*posities)))
+        os.replace(tijdelijk, index_naam)
+    except OSError as e:
+        logging.warning("Kon indexbestand '%s' niet schrijven: %s", index_naam, e)
+
+
+def _werk_index_bij(index_naam, kop, posities, vanaf, kenmerk_voor):
+    """
+    Herschrijft in een bestaand indexbestand de posities vanaf item `vanaf` en daarna de kop.
+
+    Geeft False terug (zonder iets te schrijven) als het indexbestand ontbreekt of
+    niet bij het databasebestand met `kenmerk_voor` hoort. Wordt het bijwerken
+    onderbroken, dan past de oude kop niet meer bij het databasebestand en wordt
+    het indexbestand bij het openen afgekeurd.
+    """
+    try:
+        f = open(index_naam, "r+b")
+    except FileNotFoundError:
+        return False
+    with f:
+        oude_kop = f.read(_INDEX_KOP.size)
+        if len(oude_kop) != _INDEX_KOP.size:
+            return False
+        magic, grootte, mtime_ns, digest, aantal, herindexeerd, op_volgorde = _INDEX_KOP.unpack(oude_kop)
+        if magic != _INDEX_MAGIC or (grootte, mtime_ns, digest) != kenmerk_voor:
+            return False
+        if herindexeerd or not op_volgorde or aantal < vanaf - 1:
+            return False
+        if os.fstat(f.fileno()).st_size != _INDEX_KOP.size + 24 * aantal:
+            return False
+        f.seek(_INDEX_KOP.size + 24 * (vanaf - 1))
+        f.write(_naar_bytes(_verweef(*(getallen[vanaf - 1 :] for getallen in posities))))
+        f.truncate()
+        f.flush()
+        f.seek(0)
+        f.write(kop)
+    return True
+
+
+def _lees_index(bestandsnaam):
+    """
+    Leest het indexbestand van `bestandsnaam`.
+
+    Geeft (markers, starts, eindes, herindexeerd, op_volgorde) terug, of None als het indexbestand
+    ontbreekt, beschadigd is (ook als de lengte niet bij het aantal items past) of
+    niet meer bij het databasebestand past.
+    """
+    index_naam = bestandsnaam + INDEX_EXTENSIE
+    try:
+        with open(index_naam, "rb") as f:
+            kop = f.read(_INDEX_KOP.size)
+            if len(kop) != _INDEX_KOP.size:
+                return None
+            magic, grootte, mtime_ns, digest, aantal, herindexeerd, op_volgorde = _INDEX_KOP.unpack(kop)
+            if magic != _INDEX_MAGIC or (grootte, mtime_ns, digest) != _bestand_kenmerk(bestandsnaam):
+                return None
+            data = f.read(24 * aantal + 1)
+    except (OSError, ValueError):
+        return None
+    if len(data) != 24 * aantal:
+        return None
+    tabel = _uit_bytes(data)
+    markers, starts, eindes = tabel[0::3], tabel[1::3], tabel[2::3]
+    if aantal and not (0 <= markers[0] <= grootte and 0 <= eindes[-1] <= grootte):
+        return None
+    return markers, starts, eindes, herindexeerd, op_volgorde
+
+
+def _tijdelijk_bestand(bestandsnaam):
+    """
+    Maakt een tijdelijk bestand in dezelfde map als `bestandsnaam` en geeft (fd, pad) terug.
+
+    Anders dan bij `tempfile.mkstemp` krijgt het bestand de gewone rechten (volgens
+    de umask), of die van `bestandsnaam` als dat al bestaat: het vervangt straks het origineel.
+    """
+    map_naam, naam = os.path.split(os.path.abspath(bestandsnaam))
+    vlaggen = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        pad = os.path.join(map_naam, f".{naam}.{secrets.token_hex(4)}.tmp")
+        try:
+            fd = os.open(pad, vlaggen, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        shutil.copymode(bestandsnaam, pad)
+    except OSError:
+        pass  # Nieuw bestand, of de rechten kunnen niet worden overgenomen
+    return fd, pad
+
+
+def _synchroniseer_map(bestandsnaam):
+    """Zorgt dat een hernoeming in de map van `bestandsnaam` op schijf staat (niet nodig op Windows)."""
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(bestandsnaam)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _HashSchrijver:
+    """Bestandsobject dat een hash bijhoudt van alles wat erdoor geschreven wordt."""
+
+    def __init__(self, f):
+        self.f = f
+        self.hash = hashlib.blake2b(digest_size=16)
+
+    def write(self, data):
+        self.hash.update(data)
+        return self.f.write(data)
+
+
+def _hash_voor(f, positie):
+    """Hash van de laatste INDEX_HASH_BYTES bytes vóór `positie`, het deel dat blijft staan."""
+    begin = max(0, positie - INDEX_HASH_BYTES)
+    f.seek(begin)
+    return hashlib.blake2b(f.read(positie - begin), digest_size=16).digest()
+
+
+def _kopieer_staart(bestandsnaam, positie, lengte):
+    """Schrijft de staart uit het herstelbestand op `positie` in het databasebestand en ruimt het herstelbestand op."""
+    herstel_naam = bestandsnaam + STAART_EXTENSIE
+    with open(herstel_naam, "rb") as bron, open(bestandsnaam, "r+b") as doel:
+        doel.seek(positie)
+        while lengte:
+            data = bron.read(min(lengte, KOPIEER_BUFFER_GROOTTE))
+            if not data:
+                raise OSError(f"Herstelbestand '{herstel_naam}' is te kort")
+            doel.write(data)
+            lengte -= len(data)
+        doel.truncate()
+        doel.flush()
+        os.fsync(doel.fileno())
+    os.remove(herstel_naam)
+
+
+def _herstel_staart(bestandsnaam):
+    """
+    Maakt een onderbroken `_save_staart` af.
+
+    Een volledig herstelbestand dat bij het databasebestand past, wordt alsnog in
+    het databasebestand geschreven. Een onvolledig herstelbestand (een crash voordat
+    het databasebestand werd aangeraakt) wordt verwijderd.
+    """
+    herstel_naam = bestandsnaam + STAART_EXTENSIE
+    try:
+        with open(herstel_naam, "rb") as f:
+            lengte = f.seek(0, os.SEEK_END) - _STAART_VOET.size
+            if lengte < 0:
+                raise ValueError("bestand is te kort")
+            f.seek(lengte)
+            magic, positie, opgeslagen_lengte, digest, digest_voor = _STAART_VOET.unpack(f.read(_STAART_VOET.size))
+            if magic != _STAART_MAGIC or opgeslagen_lengte != lengte:
+                raise ValueError("bestand is onvolledig")
+            f.seek(0)
+            controle = hashlib.blake2b(digest_size=16)
+            for _ in range(0, lengte, KOPIEER_BUFFER_GROOTTE):
+                controle.update(f.read(min(KOPIEER_BUFFER_GROOTTE, lengte - f.tell())))
+            if controle.digest() != digest:
+                raise ValueError("de inhoud is beschadigd")
+        with open(bestandsnaam, "rb") as f:
+            if f.seek(0, os.SEEK_END) < positie or _hash_voor(f, positie) != digest_voor:
+                raise ValueError("het hoort niet bij het databasebestand")
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logging.warning("Herstelbestand '%s' genegeerd: %s", herstel_naam, e)
+        try:
+            os.remove(herstel_naam)
+        except OSError:
+            pass
+        return
+
+    try:
+        _kopieer_staart(bestandsnaam, positie, lengte)
+    except OSError as e:
+        logging.error("Kon onderbroken opslaan van '%s' niet afmaken: %s", bestandsnaam, e)
+        return
+    logging.info("Onderbroken opslaan van '%s' afgemaakt met '%s'.", bestandsnaam, herstel_naam)
+
+
+class _TekstBasis:
+    """
+    Alleen-lezen toegang tot de teksten in een databasebestand via een memory map.
+
+    Per blok worden alleen de positie van de marker en de begin- en eindpositie van
+    de tekst bewaard, in compacte arrays. Een tekst wordt pas gedecodeerd wanneer
+    erom gevraagd wordt. Voor de andere opslagformaten staan vergelijkbare classes
+    in `opslagformaten.py`.
+    """
+
+    formaat = FORMAAT_TEKST
+
+    def __init__(self, bestandsnaam, markers, starts, eindes, op_volgorde=True):
+        """
+        Args:
+            bestandsnaam (str): Het pad naar het databasebestand.
+            markers (array): De bestandsposities van de `###INDEX:`-markeringen.
+            starts (array): De bestandsposities waar de teksten beginnen.
+            eindes (array): De bestandsposities waar de teksten eindigen.
+            op_volgorde (bool): True als de blokken in het bestand precies genummerd
+                                zijn als 1..N, in die volgorde.
+        """
+        self.bestandsnaam = bestandsnaam
+        self.markers = markers
+        self.starts = starts
+        self.eindes = eindes
+        self.op_volgorde = op_volgorde
+        self._mmap = None
+        if len(starts):  # Een leeg bestand kan niet gemapt worden
+            with open(bestandsnaam, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def open(cls, bestandsnaam, voortgang=None):
+        """
+        Opent een databasebestand en geeft (basis, herindexeerd) terug.
+
+        De posities komen uit het indexbestand als dat nog bij het databasebestand
+        past. Anders wordt het bestand gescand (met `voortgang`, zie `scan`) en het
+        indexbestand opnieuw geschreven.
+        """
+        index = _lees_index(bestandsnaam)
+        if index is not None:
+            markers, starts, eindes, herindexeerd, op_volgorde = index
+            return cls(bestandsnaam, markers, starts, eindes, op_volgorde), herindexeerd
+
+        logging.info("Geen geldig indexbestand voor '%s'; het bestand wordt gescand.", bestandsnaam)
+        basis, herindexeerd = cls.scan(bestandsnaam, voortgang)
+        _schrijf_index(bestandsnaam, *basis.posities(), herindexeerd, basis.op_volgorde)
+        return basis, herindexeerd
+
+    @classmethod
+    def scan(cls, bestandsnaam, voortgang=None):
+        """
+        Scant een databasebestand één keer en geeft (basis, herindexeerd) terug.
+
+        De blokken worden in dezelfde volgorde gezet als bij het volledig laden:
+        gesorteerd op indexnummer, waarbij bij dubbele nummers het laatste blok wint.
+        `herindexeerd` is True als de nummers geen aaneengesloten reeks vanaf 1 waren.
+        `voortgang` wordt tijdens het scannen aangeroepen met het aantal gelezen bytes.
+        """
+        with open(bestandsnaam, "rb") as f:
+            blokken = [blok[:4] for blok in _lees_blokken(f, decodeer=False, voortgang=voortgang)]
+
+        herindexeerd = False
+        op_volgorde = all(blok[0] == positie for positie, blok in enumerate(blokken, 1))
+        if not op_volgorde:
+            per_index = {blok[0]: blok for blok in blokken}
+            keys = sorted(per_index)
+            herindexeerd = keys != list(range(1, len(keys) + 1))
+            blokken = [per_index[index_nummer] for index_nummer in keys]
+
+        posities = (array("q", (blok[i] for blok in blokken)) for i in (1, 2, 3))
+        return cls(bestandsnaam, *posities, op_volgorde), herindexeerd
+
+    def heropen(self):
+        """Geeft een nieuwe basis voor hetzelfde (ongewijzigde) bestand terug (na `close()`)."""
+        return type(self)(self.bestandsnaam, *self.posities(), self.op_volgorde)
+
+    def __len__(self):
+        """Geeft het aantal blokken in het bestand terug."""
+        return len(self.starts)
+
+    def posities(self):
+        """Geeft (markers, starts, eindes) terug."""
+        return self.markers, self.starts, self.eindes
+
+    def ruw(self, blok):
+        """Geeft de onbewerkte bytes van een tekst terug als memoryview op de map (zonder kopie)."""
+        return memoryview(self._mmap)[self.starts[blok] : self.eindes[blok]]
+
+    def ruw_bytes(self, blok):
+        """Geeft een kopie van de (ongedecodeerde) bytes van een blok terug."""
+        return self._mmap[self.starts[blok] : self.eindes[blok]]
+
+    def tekst(self, blok):
+        """Decodeert de tekst van één blok."""
+        with self.ruw(blok) as tekst_bytes:
+            return _decodeer(tekst_bytes)
+
+    def begin(self, blok, tekens):
+        """Decodeert alleen het begin van een blok: hooguit `tekens` tekens, uit hooguit 4 bytes per teken."""
+        start = self.starts[blok]
+        stuk = self._mmap[start : min(self.eindes[blok], start + 4 * tekens)]
+        # Niet `final`: een teken dat door de grens wordt afgebroken, valt weg
+        tekst = codecs.getincrementaldecoder("utf-8")().decode(stuk)
+        if "\r" in tekst:
+            tekst = tekst.replace("\r\n", "\n").replace("\r", "\n")
+        return tekst[:tekens]
+
+    def close(self):
+        """Sluit de memory map."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class _BlokLijst:
+    """
+    Lijst met invoegen, verwijderen en opzoeken op positie zonder alles te verschuiven.
+
+    De elementen staan in delen van hooguit 2 * BLOK_GROOTTE elementen. De lengtes
+    van de delen staan in een binaire indexboom (Fenwick-boom), zodat het deel bij
+    een positie in O(log N) gevonden wordt. Invoegen of verwijderen verschuift alleen
+    de elementen binnen één deel en werkt de boom in O(log N) bij; alleen als een
+    deel wordt gesplitst of leeg raakt, wordt de boom opnieuw opgebouwd.
+    """
+
+    def __init__(self, elementen=()):
+        self._delen = []
+        self._lengte = 0
+        self._boom = None
+        self.extend(elementen)
+
+    def extend(self, elementen):
+        """Voegt de elementen achteraan toe, in delen van BLOK_GROOTTE (geamortiseerd O(1) per element)."""
+        elementen = list(elementen)
+        if not elementen:
+            return
+        self._lengte += len(elementen)
+        if self._delen and len(self._delen[-1]) < BLOK_GROOTTE:
+            ruimte = BLOK_GROOTTE - len(self._delen[-1])
+            self._delen[-1] += elementen[:ruimte]
+            del elementen[:ruimte]
+        self._delen += [elementen[i : i + BLOK_GROOTTE] for i in range(0, len(elementen), BLOK_GROOTTE)]
+        self._boom = None
+
+    def _bouw_boom(self):
+        """Bouwt de Fenwick-boom over de lengtes van de delen in O(aantal delen)."""
+        boom = [len(deel) for deel in self._delen]
+        for i in range(1, len(boom) + 1):
+            ouder = i + (i & -i)
+            if ouder <= len(boom):
+                boom[ouder - 1] += boom[i - 1]
+        self._boom = boom
+
+    def _pas_aan(self, deel, verschil):
+        """Verandert de lengte van `deel` in de boom met `verschil`."""
+        boom = self._boom
+        i = deel + 1
+        while i <= len(boom):
+            boom[i - 1] += verschil
+            i += i & -i
+
+    def _zoek(self, positie):
+        """Geeft (deel, positie binnen het deel) terug voor een positie (0-gebaseerd)."""
+        if not 0 <= positie < self._lengte:
+            raise IndexError(positie)
+        if self._boom is None:
+            self._bouw_boom()
+        boom = self._boom
+        deel = 0
+        stap = 1 << len(boom).bit_length()
+        while stap:
+            volgende = deel + stap
+            if volgende <= len(boom) and boom[volgende - 1] <= positie:
+                deel = volgende
+                positie -= boom[volgende - 1]
+            stap >>= 1
+        return deel, positie
+
+    def __len__(self):
+        return self._lengte
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._delen)
+
+    def geheugen(self):
+        """Schat het geheugengebruik van de lijst en de elementen in bytes."""
+        return sys.getsizeof(self._delen) + sum(map(sys.getsizeof, self._delen)) + sum(map(sys.getsizeof, self))
+
+    def vanaf(self, positie):
+        """Doorloopt de elementen vanaf `positie` (0-gebaseerd)."""
+        if positie >= self._lengte:
+            return iter(())
+        deel, binnen = self._zoek(positie)
+        return itertools.chain(
+            itertools.islice(self._delen[deel], binnen, None),
+            itertools.chain.from_iterable(itertools.islice(self._delen, deel + 1, None)),
+        )
+
+    def __getitem__(self, positie):
+        deel, binnen = self._zoek(positie)
+        return self._delen[deel][binnen]
+
+    def __setitem__(self, positie, element):
+        deel, binnen = self._zoek(positie)
+        self._delen[deel][binnen] = element
+
+    def insert(self, positie, element):
+        """Voegt `element` in vóór `positie`; `positie == len(self)` voegt achteraan toe."""
+        if positie == self._lengte:
+            if not self._delen:
+                self._delen.append([])
+                self._boom = None
+            deel, binnen = len(self._delen) - 1, len(self._delen[-1])
+        else:
+            deel, binnen = self._zoek(positie)
+        elementen = self._delen[deel]
+        elementen.insert(binnen, element)
+        self._lengte += 1
+        if len(elementen) > 2 * BLOK_GROOTTE:
+            self._delen[deel : deel + 1] = [elementen[:BLOK_GROOTTE], elementen[BLOK_GROOTTE:]]
+            self._boom = None
+        elif self._boom is not None:
+            self._pas_aan(deel, 1)
+
+    def pop(self, positie):
+        """Verwijdert het element op `positie` en geeft het terug."""
+        deel, binnen = self._zoek(positie)
+        element = self._delen[deel].pop(binnen)
+        self._lengte -= 1
+        if not self._delen[deel]:
+            del self._delen[deel]
+            self._boom = None
+        else:
+            self._pas_aan(deel, -1)
+        return element
+
+
+class _DataWeergave(Mapping):
+    """
+    Alleen-lezen weergave {index: tekst} van de database.
+
+    Zo blijft `db.data` bruikbaar voor code die de items doorloopt, terwijl de
+    items intern in een `_BlokLijst` staan (en in lazy-modus pas worden
+    gedecodeerd als ze worden opgevraagd). Wijzigen gaat via de methodes van
+    `TextDatabase`.
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getitem__(self, index_nummer):
+        tekst = self._db.get_tekst(index_nummer)
+        if tekst is None:
+            raise KeyError(index_nummer)
+        return tekst
+
+    def __contains__(self, index_nummer):
+        return isinstance(index_nummer, int) and 1 <= index_nummer <= len(self)
+
+    def __iter__(self):
+        return iter(range(1, len(self) + 1))
+
+    def __len__(self):
+        return len(self._db._blokken)
 
 
 class TextDatabase:
@@ -8,9 +791,34 @@ class TextDatabase:
 
     Deze class bundelt de data en de operaties (lezen, schrijven, toevoegen)
     in één object.
+
+    De items staan op volgorde in een `_BlokLijst`, zodat invoegen, verwijderen en
+    verplaatsen niet de hele database hoeven te hernummeren. `data` is een
+    alleen-lezen weergave {index: tekst} daarvan.
+
+    In lazy-modus wordt het bestand niet ingelezen maar gemapt: alleen de posities
+    van de blokken worden bepaald en een tekst wordt pas gedecodeerd als erom wordt
+    gevraagd. Wijzigingen worden in het geheugen bijgehouden bovenop het gemapte
+    bestand.
+
+    In journaal-modus schrijft `save()` niet het hele bestand opnieuw, maar voegt het
+    alleen de wijzigingen toe aan een journaal (`<bestandsnaam>.journal`). Bij het
+    laden wordt het journaal opnieuw op het databasebestand toegepast; `checkpoint()`
+    verwerkt het journaal in het databasebestand.
     """
 
-    def __init__(self, bestandsnaam, create_new=False):
+    def __init__(
+        self,
+        bestandsnaam,
+        create_new=False,
+        lazy=False,
+        journal=False,
+        trigramindex=False,
+        casefold_cache=False,
+        voortgang=None,
+        formaat=None,
+        processen=1,
+    ):
         """
         Constructor: wordt aangeroepen als een nieuw TextDatabase object wordt gemaakt.
 
@@ -19,118 +827,1026 @@ class TextDatabase:
             create_new (bool): Indien True, start met een lege database, zelfs als
                                het bestand al bestaat. Het bestand wordt bij de
                                eerste schrijf-actie overschreven.
+            lazy (bool): Indien True, worden de teksten pas bij gebruik uit het
+                         (gemapte) bestand gelezen. Sluit de database dan met `close()`.
+            journal (bool): Indien True, slaat `save()` alleen de wijzigingen op in
+                            het journaal in plaats van het hele bestand te herschrijven.
+            trigramindex (bool): Indien True, gebruikt `zoek(..., substring=True)` een
+                                 trigram-index in plaats van alle teksten te doorzoeken.
+                                 Die index kost veel geheugen (zie `zoekindex_geheugen()`).
+            casefold_cache (bool): Indien True, houdt de database naast elke tekst een
+                                   casefolded kopie bij, zodat het doorzoeken van de
+                                   teksten niet bij elke zoekopdracht alle teksten
+                                   hoeft te casefolden. Kost ongeveer het geheugen van
+                                   alle teksten nog een keer.
+            voortgang (callable): Wordt tijdens het laden na elk gelezen stuk van het
+                                  bestand aangeroepen als voortgang(gelezen, totaal,
+                                  teksten): het aantal gelezen bytes, de grootte van
+                                  het bestand en de teksten die sinds de vorige aanroep
+                                  zijn ingelezen (in bestandsvolgorde). In lazy-modus
+                                  worden de teksten niet gelezen (teksten is dan leeg)
+                                  en volgt alleen voortgang als het bestand gescand
+                                  moet worden. Een exceptie in de functie breekt het
+                                  laden af en komt uit de constructor.
+            formaat (str): Het formaat waarin `save()` het bestand schrijft: "tekst"
+                           (met `###INDEX:`-markeringen), "zlib" of "lzma" (los
+                           gecomprimeerde blokken) of "binair" (een tabel met de
+                           positie van elke tekst), zie `opslagformaten.py`.
+                           Standaard het formaat van het bestaande bestand. Bij het
+                           laden wordt het formaat van het bestand altijd zelf herkend.
+            processen (int): Indien groter dan 1, wordt een groot bestand in het
+                             tekstformaat (vanaf PARALLEL_MIN_BYTES) door zoveel
+                             processen tegelijk geparseerd. Het resultaat is
+                             hetzelfde als bij serieel lezen. Geldt niet voor de
+                             lazy-modus.
+
+        Raises:
+            ValueError: Als het formaat onbekend is, of het bestand een beschadigd
+                        gecomprimeerd of binair bestand is.
         """
         self.dirty = False
         self.bestandsnaam = bestandsnaam
+        self.lazy = lazy
+        self.journal = journal
+        self.trigramindex = trigramindex
+        self.casefold_cache = casefold_cache
+        self.processen = processen
+        self.formaat = formaat or (FORMAAT_TEKST if create_new else herken_formaat(bestandsnaam))
+        if self.formaat not in FORMATEN:
+            raise ValueError(f"Onbekend formaat: {self.formaat!r}")
+        # Wordt bij elke wijziging van de items opgehoogd; zo kan een gebruiker van de
+        # database (zoals de GUI) zien of een bewaard resultaat nog geldig is.
+        self.versie = 0
+        # Per positie de tekst, of in lazy-modus een blok-nummer in het gemapte bestand.
+        self._blokken = _BlokLijst()
+        self._basis = None
+        # In journaal-modus: de wijzigingen die nog niet in het journaal staan.
+        self._journal_wachtrij = [] if journal else None
+        # Het databasebestand waarop het journaal voortbouwt (None: eerst een checkpoint nodig).
+        self._journal_basis = None
+        # De laagste positie die sinds het laatste schrijven van het bestand is gewijzigd.
+        # Alles daarvoor staat nog ongewijzigd in het bestand (None: niets gewijzigd).
+        self._laagste_wijziging = None
+        # (markers, starts, eindes) van de blokken in het bestand, als die op volgorde staan.
+        self._bestand_posities = None
+        # (bestandsnaam, grootte, mtime_ns) van het bestand na het laatste lezen of schrijven.
+        self._bestand_status = None
+        # Binnen `batch()`: de operaties die de wijzigingen van de batch ongedaan maken.
+        self._ongedaan = None
+        # Zoekindexen (pas opgebouwd bij de eerste zoekopdracht). De indexen werken met
+        # vaste id's per item; `_ids` geeft per positie het id van het item.
+        self._indexen = []
+        self._woordindex = None
+        self._trigramindex = None
+        # Met `casefold_cache`: per positie de casefolded tekst (pas opgebouwd bij de eerste zoekopdracht).
+        self._casefold = None
+        # Per positie None of (breedte, preview); pas aangemaakt bij de eerste `preview()`.
+        self._previews = None
+        self._ids = None
+        self._volgend_id = 0
+        self._id_posities = None
+        # Functies die na elke wijziging van de items worden aangeroepen (zie `voeg_luisteraar_toe`).
+        self._luisteraars = []
+        if not create_new:
+            _herstel_staart(self.bestandsnaam)
+        self.data = _DataWeergave(self)
         if create_new:
-            self.data = {}
             logging.info("Nieuwe, lege database '%s' wordt aangemaakt.", self.bestandsnaam)
+        elif lazy:
+            self._open_basis(voortgang)
+            self._herhaal_journaal()
+            logging.info("Database '%s' gemapt. %d items gevonden.", self.bestandsnaam, len(self.data))
         else:
-            self.data = self._lees_bestand()
-            self._reindex_if_needed()
+            self._blokken = _BlokLijst(self._reindex_if_needed(self._lees_bestand(voortgang)))
+            self._herhaal_journaal()
             logging.info(
                 "Database '%s' geladen en geverifieerd. %d items gevonden.", self.bestandsnaam, len(self.data)
             )
 
-    def _lees_bestand(self):
+    def _lees_bestand(self, voortgang=None):
         """
         Interne methode om het bestand te lezen en de data te parsen.
         (De underscore geeft aan dat deze methode bedoeld is voor intern gebruik).
+
+        Het bestand wordt in stukken van vaste grootte gelezen (zie `_lees_blokken`),
+        zodat het piekgeheugen niet langer een veelvoud van de bestandsgrootte is.
+        Na elk stuk wordt `voortgang` aangeroepen (zie de constructor). Een groot
+        bestand wordt met `processen` > 1 parallel gelezen (zie `_lees_parallel`).
         """
+        if (formaat := herken_formaat(self.bestandsnaam)) != FORMAAT_TEKST:
+            return self._lees_container(formaat, voortgang)
+        if (
+            self.processen > 1
+            and os.path.isfile(self.bestandsnaam)
+            and os.path.getsize(self.bestandsnaam) >= PARALLEL_MIN_BYTES
+        ):
+            return self._lees_parallel(voortgang)
+        geindexeerde_data = {}
+        markers, starts, eindes = array("q"), array("q"), array("q")
+        nieuw = []  # De teksten sinds de vorige voortgangsmelding
         try:
-            with open(self.bestandsnaam, encoding="utf-8") as f:
-                content = f.read()
+            with open(self.bestandsnaam, "rb") as f:
+                meld = None
+                if voortgang is not None:
+                    totaal = os.fstat(f.fileno()).st_size
+
+                    def meld(gelezen):
+                        voortgang(gelezen, totaal, nieuw.copy())
+                        nieuw.clear()
+
+                for index_nummer, marker, start, einde, tekst in _lees_blokken(f, voortgang=meld):
+                    # Bij dubbele indexnummers wint, net als voorheen, het laatste blok.
+                    geindexeerde_data[index_nummer] = tekst
+                    if meld is not None:
+                        nieuw.append(tekst)
+                    markers.append(marker)
+                    starts.append(start)
+                    eindes.append(einde)
+                self._onthoud_status(f.fileno())
         except FileNotFoundError:
             return {}  # Bestand bestaat nog niet, begin met een lege database
         except OSError as e:
             logging.error("Fout bij lezen van '%s': %s", self.bestandsnaam, e)
             return {}
 
+        self._onthoud_posities(geindexeerde_data, markers, starts, eindes)
+        return geindexeerde_data
+
+    def _lees_parallel(self, voortgang=None):
+        """
+        Leest een bestand in het tekstformaat met `processen` processen tegelijk.
+
+        Het bestand wordt verdeeld in bereiken die elk op een `###INDEX:`-markering
+        beginnen (zie `_bereik_grenzen`). Omdat de seriële parser het bestand ook bij
+        elke markering opdeelt, levert elk bereik precies dezelfde blokken op. De
+        resultaten worden op volgorde samengevoegd, zodat dubbele indexnummers en het
+        herindexeren (`_reindex_if_needed`) precies werken als bij serieel lezen.
+        Na elk samengevoegd bereik wordt `voortgang` aangeroepen.
+        """
         geindexeerde_data = {}
-        blokken = content.split("###INDEX:")[1:]
-        for blok in blokken:
-            match = re.match(r"\s*(\d+)\s*\n(.*)", blok, re.DOTALL)
-            if match:
-                index_nummer = int(match.group(1))
-                tekst = match.group(2).strip()
-                geindexeerde_data[index_nummer] = tekst
+        markers, starts, eindes = array("q"), array("q"), array("q")
+        try:
+            grenzen = _bereik_grenzen(self.bestandsnaam, self.processen * PARALLEL_BEREIKEN_PER_PROCES)
+            pool = ProcessPoolExecutor(self.processen)
+            try:
+                resultaten = pool.map(_lees_bereik, itertools.repeat(self.bestandsnaam), grenzen[:-1], grenzen[1:])
+                for (nummers, *posities, teksten), einde in zip(resultaten, grenzen[1:]):
+                    # Bij dubbele indexnummers wint, net als voorheen, het laatste blok.
+                    geindexeerde_data.update(zip(nummers, teksten))
+                    for totaal_posities, bereik_posities in zip((markers, starts, eindes), posities):
+                        totaal_posities += bereik_posities
+                    if voortgang is not None:
+                        voortgang(einde, grenzen[-1], teksten)
+            finally:
+                # Bij een fout of afbreken (`voortgang`) niet wachten op de overige bereiken
+                pool.shutdown(wait=False, cancel_futures=True)
+            self._onthoud_status(self.bestandsnaam)
+        except OSError as e:
+            logging.error("Fout bij lezen van '%s': %s", self.bestandsnaam, e)
+            return {}
+
+        self._onthoud_posities(geindexeerde_data, markers, starts, eindes)
         return geindexeerde_data
 
-    def _reindex_if_needed(self):
+    def _onthoud_posities(self, geindexeerde_data, markers, starts, eindes):
+        """Onthoudt de posities van de blokken na het lezen, als ze op volgorde in het bestand staan."""
+        # Alleen als de blokken precies als 1..N in het bestand staan, kan later een
+        # staart van het bestand herschreven worden.
+        if len(markers) == len(geindexeerde_data) and all(
+            index_nummer == positie for positie, index_nummer in enumerate(geindexeerde_data, 1)
+        ):
+            self._bestand_posities = (markers, starts, eindes)
+
+    def _lees_container(self, formaat, voortgang=None):
+        """Leest alle teksten uit een bestand in een ander formaat dan tekst, blok voor blok."""
+        try:
+            basis = open_container(self.bestandsnaam, formaat)
+        except OSError as e:
+            logging.error("Fout bij lezen van '%s': %s", self.bestandsnaam, e)
+            return {}
+        with contextlib.closing(basis):
+            nieuw = []
+            meld = None
+            if voortgang is not None:
+                totaal = os.path.getsize(self.bestandsnaam)
+
+                def meld(gelezen):
+                    voortgang(gelezen, totaal, nieuw.copy())
+                    nieuw.clear()
+
+            teksten = []
+            for tekst in basis.teksten(meld):
+                teksten.append(tekst)
+                if meld is not None:
+                    nieuw.append(tekst)
+            if meld is not None:  # Tot en met de blokkenmap achter de blokken
+                meld(totaal)
+        self._onthoud_status(self.bestandsnaam)
+        return dict(enumerate(teksten, 1))
+
+    def _onthoud_status(self, bestand):
+        """Onthoudt grootte en wijzigingstijd van het bestand, om wijzigingen van buitenaf te herkennen."""
+        status = os.stat(bestand)
+        self._bestand_status = (self.bestandsnaam, status.st_size, status.st_mtime_ns)
+
+    def _open_basis(self, voortgang=None):
+        """Scant het bestand voor de lazy-modus en mapt het in het geheugen."""
+        meld = None
+        if voortgang is not None and os.path.exists(self.bestandsnaam):
+            totaal = os.path.getsize(self.bestandsnaam)
+
+            def meld(gelezen):
+                voortgang(gelezen, totaal, [])
+
+        try:
+            if (formaat := herken_formaat(self.bestandsnaam)) == FORMAAT_TEKST:
+                self._basis, herindexeerd = _TekstBasis.open(self.bestandsnaam, meld)
+            else:
+                self._basis, herindexeerd = open_container(self.bestandsnaam, formaat), False
+        except FileNotFoundError:
+            return  # Bestand bestaat nog niet, begin met een lege database
+        except OSError as e:
+            logging.error("Fout bij lezen van '%s': %s", self.bestandsnaam, e)
+            return
+        self._blokken = _BlokLijst(range(len(self._basis)))
+        self._onthoud_status(self.bestandsnaam)
+        if herindexeerd:
+            self.dirty = True
+            self._laagste_wijziging = 1
+            logging.info("Database geherindexeerd omdat de indices niet aaneensluitend waren.")
+
+    def close(self):
+        """Geeft het gemapte bestand vrij (alleen nodig in lazy-modus)."""
+        if self._basis is not None:
+            self._basis.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _journaal_kop(self):
         """
-        Herindexeert de database als de sleutels geen aaneengesloten reeks vanaf 1 vormen.
+        Geeft de kopregel van het journaal terug: de grootte en hash van het databasebestand.
 
-        Dit zorgt voor een consistente interne staat na het laden van een bestand,
-        wat efficiëntere manipulaties mogelijk maakt.
+        Zo wordt een journaal dat al in het databasebestand verwerkt is (bijvoorbeeld
+        na een crash tijdens een checkpoint) niet nog een keer toegepast.
         """
-        if not self.data:
+        grootte, _, digest = _bestand_kenmerk(self.bestandsnaam)
+        return {"basis": [grootte, digest.hex()]}
+
+    def _herhaal_journaal(self):
+        """Past na het laden de wijzigingen uit het journaal toe, als er een journaal is."""
+        journaal_naam = self.bestandsnaam + JOURNAL_EXTENSIE
+        try:
+            with open(journaal_naam, "rb") as f:
+                regels = f.readlines()
+            kop = json.loads(regels[0]) if regels else None
+            if kop != self._journaal_kop():
+                logging.warning("Journaal '%s' hoort niet bij het databasebestand en wordt genegeerd.", journaal_naam)
+                return
+        except FileNotFoundError:
+            if not self.dirty and os.path.exists(self.bestandsnaam):
+                self._journal_basis = self.bestandsnaam
+            return
+        except (OSError, ValueError) as e:
+            logging.error("Fout bij lezen van journaal '%s': %s", journaal_naam, e)
             return
 
-        keys = sorted(self.data.keys())
+        dirty, wachtrij = self.dirty, self._journal_wachtrij
+        self._journal_wachtrij = None  # Herhaalde wijzigingen niet opnieuw vastleggen
+        geldige_lengte = len(regels[0])
+        for nummer, regel in enumerate(regels[1:], 1):
+            try:
+                record = json.loads(regel)
+            except ValueError:
+                # Een half geschreven laatste record (bijvoorbeeld na een crash)
+                logging.warning("Onvolledig record aan het einde van journaal '%s' genegeerd.", journaal_naam)
+                break
+            if self.formaat == FORMAAT_TEKST and record[0] in ("voeg_in", "wijzig") and isinstance(record[-1], str):
+                # Zoals een checkpoint de tekst zou opslaan en teruglezen
+                record[-1] = _normaliseer(record[-1])
+            try:
+                toegepast = self._voer_uit(record)
+            except (TypeError, ValueError):
+                toegepast = False
+            if toegepast is False:
+                # De records erna gaan uit van deze wijziging
+                logging.error(
+                    "Record %d van journaal '%s' is ongeldig; de rest wordt genegeerd.", nummer, journaal_naam
+                )
+                break
+            geldige_lengte += len(regel)
+        self.dirty, self._journal_wachtrij = dirty, wachtrij
+
+        if geldige_lengte < sum(map(len, regels)):
+            with open(journaal_naam, "r+b") as f:
+                f.truncate(geldige_lengte)
+        if not self.dirty:
+            self._journal_basis = self.bestandsnaam
+        logging.info("%d wijzigingen uit journaal '%s' toegepast.", len(regels) - 1, journaal_naam)
+
+    def _voer_uit(self, record):
+        """Voert één journaal-record uit, bijvoorbeeld ["verwijder", 3]."""
+        operatie, *args = record
+        methode = {
+            "voeg_in": self.voeg_tekst_op_index_toe,
+            "wijzig": self.wijzig_tekst,
+            "verwijder": self.verwijder_tekst,
+            "verplaats": self.move_item,
+        }[operatie]
+        return methode(*args)
+
+    def _registreer(self, *record):
+        """
+        Legt een geslaagde wijziging vast.
+
+        Het record gaat naar het journaal (alleen in journaal-modus) en de laagste
+        gewijzigde positie wordt bijgewerkt, zodat `save()` alleen de staart van het
+        bestand hoeft te herschrijven. Binnen `batch()` wordt ook vastgelegd hoe de
+        wijziging ongedaan gemaakt kan worden.
+        """
+        if self._journal_wachtrij is not None:
+            self._journal_wachtrij.append(record)
+        operatie, positie, *args = record
+        if self._ongedaan is not None:
+            match operatie:
+                case "voeg_in":
+                    self._ongedaan.append(("verwijder", positie))
+                case "wijzig":
+                    self._ongedaan.append(("wijzig", positie, self._blokken[positie - 1]))
+                case "verwijder":
+                    self._ongedaan.append(("voeg_in", positie, self._blokken[positie - 1]))
+                case "verplaats":
+                    self._ongedaan.append(("verplaats", args[0], positie))
+        if operatie == "verplaats":
+            positie = min(positie, args[0])
+        if self._laagste_wijziging is None or positie < self._laagste_wijziging:
+            self._laagste_wijziging = positie
+
+    def _reindex_if_needed(self, geindexeerde_data):
+        """
+        Herindexeert de database als de sleutels geen aaneengesloten reeks vanaf 1 vormen.
+
+        Dit zorgt voor een consistente interne staat na het laden van een bestand,
+        wat efficiëntere manipulaties mogelijk maakt. Geeft de teksten in volgorde
+        van hun (nieuwe) index terug.
+        """
+        keys = sorted(geindexeerde_data.keys())
+        sorted_values = [geindexeerde_data[k] for k in keys]
         # Controleer of de sleutels al een perfecte reeks zijn (1, 2, 3, ..., N)
         if keys == list(range(1, len(keys) + 1)):
-            return  # Al aaneengesloten, geen actie nodig.
+            return sorted_values  # Al aaneengesloten, geen actie nodig.
 
-        # De sleutels zijn niet aaneengesloten, dus we moeten herindexeren.
-        sorted_values = [self.data[k] for k in keys]
-        self.data = {i: text for i, text in enumerate(sorted_values, 1)}
+        # De sleutels zijn niet aaneengesloten: de teksten worden vanaf 1 hernummerd.
         self.dirty = True
+        self._laagste_wijziging = 1
         logging.info("Database geherindexeerd omdat de indices niet aaneensluitend waren.")
+        return sorted_values
+
+    def _controleer_geen_batch(self):
+        """
+        Weigert opslaan binnen `batch()` met een RuntimeError.
+
+        Opslaan zou wijzigingen vastleggen die nog teruggedraaid kunnen worden; in
+        lazy-modus zou het terugdraaien bovendien naar het oude gemapte bestand wijzen.
+        """
+        if self._ongedaan is not None:
+            raise RuntimeError("Opslaan is niet mogelijk binnen een batch.")
 
     def save(self):
-        """Interne methode om de volledige dataset naar het bestand te schrijven."""
-        try:
-            with open(self.bestandsnaam, "w", encoding="utf-8") as f:
-                # Sorteer op index voor een voorspelbare volgorde in het bestand
-                for index, tekst in sorted(self.data.items()):
-                    f.write(f"###INDEX: {index}\n")
-                    f.write(tekst)
-                    f.write("\n\n")
+        """
+        Interne methode om de volledige dataset naar het bestand te schrijven.
+
+        Daarna wordt ook het indexbestand met de posities van alle blokken bijgewerkt.
+        In journaal-modus worden alleen de wijzigingen aan het journaal toegevoegd.
+        """
+        self._controleer_geen_batch()
+        if self.journal and self._journal_basis == self.bestandsnaam:
+            return self._save_journaal()
+        return self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Schrijft de volledige database naar het bestand en verwijdert het journaal.
+
+        Als alleen items aan het einde zijn gewijzigd, wordt alleen de staart van het
+        bestand herschreven, vanaf het eerste gewijzigde item. Zonder journaal-modus
+        is dit gelijk aan `save()`.
+        """
+        self._controleer_geen_batch()
+        staart_positie = self._staart_positie()
+        if self._laagste_wijziging is None and staart_positie is not None:
+            opgeslagen = True  # Het bestand is al actueel
+        elif staart_positie is not None:
+            opgeslagen = self._save_staart(staart_positie)
+        else:
+            opgeslagen = self._save_volledig()
+        if not opgeslagen:
+            return False
+
+        journaal_naam = self.bestandsnaam + JOURNAL_EXTENSIE
+        try:
+            if os.path.exists(journaal_naam):
+                os.remove(journaal_naam)
+        except OSError as e:
+            # Geen probleem voor de data: het journaal past niet meer bij het bestand.
+            logging.warning("Kon journaal '%s' niet verwijderen: %s", journaal_naam, e)
+        if self._journal_wachtrij is not None:
+            self._journal_wachtrij.clear()
+        self._journal_basis = self.bestandsnaam
+        self.dirty = False
+        return True
+
+    def _save_journaal(self):
+        """Voegt de wijzigingen sinds de vorige keer opslaan toe aan het journaal."""
+        if not self._journal_wachtrij:
             self.dirty = False
             return True
+
+        journaal_naam = self.bestandsnaam + JOURNAL_EXTENSIE
+        try:
+            with open(journaal_naam, "ab") as f:
+                if f.tell() == 0:
+                    f.write(self._journal_regel(self._journaal_kop()))
+                f.writelines(self._journal_regel(record) for record in self._journal_wachtrij)
+                f.flush()
+                os.fsync(f.fileno())
+                grootte = f.tell()
+        except OSError as e:
+            logging.error("Fout bij schrijven naar journaal '%s': %s", journaal_naam, e)
+            return False
+
+        self._journal_wachtrij.clear()
+        self.dirty = False
+        if grootte > JOURNAL_MAX_BYTES:
+            logging.info("Journaal '%s' is groter dan %d bytes; checkpoint.", journaal_naam, JOURNAL_MAX_BYTES)
+            return self.checkpoint()
+        return True
+
+    @staticmethod
+    def _journal_regel(record):
+        """Codeert één journaal-record als een regel JSON."""
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    def _staart_positie(self):
+        """
+        Bepaalt vanaf welke bestandspositie het bestand herschreven moet worden.
+
+        Geeft None terug als het hele bestand geschreven moet worden: als het bestand
+        (nog) niet bestaat, buiten de database om is gewijzigd, niet (meer) in het
+        tekstformaat is, of als de blokken er niet op volgorde in staan.
+        """
+        vanaf = self._laagste_wijziging or len(self) + 1
+        if vanaf == 1 or self.formaat != FORMAAT_TEKST:
+            return None
+        if self.lazy:
+            basis = self._basis
+            posities = basis.posities() if isinstance(basis, _TekstBasis) and basis.op_volgorde else None
+        else:
+            posities = self._bestand_posities
+        if posities is None:
+            return None
+        try:
+            status = os.stat(self.bestandsnaam)
+        except OSError:
+            return None
+        if (self.bestandsnaam, status.st_size, status.st_mtime_ns) != self._bestand_status:
+            return None
+
+        markers = posities[0]
+        positie = markers[vanaf - 1] if vanaf <= len(markers) else status.st_size
+        if status.st_size - positie > positie:
+            # De staart wordt twee keer geschreven (zie `_save_staart`); bij een grote
+            # staart is het hele bestand opnieuw schrijven goedkoper.
+            return None
+        return positie
+
+    def _save_staart(self, positie):
+        """
+        Herschrijft het bestand vanaf `positie`, het begin van het eerste gewijzigde item.
+
+        Het bestand kan niet in zijn geheel vervangen worden, dus gaat de nieuwe staart
+        eerst naar een herstelbestand (`<bestandsnaam>.staart`, met een hash ter controle)
+        en pas daarna naar het databasebestand. Wordt dat onderbroken, dan maakt de
+        volgende `TextDatabase` het af (zie `_herstel_staart`).
+        """
+        vanaf = self._laagste_wijziging
+        herstel_naam = self.bestandsnaam + STAART_EXTENSIE
+        try:
+            with open(self.bestandsnaam, "rb") as f:
+                digest_voor = _hash_voor(f, positie)
+            kenmerk_voor = _bestand_kenmerk(self.bestandsnaam)
+            with open(herstel_naam, "wb") as f:
+                schrijver = _HashSchrijver(f)
+                staart = _schrijf_blokken(schrijver, self._tekst_bytes(vanaf), vanaf, positie)
+                lengte = f.tell()
+                f.write(_STAART_VOET.pack(_STAART_MAGIC, positie, lengte, schrijver.hash.digest(), digest_voor))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logging.error("Fout bij schrijven naar '%s': %s", herstel_naam, e)
+            if os.path.exists(herstel_naam):
+                os.remove(herstel_naam)
+            return False
+
+        # Vanaf hier staat de nieuwe staart veilig in het herstelbestand.
+        oud = self._basis.posities() if self.lazy else self._bestand_posities
+        self.close()
+        try:
+            _kopieer_staart(self.bestandsnaam, positie, lengte)
         except OSError as e:
             logging.error("Fout bij schrijven naar '%s': %s", self.bestandsnaam, e)
+            self._bestand_status = None  # De volgende keer het hele bestand schrijven
+            if self.lazy:
+                self._basis = self._basis.heropen()
             return False
+        self._na_opslaan([begin[: vanaf - 1] + rest for begin, rest in zip(oud, staart)], vanaf, kenmerk_voor)
+        return True
+
+    def _save_volledig(self):
+        """
+        Schrijft alle items naar een tijdelijk bestand dat daarna het origineel vervangt.
+
+        Het tijdelijke bestand wordt eerst naar schijf geschreven (fsync), zodat na een
+        crash altijd het oude of het nieuwe bestand overblijft, nooit een half geschreven
+        bestand. In lazy-modus worden ongewijzigde blokken rechtstreeks uit de map
+        gekopieerd. De nieuwe posities worden tijdens het schrijven bijgehouden, zodat
+        opnieuw scannen niet nodig is. Het bestand wordt geschreven in `formaat`.
+        """
+        tijdelijk = None
+        try:
+            fd, tijdelijk = _tijdelijk_bestand(self.bestandsnaam)
+            with open(fd, "wb") as f:
+                if self.formaat == FORMAAT_TEKST:
+                    posities = _schrijf_blokken(f, self._tekst_bytes())
+                else:
+                    posities = None  # De posities staan in het bestand zelf
+                    schrijf_container(f, self._tekst_bytes(), self.formaat)
+                f.flush()
+                os.fsync(f.fileno())
+            self._vervang_bestand(tijdelijk)
+        except OSError as e:
+            logging.error("Fout bij schrijven naar '%s': %s", self.bestandsnaam, e)
+            return False
+        finally:
+            if tijdelijk is not None and os.path.exists(tijdelijk):  # Niet vervangen: opruimen
+                os.remove(tijdelijk)
+
+        herstel_naam = self.bestandsnaam + STAART_EXTENSIE
+        if os.path.exists(herstel_naam):  # Van een eerder, onderbroken opslaan
+            os.remove(herstel_naam)
+        self._na_opslaan(posities)
+        return True
+
+    def _na_opslaan(self, posities, vanaf=1, kenmerk_voor=None):
+        """
+        Werkt na het schrijven de posities, het indexbestand en de status bij.
+
+        `posities` is None als het bestand niet in het tekstformaat is geschreven;
+        zo'n bestand heeft geen indexbestand nodig. Na het opslaan van alleen de staart
+        wordt ook het indexbestand alleen vanaf item `vanaf` herschreven (zie `_schrijf_index`).
+        """
+        if posities is None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.bestandsnaam + INDEX_EXTENSIE)
+            basis = open_container(self.bestandsnaam, self.formaat) if self.lazy else None
+        else:
+            _schrijf_index(self.bestandsnaam, *posities, vanaf=vanaf, kenmerk_voor=kenmerk_voor)
+            basis = _TekstBasis(self.bestandsnaam, *posities) if self.lazy else None
+        if self.lazy:
+            self._basis = basis
+            self._blokken = _BlokLijst(range(len(self._basis)))
+            self._casefold = None  # De teksten in het bestand kunnen genormaliseerd zijn
+            self._previews = None
+        else:
+            self._bestand_posities = posities
+        self._onthoud_status(self.bestandsnaam)
+        self._laagste_wijziging = None
+        self.dirty = False
+
+    def _tekst_bytes(self, vanaf=1):
+        """Levert per positie vanaf `vanaf` de tekst als bytes; ongewijzigde blokken (lazy) zonder te decoderen."""
+        if not self.lazy:
+            return map(str.encode, self._blokken.vanaf(vanaf - 1))
+        if self._basis is not None and self._basis.formaat == FORMAAT_TEKST != self.formaat:
+            # De ruwe bytes uit het tekstformaat zijn nog niet genormaliseerd (regeleinden, witruimte)
+            return (self._als_tekst(blok).encode("utf-8") for blok in self._blokken.vanaf(vanaf - 1))
+        return (
+            blok.encode("utf-8") if isinstance(blok, str) else self._basis.ruw_bytes(blok)
+            for blok in self._blokken.vanaf(vanaf - 1)
+        )
+
+    def _vervang_bestand(self, tijdelijk):
+        """Vervangt het databasebestand door `tijdelijk`; het gemapte bestand wordt eerst gesloten (Windows)."""
+        self.close()
+        try:
+            os.replace(tijdelijk, self.bestandsnaam)
+        except OSError:
+            if self._basis is not None:  # Het oude bestand is onveranderd: map het opnieuw
+                self._basis = self._basis.heropen()
+            raise
+        try:
+            _synchroniseer_map(self.bestandsnaam)
+        except OSError as e:
+            logging.warning("Kon map van '%s' niet naar schijf schrijven: %s", self.bestandsnaam, e)
 
     def __len__(self):
         """Geeft het aantal items in de database terug."""
-        return len(self.data)
+        return len(self._blokken)
 
     def get_tekst(self, index_nummer):
         """Haalt een tekst op basis van indexnummer uit het geheugen."""
-        return self.data.get(index_nummer)
+        if index_nummer not in self.data:
+            return None
+        return self._als_tekst(self._blokken[index_nummer - 1])
+
+    @contextlib.contextmanager
+    def get_bytes(self, index_nummer):
+        """
+        Context manager die de UTF-8-bytes van een tekst als memoryview geeft, of None.
+
+        In lazy-modus met het binaire of een gecomprimeerd formaat wijst de memoryview
+        direct in de map (of in het gedecomprimeerde blok): er wordt niets gekopieerd
+        of gedecodeerd. In de andere gevallen wordt de tekst eerst gecodeerd. De
+        memoryview is alleen binnen het `with`-blok geldig; daarna wordt hij
+        vrijgegeven, zodat `close()` en `save()` de map kunnen sluiten.
+
+        Voorbeeld:
+            with db.get_bytes(5) as tekst_bytes:
+                f.write(tekst_bytes)
+        """
+        if index_nummer not in self.data:
+            yield None
+            return
+        blok = self._blokken[index_nummer - 1]
+        if isinstance(blok, str):
+            view = memoryview(blok.encode("utf-8"))
+        elif self._basis.formaat == FORMAAT_TEKST:
+            # In het tekstformaat staan de regeleinden en de witruimte rond de tekst anders in het bestand
+            view = memoryview(self._basis.tekst(blok).encode("utf-8"))
+        else:
+            view = self._basis.ruw(blok)
+        with view:
+            yield view
+
+    def preview(self, index_nummer, breedte=PREVIEW_BREEDTE):
+        """
+        Geeft het begin van een tekst als één regel van hooguit `breedte` tekens, of None.
+
+        Alleen het begin van de tekst wordt gelezen; in lazy-modus worden alleen de
+        eerste bytes van het blok gedecodeerd. De preview wordt per item bewaard tot
+        het item zelf wordt gewijzigd, zodat een lijst met items snel opnieuw getoond
+        kan worden.
+        """
+        if index_nummer not in self.data:
+            return None
+        if self._previews is None:
+            self._previews = _BlokLijst(itertools.repeat(None, len(self)))
+        bewaard = self._previews[index_nummer - 1]
+        if bewaard is not None and bewaard[0] == breedte:
+            return bewaard[1]
+        blok = self._blokken[index_nummer - 1]
+        begin = blok[:breedte] if isinstance(blok, str) else self._basis.begin(blok, breedte)
+        preview = begin.replace("\n", " ").strip()
+        self._previews[index_nummer - 1] = (breedte, preview)
+        return preview
 
     def voeg_tekst_toe(self, tekst):
         """Voegt een nieuwe tekst toe aan het einde van de database en herindexeert."""
-        # De index is 1-gebaseerd, dus len(self.data) + 1 is de nieuwe laatste positie.
-        return self.voeg_tekst_op_index_toe(len(self.data) + 1, tekst)
+        # De index is 1-gebaseerd, dus len(self) + 1 is de nieuwe laatste positie.
+        return self.voeg_tekst_op_index_toe(len(self) + 1, tekst)
 
-    def voeg_tekst_op_index_toe(self, index, tekst):
-        """Voegt een tekst toe op een specifieke index en herindexeert."""
-        if not (1 <= index <= len(self.data) + 1):
-            logging.warning("Doelindex %d is buiten bereik (1-%d).", index, len(self.data) + 1)
-            return False
+    def _pas_toe(self, operatie, positie, *args):
+        """
+        Voert een (gecontroleerde) wijziging uit op de opslag, bijvoorbeeld ("verwijder", 3).
+
+        Alle wijzigingen lopen via deze methode, zodat de zoekindexen bijgewerkt
+        blijven. Bij "voeg_in" en "wijzig" mag de tekst in lazy-modus ook een
+        blok-nummer in het gemapte bestand zijn (bij het terugdraaien van een batch).
+        """
+        if self._ids is not None:
+            self._werk_indexen_bij(operatie, positie, *args)
+        self.versie += 1
+        if self._casefold is not None:
+            gevouwen = (self._als_tekst(args[0]).casefold(),) if operatie in ("voeg_in", "wijzig") else args
+            self._pas_lijst_aan(self._casefold, operatie, positie, *gevouwen)
+        if self._previews is not None:
+            # Alleen de preview van het gewijzigde item vervalt; die van de rest verschuift mee
+            leeg = (None,) if operatie in ("voeg_in", "wijzig") else args
+            self._pas_lijst_aan(self._previews, operatie, positie, *leeg)
+        self._pas_lijst_aan(self._blokken, operatie, positie, *args)
+        if self._luisteraars:
+            self._meld(operatie, positie, args[0] if operatie == "verplaats" else 1)
+
+    def voeg_luisteraar_toe(self, luisteraar):
+        """
+        Registreert een functie die na elke wijziging van de items wordt aangeroepen.
+
+        De functie krijgt (operatie, positie, waarde), met de database al bijgewerkt:
+        bij "voeg_in", "wijzig" en "verwijder" is `waarde` het aantal items vanaf
+        `positie`, bij "verplaats" de nieuwe positie van het item op `positie`.
+        Zo kan bijvoorbeeld een weergave alleen de betrokken regels bijwerken. Ook
+        het terugdraaien van een mislukte batch wordt op deze manier gemeld.
+        """
+        self._luisteraars.append(luisteraar)
 
-        # Omdat de sleutels gegarandeerd aaneengesloten zijn (1..N), kunnen we de
-        # lijst efficiënter opbouwen zonder te sorteren. Dit is een O(N) operatie.
-        items = [self.data[i] for i in range(1, len(self.data) + 1)]
+    def verwijder_luisteraar(self, luisteraar):
+        """Verwijdert een functie die met `voeg_luisteraar_toe` is geregistreerd."""
+        with contextlib.suppress(ValueError):
+            self._luisteraars.remove(luisteraar)
 
-        # Voeg het item in op de nieuwe positie
+    def _meld(self, operatie, positie, waarde):
+        """Roept de luisteraars aan na een wijziging."""
+        for luisteraar in list(self._luisteraars):
+            luisteraar(operatie, positie, waarde)
+
+    @staticmethod
+    def _pas_lijst_aan(lijst, operatie, positie, *args):
+        """Voert een wijziging uit op een lijst per positie (`_blokken`, `_casefold` of `_previews`)."""
         # De lijst is 0-geïndexeerd, de database 1-geïndexeerd
-        items.insert(index - 1, tekst)
+        match operatie:
+            case "voeg_in":
+                lijst.insert(positie - 1, args[0])
+            case "wijzig":
+                lijst[positie - 1] = args[0]
+            case "verwijder":
+                lijst.pop(positie - 1)
+            case "verplaats":
+                lijst.insert(args[0] - 1, lijst.pop(positie - 1))
+
+    def _als_tekst(self, blok):
+        """Geeft de tekst van een element uit `_blokken`: een tekst of een blok-nummer (lazy)."""
+        return blok if isinstance(blok, str) else self._basis.tekst(blok)
+
+    def _werk_indexen_bij(self, operatie, positie, *args):
+        """Werkt de id's en de zoekindexen bij voor een wijziging, vóórdat die wordt uitgevoerd."""
+        match operatie:
+            case "voeg_in":
+                item_id = self._volgend_id
+                self._volgend_id += 1
+                self._ids.insert(positie - 1, item_id)
+                for index in self._indexen:
+                    index.voeg_toe(item_id, self._als_tekst(args[0]))
+                if positie == len(self._ids) and self._id_posities is not None:
+                    self._id_posities[item_id] = positie  # Achteraan: de rest verschuift niet
+                else:
+                    self._id_posities = None
+            case "wijzig":
+                item_id = self._ids[positie - 1]
+                oude_tekst, nieuwe_tekst = self.get_tekst(positie), self._als_tekst(args[0])
+                for index in self._indexen:
+                    index.verwijder(item_id, oude_tekst)
+                    index.voeg_toe(item_id, nieuwe_tekst)
+            case "verwijder":
+                oude_tekst = self.get_tekst(positie)
+                item_id = self._ids.pop(positie - 1)
+                for index in self._indexen:
+                    index.verwijder(item_id, oude_tekst)
+                self._id_posities = None
+            case "verplaats":
+                self._ids.insert(args[0] - 1, self._ids.pop(positie - 1))
+                self._id_posities = None
+
+    def zoekindex_bouwer(self, zoekterm, substring=False, binnen=None):
+        """
+        Geeft een functie die de zoekindexen opbouwt die `zoek_per_stuk` voor deze zoekopdracht mist, of None.
+
+        `zoek_per_stuk` bouwt een ontbrekende index zelf op, maar bij een grote database
+        kost dat seconden. De teruggegeven functie `bouw(voortgang=None)` mag in een
+        andere thread draaien: hij werkt op een momentopname van de items en roept
+        `voortgang(gedaan, totaal)` af en toe aan (een exceptie daaruit breekt het
+        opbouwen af). `bouw` geeft een functie `installeer()` terug, die de indexen in
+        de database zet; roep die weer aan in de thread die de database gebruikt. Is
+        de database intussen gewijzigd of opgeslagen, dan doet `installeer()` niets en
+        geeft hij False terug. In lazy-modus mag de database tijdens `bouw` niet worden
+        opgeslagen of gesloten.
+        """
+        woordindex = WoordIndex() if not substring and self._woordindex is None else None
+        trigramindex = casefold = None
+        if substring or not woorden(zoekterm):  # Anders beantwoordt de woordindex de vraag
+            if binnen is None and self.trigramindex and self._trigramindex is None:
+                trigramindex = TrigramIndex()
+            casefold = self.casefold_cache and self._casefold is None
+        nieuw = [index for index in (woordindex, trigramindex) if index is not None]
+        if not nieuw and not casefold:
+            return None
+        versie, basis, blokken = self.versie, self._basis, list(self._blokken)
+        ids = list(self._ids) if self._ids is not None else range(len(blokken))
+
+        def bouw(voortgang=None):
+            totaal = len(blokken) * (len(nieuw) + bool(casefold))
+
+            def teksten(stap):
+                for i, blok in enumerate(blokken, 1):
+                    if voortgang is not None and i % ZOEK_STUK_GROOTTE == 0:
+                        voortgang(stap * len(blokken) + i, totaal)
+                    yield blok if isinstance(blok, str) else basis.tekst(blok)
+
+            for stap, index in enumerate(nieuw):
+                for item_id, tekst in zip(ids, teksten(stap)):
+                    index.voeg_toe(item_id, tekst)
+            gevouwen = _BlokLijst(tekst.casefold() for tekst in teksten(len(nieuw))) if casefold else None
+
+            def installeer():
+                if self.versie != versie or self._basis is not basis:
+                    return False
+                if self._ids is None:
+                    self._ids = _BlokLijst(ids)
+                    self._volgend_id = len(ids)
+                if woordindex is not None and self._woordindex is None:
+                    self._woordindex = woordindex
+                    self._indexen.append(woordindex)
+                if trigramindex is not None and self._trigramindex is None:
+                    self._trigramindex = trigramindex
+                    self._indexen.append(trigramindex)
+                if gevouwen is not None and self._casefold is None:
+                    self._casefold = gevouwen
+                return True
+
+            return installeer
+
+        return bouw
+
+    def _posities(self, ids):
+        """Vertaalt item-id's naar gesorteerde indexnummers."""
+        if self._id_posities is None:
+            self._id_posities = {item_id: positie for positie, item_id in enumerate(self._ids, 1)}
+        return sorted(map(self._id_posities.__getitem__, ids))
+
+    def zoek(self, zoekterm, prefix=True, substring=False, binnen=None):
+        """
+        Zoekt de items die alle woorden uit `zoekterm` bevatten en geeft hun indexnummers gesorteerd terug.
+
+        Er wordt gezocht met een woordindex, die bij de eerste zoekopdracht wordt
+        opgebouwd en daarna bij elke wijziging wordt bijgewerkt; een zoekopdracht kost
+        dan tijd evenredig met het aantal resultaten. Met `prefix=True` is het genoeg
+        als een woord in de tekst met het gezochte woord begint ("data" vindt ook
+        "database").
+
+        Met `substring=True`, of als de zoekterm geen woorden bevat (alleen leestekens),
+        wordt elke tekst doorzocht op de letterlijke zoekterm, zonder op hoofdletters te letten.
+        Als `trigramindex` aan staat, worden alleen de teksten doorzocht die volgens de
+        trigram-index alle stukjes van drie tekens uit de zoekterm bevatten.
+
+        `binnen` beperkt het doorzoeken van de teksten tot deze indexnummers, bijvoorbeeld
+        het resultaat van een eerdere zoekopdracht waarvan `zoekterm` een verlenging is
+        (met dezelfde `substring`). Een zoekopdracht via de woordindex negeert `binnen`.
+        """
+        return list(itertools.chain.from_iterable(self.zoek_per_stuk(zoekterm, prefix, substring, binnen)))
+
+    def zoek_per_stuk(self, zoekterm, prefix=True, substring=False, binnen=None, stukgrootte=ZOEK_STUK_GROOTTE):
+        """
+        Zoekt zoals `zoek`, maar levert de gevonden indexnummers per stuk van `stukgrootte` doorzochte items.
+
+        De indexen worden direct bij de aanroep geraadpleegd en de te doorzoeken items
+        worden vastgelegd in een momentopname. De teruggegeven generator doorzoekt
+        alleen die momentopname: hij kan in een andere thread worden doorlopen terwijl
+        de database gewijzigd wordt, en na elk stuk worden afgebroken. De stukken zijn
+        oplopend gesorteerd. In lazy-modus mag de database intussen niet worden
+        opgeslagen of gesloten.
+        """
+        if (bouw := self.zoekindex_bouwer(zoekterm, substring, binnen)) is not None:
+            bouw()()
+        if not substring:
+            ids = self._woordindex.zoek(zoekterm, prefix)
+            if ids is not None:
+                return iter((self._posities(ids),))
+        zoekterm = zoekterm.casefold()
+        kandidaten = None
+        if binnen is not None:
+            kandidaten = sorted(binnen)
+        elif self.trigramindex:
+            ids = self._trigramindex.zoek(zoekterm)
+            # Bij veel kandidaten is alles op volgorde doorzoeken goedkoper dan elke kandidaat opzoeken.
+            if ids is not None and len(ids) <= len(self) // 2:
+                kandidaten = self._posities(ids)
+        gevouwen = self._casefold is not None
+        lijst = self._casefold if gevouwen else self._blokken
+        if kandidaten is None:
+            posities, blokken = range(1, len(self) + 1), list(lijst)
+        else:
+            posities, blokken = kandidaten, [lijst[positie - 1] for positie in kandidaten]
+        return self._doorzoek(zoekterm, posities, blokken, self._basis, gevouwen, stukgrootte)
+
+    @staticmethod
+    def _doorzoek(zoekterm, posities, blokken, basis, gevouwen, stukgrootte):
+        """
+        Doorzoekt een momentopname van `_blokken` per stuk op de (casefolded) zoekterm.
+
+        Met `gevouwen` zijn de blokken de teksten uit de casefold-cache: dan hoeft er
+        per tekst niets meer gedecodeerd of gekopieerd te worden.
+        """
+        for begin in range(0, len(blokken), stukgrootte):
+            stuk = zip(posities[begin : begin + stukgrootte], blokken[begin : begin + stukgrootte])
+            if gevouwen:
+                yield [positie for positie, tekst in stuk if zoekterm in tekst]
+            else:
+                yield [
+                    positie
+                    for positie, blok in stuk
+                    if zoekterm in (blok if isinstance(blok, str) else basis.tekst(blok)).casefold()
+                ]
+
+    def zoekindex_geheugen(self):
+        """
+        Geeft een schatting van het geheugengebruik van de zoekindexen in bytes, per index.
+
+        Alleen de indexen die al zijn opgebouwd staan erin, plus de id-administratie
+        die ze delen ("ids").
+        """
+        rapport = {}
+        if self._woordindex is not None:
+            rapport["woorden"] = self._woordindex.geheugen()
+        if self._trigramindex is not None:
+            rapport["trigrammen"] = self._trigramindex.geheugen()
+        if self._ids is not None:
+            rapport["ids"] = self._ids.geheugen() + sys.getsizeof(self._id_posities or {})
+        if self._casefold is not None:
+            rapport["casefold"] = self._casefold.geheugen()
+        return rapport
+
+    def voeg_teksten_toe(self, teksten):
+        """
+        Voegt alle teksten uit `teksten` achteraan toe en geeft het aantal terug.
 
-        # Bouw de dictionary opnieuw op met een compacte, nieuwe index.
-        # Dit is ook een O(N) operatie.
-        self.data = {i: text for i, text in enumerate(items, 1)}
+        `teksten` mag een generator zijn: de teksten worden per BLOK_GROOTTE
+        verwerkt, in geamortiseerd O(1) per tekst. Zo kan een database met
+        miljoenen items in één keer worden gevuld.
+
+        Raises:
+            TypeError: Als een tekst geen str is. De stukken vóór die tekst zijn dan
+                       al toegevoegd; het stuk waar hij in zit niet.
+            ValueError: Als een tekst niet in het formaat past (zie `voeg_tekst_op_index_toe`),
+                        met dezelfde gevolgen.
+        """
+        teksten = iter(teksten)
+        aantal = 0
+        while stuk := list(itertools.islice(teksten, BLOK_GROOTTE)):
+            for tekst in stuk:
+                _controleer_tekst(tekst)
+                if not self._past_in_formaat(tekst):
+                    raise ValueError(_MARKER_FOUT % _INDEX_MARKER_TEKST)
+            eerste = len(self) + 1
+            for positie, tekst in enumerate(stuk, eerste):
+                self._registreer("voeg_in", positie, tekst)
+                if self._ids is not None:
+                    self._werk_indexen_bij("voeg_in", positie, tekst)
+            self._blokken.extend(stuk)
+            if self._casefold is not None:
+                self._casefold.extend(tekst.casefold() for tekst in stuk)
+            if self._previews is not None:
+                self._previews.extend(itertools.repeat(None, len(stuk)))
+            self.versie += 1
+            aantal += len(stuk)
+            self.dirty = True
+            if self._luisteraars:
+                self._meld("voeg_in", eerste, len(stuk))
+        return aantal
+
+    def voeg_tekst_op_index_toe(self, index, tekst):
+        """
+        Voegt een tekst toe op een specifieke index; de volgende items schuiven één op.
+
+        Dankzij de `_BlokLijst` is dit O(√N): de items erna worden niet hernummerd,
+        hun index volgt uit hun positie.
+
+        In het tekstformaat wordt een tekst met `###INDEX:` geweigerd: na opslaan
+        zou hij in meerdere items uiteenvallen.
+
+        Raises:
+            TypeError: Als `tekst` geen str is.
+        """
+        _controleer_tekst(tekst)
+        # Een index als 2.5 zou pas halverwege `_pas_toe` een fout geven
+        if not (isinstance(index, int) and 1 <= index <= len(self) + 1):
+            self._weiger_in_batch("Doelindex %r is buiten bereik (1-%d).", index, len(self) + 1)
+            logging.warning("Doelindex %r is buiten bereik (1-%d).", index, len(self) + 1)
+            return False
+        if not self._past_in_formaat(tekst):
+            self._weiger_in_batch(_MARKER_FOUT, _INDEX_MARKER_TEKST)
+            logging.warning(_MARKER_FOUT, _INDEX_MARKER_TEKST)
+            return False
+
+        self._registreer("voeg_in", index, tekst)
+        self._pas_toe("voeg_in", index, tekst)
         self.dirty = True
         return True
 
     def wijzig_tekst(self, index_nummer, nieuwe_tekst):
-        """Wijzigt de tekst voor een gegeven indexnummer."""
+        """Wijzigt de tekst voor een gegeven indexnummer; een `nieuwe_tekst` die geen str is geeft een TypeError."""
+        _controleer_tekst(nieuwe_tekst)
+        if not self._past_in_formaat(nieuwe_tekst):
+            self._weiger_in_batch(_MARKER_FOUT, _INDEX_MARKER_TEKST)
+            logging.warning(_MARKER_FOUT, _INDEX_MARKER_TEKST)
+            return False
         if index_nummer in self.data:
-            self.data[index_nummer] = nieuwe_tekst
+            self._registreer("wijzig", index_nummer, nieuwe_tekst)
+            self._pas_toe("wijzig", index_nummer, nieuwe_tekst)
             self.dirty = True
             return True
+        self._weiger_in_batch("Index %r niet gevonden voor wijzigen.", index_nummer)
         return False
 
     def verwijder_tekst(self, index_nummer):
@@ -138,17 +1854,11 @@ class TextDatabase:
         Verwijdert een tekst op basis van indexnummer en hernummert de volgende items.
         """
         if index_nummer not in self.data:
+            self._weiger_in_batch("Index %r niet gevonden voor verwijderen.", index_nummer)
             return False
 
-        # Bouw een lijst van alle waarden (O(N)).
-        items = [self.data[i] for i in range(1, len(self.data) + 1)]
-
-        # Verwijder het item uit de lijst (O(N)).
-        del items[index_nummer - 1]
-
-        # Bouw de dictionary opnieuw op met een compacte, nieuwe index (O(N)).
-        self.data = {i: text for i, text in enumerate(items, 1)}
-
+        self._registreer("verwijder", index_nummer)
+        self._pas_toe("verwijder", index_nummer)
         self.dirty = True
         return True
 
@@ -157,27 +1867,127 @@ class TextDatabase:
         Verplaatst een item van source_index naar dest_index en herindexeert.
         """
         if source_index not in self.data:
-            logging.warning("Bronindex %d niet gevonden voor verplaatsen.", source_index)
+            self._weiger_in_batch("Bronindex %r niet gevonden voor verplaatsen.", source_index)
+            logging.warning("Bronindex %r niet gevonden voor verplaatsen.", source_index)
             return False
 
-        num_items = len(self.data)
-        if not (1 <= dest_index <= num_items):
-            logging.warning("Doelindex %d is buiten bereik (1-%d).", dest_index, num_items)
+        num_items = len(self)
+        if not (isinstance(dest_index, int) and 1 <= dest_index <= num_items):
+            self._weiger_in_batch("Doelindex %r is buiten bereik (1-%d).", dest_index, num_items)
+            logging.warning("Doelindex %r is buiten bereik (1-%d).", dest_index, num_items)
             return False
 
-        # Omdat de sleutels gegarandeerd aaneengesloten zijn (1..N), kunnen we de
-        # lijst efficiënter opbouwen zonder te sorteren (O(N)).
-        items = [self.data[i] for i in range(1, num_items + 1)]
+        self._registreer("verplaats", source_index, dest_index)
+        self._pas_toe("verplaats", source_index, dest_index)
+        self.dirty = True
+        return True
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Context manager die een reeks wijzigingen als één geheel uitvoert.
 
-        # Haal het te verplaatsen item uit de lijst
-        # De lijst is 0-geïndexeerd, de database 1-geïndexeerd
-        item_to_move = items.pop(source_index - 1)
+        Als er binnen het `with`-blok een exceptie optreedt, worden alle wijzigingen
+        uit de batch teruggedraaid, inclusief `dirty` en het journaal, en wordt de
+        exceptie opnieuw opgegooid. Een geneste batch hoort bij de buitenste.
 
-        # Voeg het item in op de nieuwe positie
-        items.insert(dest_index - 1, item_to_move)
+        Een ongeldige wijziging (bijvoorbeeld een index buiten bereik) geeft binnen
+        een batch geen False maar een ValueError, zodat de batch niet half wordt
+        uitgevoerd. Opslaan binnen een batch kan niet (RuntimeError): de batch kan
+        daarna nog teruggedraaid worden.
 
-        # Bouw de dictionary opnieuw op met een compacte, nieuwe index
-        self.data = {i: text for i, text in enumerate(items, 1)}
+        Voorbeeld:
+            with db.batch():
+                db.verwijder_tekst(3)
+                db.voeg_tekst_op_index_toe(1, "Nieuw")
+        """
+        if self._ongedaan is not None:
+            yield self
+            return
 
-        self.dirty = True
+        wachtrij_lengte = len(self._journal_wachtrij) if self._journal_wachtrij is not None else 0
+        staat = (self.dirty, self._laagste_wijziging)
+        self._ongedaan = []
+        try:
+            yield self
+        except BaseException:
+            self._draai_terug(wachtrij_lengte, staat)
+            raise
+        finally:
+            self._ongedaan = None
+
+    def _past_in_formaat(self, tekst):
+        """
+        Geeft False als `tekst` niet in het formaat van het bestand past.
+
+        Een tekst met `###INDEX:` zou in het tekstformaat na opslaan en laden in
+        stukken uiteenvallen; in de andere formaten past elke tekst.
+        """
+        return self.formaat != FORMAAT_TEKST or _INDEX_MARKER_TEKST not in tekst
+
+    def _weiger_in_batch(self, bericht, *args):
+        """Binnen een batch wordt een ongeldige wijziging een ValueError, zodat de hele batch wordt teruggedraaid."""
+        if self._ongedaan is not None:
+            raise ValueError(bericht % args)
+
+    def _draai_terug(self, wachtrij_lengte, staat):
+        """Maakt de wijzigingen van de lopende batch in omgekeerde volgorde ongedaan."""
+        for operatie in reversed(self._ongedaan):
+            self._pas_toe(*operatie)
+        if self._journal_wachtrij is not None:
+            del self._journal_wachtrij[wachtrij_lengte:]
+        self.dirty, self._laagste_wijziging = staat
+        logging.info("Batch van %d wijzigingen teruggedraaid.", len(self._ongedaan))
+
+    def _controleer_operaties(self, operaties):
+        """Controleert of de operaties na elkaar uitvoerbaar zijn; geeft anders een foutmelding terug."""
+        aantal = len(self)
+        for nummer, operatie in enumerate(operaties, 1):
+            match operatie:
+                case ("voeg_in", int(index), str(tekst)) if 1 <= index <= aantal + 1 and self._past_in_formaat(tekst):
+                    aantal += 1
+                case ("wijzig", int(index), str(tekst)) if 1 <= index <= aantal and self._past_in_formaat(tekst):
+                    pass
+                case ("verwijder", int(index)) if 1 <= index <= aantal:
+                    aantal -= 1
+                case ("verplaats", int(bron), int(doel)) if 1 <= bron <= aantal and 1 <= doel <= aantal:
+                    pass
+                case _:
+                    return f"Operatie {nummer} {operatie!r} is ongeldig of buiten bereik (1-{aantal})."
+        return None
+
+    def apply_operations(self, operaties):
+        """
+        Voert een reeks wijzigingen uit: allemaal, of bij een ongeldige operatie geen enkele.
+
+        Elke operatie heeft de vorm van een journaal-record: ("voeg_in", index, tekst),
+        ("wijzig", index, tekst), ("verwijder", index) of ("verplaats", bron, doel).
+        De indexen gelden voor de database na de voorgaande operaties.
+
+        Alle operaties worden eerst gecontroleerd; is er één ongeldig, dan verandert
+        er niets (ook `dirty` niet). Daarna kost elke operatie O(√N) dankzij de
+        `_BlokLijst`, in plaats van een volledige herbouw per operatie.
+
+        Returns:
+            bool: True als alle operaties zijn uitgevoerd.
+        """
+        operaties = list(operaties)
+        fout = self._controleer_operaties(operaties)
+        if fout:
+            self._weiger_in_batch("%s", fout)
+            logging.warning(fout)
+            return False
+        with self.batch():
+            for operatie in operaties:
+                self._voer_uit(operatie)
         return True
+
+
+if __name__ == "__main__":
+    # `python -m database serve db.txt` start een server voor één database (zie tekstdb_server.py)
+    if sys.argv[1:2] != ["serve"]:
+        print("Gebruik: python -m database serve <bestandsnaam> [opties]", file=sys.stderr)
+        sys.exit(2)
+    import tekstdb_server
+
+    tekstdb_server.main(sys.argv[2:])
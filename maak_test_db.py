@@ -5,9 +5,18 @@ Een hulpprogramma om een testdatabase te genereren.
 Dit script maakt een bestand aan (standaard 'mijn_tekstdatabase.txt')
 en vult het met een aantal voorbeeld-tekstitems.
 Bestaande bestanden worden zonder waarschuwing overschreven.
+
+Met `--importeer` worden de teksten in plaats daarvan (stroomsgewijs) ingelezen:
+    python maak_test_db.py db.txt --importeer teksten.jsonl   (één JSON-string per regel)
+    python maak_test_db.py db.txt --importeer map_met_teksten (één tekst per bestand)
+    python maak_test_db.py db.txt --importeer alineas.txt     (teksten gescheiden door een lege regel)
+    cat teksten.jsonl | python maak_test_db.py db.txt --importeer - --jsonl
 """
 
 import argparse
+import io
+import json
+import os
 import sys
 
 from database import TextDatabase
@@ -23,13 +32,70 @@ VOORBEELD_DATA = [
 ]
 
 
+def lees_alineas(f):
+    """Leest teksten die door een of meer lege regels van elkaar gescheiden zijn."""
+    regels = []
+    for regel in f:
+        if regel.strip():
+            regels.append(regel.rstrip("\r\n"))
+        elif regels:
+            yield "\n".join(regels)
+            regels = []
+    if regels:
+        yield "\n".join(regels)
+
+
+def lees_jsonl(f):
+    """Leest één tekst per regel: een JSON-string of een object met de sleutel "tekst"."""
+    for regelnummer, regel in enumerate(f, 1):
+        if not regel.strip():
+            continue
+        try:
+            item = json.loads(regel)
+            tekst = item if isinstance(item, str) else item["tekst"]
+            if not isinstance(tekst, str):
+                raise TypeError(f"de tekst is een {type(tekst).__name__}, geen string")
+        except (ValueError, TypeError, KeyError) as e:
+            raise ValueError(f"Ongeldige JSON-regel {regelnummer}: {e!r}") from None
+        yield tekst
+
+
+def lees_map(map_naam):
+    """Leest elk bestand in een map (op naam gesorteerd) als één tekst."""
+    for naam in sorted(os.listdir(map_naam)):
+        pad = os.path.join(map_naam, naam)
+        if os.path.isfile(pad):
+            with open(pad, encoding="utf-8") as f:
+                yield f.read().strip()
+
+
+def lees_bron(bron, jsonl=False):
+    """
+    Geeft een generator met de teksten uit `bron` terug.
+
+    `bron` is '-' (standaard invoer), een map, een .jsonl-bestand of een tekstbestand
+    met alinea's. Met `jsonl=True` wordt de invoer altijd als JSON Lines gelezen.
+    """
+    if os.path.isdir(bron):
+        yield from lees_map(bron)
+        return
+    jsonl = jsonl or bron.endswith(".jsonl")
+    if bron == "-":
+        f = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    else:
+        f = open(bron, encoding="utf-8")
+    with f:
+        yield from lees_jsonl(f) if jsonl else lees_alineas(f)
+
+
 def maak_test_database(bestandsnaam, data):
     """
     Maakt een nieuwe database aan en vult deze met de opgegeven data.
 
     Args:
         bestandsnaam (str): De naam van het te creëren databasebestand.
-        data (list[str]): Een lijst met strings om als items toe te voegen.
+        data (Iterable[str]): De teksten om als items toe te voegen; dit mag een
+                              generator zijn, de teksten worden stroomsgewijs verwerkt.
     """
     print(f"Bezig met het aanmaken van testdatabase '{bestandsnaam}'...")
 
@@ -37,8 +103,7 @@ def maak_test_database(bestandsnaam, data):
         # Gebruik create_new=True om een eventueel bestaand bestand te overschrijven
         db = TextDatabase(bestandsnaam, create_new=True)
 
-        for tekst in data:
-            db.voeg_tekst_toe(tekst)
+        db.voeg_teksten_toe(data)
 
         if db.save():
             print(f"Succes! Testdatabase '{bestandsnaam}' aangemaakt met {len(db)} items.")
@@ -59,6 +124,15 @@ if __name__ == "__main__":
         default="mijn_tekstdatabase.txt",
         help=("De naam van het te creëren databasebestand (standaard: mijn_tekstdatabase.txt)."),
     )
+    parser.add_argument(
+        "-i",
+        "--importeer",
+        metavar="BRON",
+        help="Importeer de teksten uit BRON in plaats van de voorbeelddata: '-' (standaard invoer), "
+        "een map (één tekst per bestand), een .jsonl-bestand of een tekstbestand met alinea's.",
+    )
+    parser.add_argument("--jsonl", action="store_true", help="Lees de bron als JSON Lines (één tekst per regel).")
     args = parser.parse_args()
 
-    maak_test_database(args.bestandsnaam, VOORBEELD_DATA)
+    data = lees_bron(args.importeer, args.jsonl) if args.importeer else VOORBEELD_DATA
+    maak_test_database(args.bestandsnaam, data)
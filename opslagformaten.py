@@ -0,0 +1,389 @@
+"""
+Opslagformaten voor de TextDatabase class naast het tekstformaat met `###INDEX:`-markeringen.
+
+Een bestand in een ander formaat begint met een vaste magic, zodat de database bij
+het laden zelf ziet welk formaat een bestand heeft (zie `herken_formaat`). Per
+formaat is er een functie die de teksten wegschrijft en een basis-class die
+alleen-lezen toegang geeft tot de teksten in het bestand, met dezelfde methodes als
+`_TekstBasis` in `database.py` (`tekst`, `ruw`, `ruw_bytes`, `begin`, ...).
+
+Anders dan het tekstformaat bewaren deze formaten elke tekst precies zoals hij is:
+er wordt geen witruimte weggehaald en geen regeleinde vertaald.
+"""
+
+import bisect
+import codecs
+import itertools
+import lzma
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+
+# Het leesbare formaat met `###INDEX:`-markeringen (gelezen en geschreven door `database.py`).
+FORMAAT_TEKST = "tekst"
+
+# De compressiemethodes van het gecomprimeerde formaat: naam -> (code in het bestand, comprimeer, decomprimeer).
+COMPRESSIE = {
+    "zlib": (1, zlib.compress, zlib.decompress),
+    "lzma": (2, lzma.compress, lzma.decompress),
+}
+# Het binaire formaat: elke tekst los, met een tabel van posities en lengtes.
+FORMAAT_BINAIR = "binair"
+FORMATEN = (FORMAAT_TEKST, *COMPRESSIE, FORMAAT_BINAIR)
+
+# Het gecomprimeerde formaat bestaat uit:
+#   een kop: magic en de code van de compressiemethode;
+#   de blokken: per blok, los gecomprimeerd, de lengtes van de teksten (uint32) gevolgd
+#   door de teksten zelf in UTF-8;
+#   de blokkenmap: de bestandsposities van de blokken plus het einde van het laatste
+#   blok, en het nummer van het eerste item per blok plus het aantal items (int64);
+#   een voet: het aantal items, het aantal blokken, de positie van de map en de magic.
+# Alle getallen zijn little-endian.
+COMPRESSIE_MAGIC = b"TDBZBLK1"
+_COMPRESSIE_KOP = struct.Struct("<8sB")
+_COMPRESSIE_VOET = struct.Struct("<QQQ8s")
+# Een blok wordt afgesloten zodra de teksten erin samen minstens zoveel bytes beslaan (64 KiB).
+COMPRESSIE_BLOK_BYTES = 64 << 10
+
+# Het binaire formaat bestaat uit:
+#   een kop: de magic;
+#   de teksten: per tekst de lengte (uint32) gevolgd door de tekst in UTF-8;
+#   de tabel: de bestandspositie van elke tekst (int64), daarna de lengte van elke tekst (uint32);
+#   een voet: het aantal teksten, de positie van de tabel en de magic.
+# Alle getallen zijn little-endian. Een tekst wordt zo in O(1) gevonden, zonder het
+# bestand te scannen, en mag alles bevatten, ook `###INDEX:`.
+BINAIR_MAGIC = b"TDBBIN01"
+_BINAIR_KOP = struct.Struct("<8s")
+_BINAIR_VOET = struct.Struct("<QQ8s")
+_BINAIR_LENGTE = struct.Struct("<I")
+# Bij het schrijven worden steeds zoveel teksten samengevoegd en in één keer geschreven.
+BINAIR_BATCH_GROOTTE = 4096
+# Bij het volledig lezen wordt ongeveer na elk stuk van deze grootte de voortgang gemeld (1 MiB).
+BINAIR_VOORTGANG_BYTES = 1 << 20
+
+
+def _naar_bytes(getallen):
+    """Geeft de inhoud van een array terug als little-endian bytes."""
+    if sys.byteorder == "big":
+        getallen = array(getallen.typecode, getallen)
+        getallen.byteswap()
+    return getallen.tobytes()
+
+
+def _uit_bytes(typecode, data):
+    """Zet little-endian bytes om naar een array met `typecode`."""
+    getallen = array(typecode, data)
+    if sys.byteorder == "big":
+        getallen.byteswap()
+    return getallen
+
+
+def herken_formaat(bestandsnaam):
+    """
+    Geeft het formaat van een databasebestand terug, aan de hand van de eerste bytes.
+
+    Een bestand dat niet bestaat, leeg is of niet gelezen kan worden, geldt als
+    FORMAAT_TEKST; de fout volgt dan bij het lezen zelf.
+    """
+    try:
+        with open(bestandsnaam, "rb") as f:
+            kop = f.read(_COMPRESSIE_KOP.size)
+    except OSError:
+        return FORMAAT_TEKST
+    if kop.startswith(BINAIR_MAGIC):
+        return FORMAAT_BINAIR
+    if len(kop) == _COMPRESSIE_KOP.size and kop.startswith(COMPRESSIE_MAGIC):
+        code = _COMPRESSIE_KOP.unpack(kop)[1]
+        for naam, (methode_code, _, _) in COMPRESSIE.items():
+            if methode_code == code:
+                return naam
+        raise ValueError(f"Onbekende compressiemethode {code} in '{bestandsnaam}'.")
+    return FORMAAT_TEKST
+
+
+def schrijf_container(f, teksten, formaat):
+    """Schrijft de teksten (als bytes) in `formaat` naar het binair geopende bestand `f`."""
+    if formaat == FORMAAT_BINAIR:
+        return schrijf_binair(f, teksten)
+    if formaat not in COMPRESSIE:
+        raise ValueError(f"Onbekend containerformaat: {formaat!r}")
+    return schrijf_gecomprimeerd(f, teksten, formaat)
+
+
+def open_container(bestandsnaam, formaat):
+    """Opent een bestand in `formaat` en geeft de basis-class terug."""
+    if formaat == FORMAAT_BINAIR:
+        return BinaireBasis(bestandsnaam)
+    if formaat not in COMPRESSIE:
+        raise ValueError(f"Onbekend containerformaat: {formaat!r}")
+    return GecomprimeerdeBasis(bestandsnaam)
+
+
+def schrijf_gecomprimeerd(f, teksten, methode, blok_bytes=None):
+    """
+    Schrijft de teksten (als bytes) als los gecomprimeerde blokken, met een blokkenmap.
+
+    Per blok worden teksten verzameld tot ze samen `blok_bytes` (standaard
+    COMPRESSIE_BLOK_BYTES) beslaan; zo staat nooit meer dan één blok in het geheugen.
+    Geeft het aantal geschreven teksten terug.
+    """
+    code, comprimeer, _ = COMPRESSIE[methode]
+    blok_bytes = blok_bytes or COMPRESSIE_BLOK_BYTES
+    f.write(_COMPRESSIE_KOP.pack(COMPRESSIE_MAGIC, code))
+    posities = array("q", (_COMPRESSIE_KOP.size,))
+    eerste = array("q", (0,))
+    teksten = iter(teksten)
+    while True:
+        lengtes, stukken, grootte = array("I"), [], 0
+        for tekst in teksten:
+            lengtes.append(len(tekst))
+            stukken.append(tekst)
+            grootte += len(tekst)
+            if grootte >= blok_bytes:
+                break
+        if not stukken:
+            break
+        blok = comprimeer(_naar_bytes(lengtes) + b"".join(stukken))
+        f.write(blok)
+        posities.append(posities[-1] + len(blok))
+        eerste.append(eerste[-1] + len(stukken))
+
+    f.write(_naar_bytes(posities))
+    f.write(_naar_bytes(eerste))
+    f.write(_COMPRESSIE_VOET.pack(eerste[-1], len(posities) - 1, posities[-1], COMPRESSIE_MAGIC))
+    return eerste[-1]
+
+
+class GecomprimeerdeBasis:
+    """
+    Alleen-lezen toegang tot een gecomprimeerd databasebestand via een memory map.
+
+    Bij het openen wordt alleen de blokkenmap gelezen. Een tekst opvragen
+    decomprimeert alleen het blok waar hij in staat; het laatst gedecomprimeerde
+    blok wordt bewaard, zodat opeenvolgende items (een lijst, een zoekopdracht)
+    elk blok maar één keer decomprimeren.
+    """
+
+    op_volgorde = True
+
+    def __init__(self, bestandsnaam):
+        """
+        Args:
+            bestandsnaam (str): Het pad naar het databasebestand.
+
+        Raises:
+            ValueError: Als het bestand geen geldig gecomprimeerd databasebestand is.
+        """
+        self.bestandsnaam = bestandsnaam
+        self.formaat = herken_formaat(bestandsnaam)
+        if self.formaat not in COMPRESSIE:
+            raise ValueError(f"'{bestandsnaam}' is geen gecomprimeerd databasebestand.")
+        self._decomprimeer = COMPRESSIE[self.formaat][2]
+        # (bloknummer, gedecomprimeerde bytes, begin van elke tekst plus het einde van de laatste)
+        self._cache = None
+        with open(bestandsnaam, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._lees_map()
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError(f"'{bestandsnaam}' is geen geldig gecomprimeerd databasebestand.") from None
+
+    def _lees_map(self):
+        """Leest de voet en de blokkenmap."""
+        grootte = len(self._mmap)
+        aantal, blokken, map_positie, magic = _COMPRESSIE_VOET.unpack_from(self._mmap, grootte - _COMPRESSIE_VOET.size)
+        lengte = 8 * (blokken + 1)
+        if magic != COMPRESSIE_MAGIC or map_positie + 2 * lengte + _COMPRESSIE_VOET.size != grootte:
+            raise ValueError
+        self._posities = _uit_bytes("q", self._mmap[map_positie : map_positie + lengte])
+        self._eerste = _uit_bytes("q", self._mmap[map_positie + lengte : map_positie + 2 * lengte])
+        if self._eerste[0] != 0 or self._eerste[-1] != aantal or self._posities[-1] != map_positie:
+            raise ValueError
+
+    def heropen(self):
+        """Geeft een nieuwe basis voor hetzelfde bestand terug (na `close()`)."""
+        return type(self)(self.bestandsnaam)
+
+    def __len__(self):
+        """Geeft het aantal teksten in het bestand terug."""
+        return self._eerste[-1]
+
+    def _blok(self, nummer):
+        """Decomprimeert een blok en geeft (bytes, grenzen) terug, met de grenzen van de teksten erin."""
+        cache = self._cache
+        if cache is not None and cache[0] == nummer:
+            return cache[1], cache[2]
+        data = self._decomprimeer(self._mmap[self._posities[nummer] : self._posities[nummer + 1]])
+        aantal = self._eerste[nummer + 1] - self._eerste[nummer]
+        lengtes = _uit_bytes("I", data[: 4 * aantal])
+        grenzen = list(itertools.accumulate(lengtes, initial=4 * aantal))
+        self._cache = (nummer, data, grenzen)
+        return data, grenzen
+
+    def ruw(self, blok):
+        """Geeft de bytes van een tekst terug als memoryview op het gedecomprimeerde blok."""
+        nummer = bisect.bisect_right(self._eerste, blok) - 1
+        data, grenzen = self._blok(nummer)
+        i = blok - self._eerste[nummer]
+        return memoryview(data)[grenzen[i] : grenzen[i + 1]]
+
+    def ruw_bytes(self, blok):
+        """Geeft een kopie van de bytes van een tekst terug."""
+        with self.ruw(blok) as tekst_bytes:
+            return tekst_bytes.tobytes()
+
+    def tekst(self, blok):
+        """Decodeert de tekst van één item."""
+        with self.ruw(blok) as tekst_bytes:
+            return str(tekst_bytes, "utf-8")
+
+    def begin(self, blok, tekens):
+        """Decodeert alleen het begin van een tekst: hooguit `tekens` tekens."""
+        with self.ruw(blok) as tekst_bytes:
+            # Niet `final`: een teken dat door de grens wordt afgebroken, valt weg
+            return codecs.getincrementaldecoder("utf-8")().decode(tekst_bytes[: 4 * tekens])[:tekens]
+
+    def teksten(self, voortgang=None):
+        """
+        Levert alle teksten op volgorde, blok voor blok.
+
+        `voortgang` wordt na elk blok aangeroepen met de bestandspositie tot waar gelezen is.
+        """
+        for nummer in range(len(self._posities) - 1):
+            data, grenzen = self._blok(nummer)
+            with memoryview(data) as view:
+                yield from (str(view[a:b], "utf-8") for a, b in itertools.pairwise(grenzen))
+            if voortgang is not None:
+                voortgang(self._posities[nummer + 1])
+
+    def close(self):
+        """Sluit de memory map."""
+        self._cache = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def schrijf_binair(f, teksten):
+    """
+    Schrijft de teksten (als bytes) in het binaire formaat; geeft het aantal teksten terug.
+
+    De teksten worden per BINAIR_BATCH_GROOTTE samengevoegd en in één keer geschreven.
+    """
+    f.write(_BINAIR_KOP.pack(BINAIR_MAGIC))
+    positie = _BINAIR_KOP.size
+    starts, lengtes = array("q"), array("I")
+    teksten = iter(teksten)
+    while batch := list(itertools.islice(teksten, BINAIR_BATCH_GROOTTE)):
+        stukken = []
+        for tekst in batch:
+            lengtes.append(len(tekst))
+            starts.append(positie + _BINAIR_LENGTE.size)
+            stukken.append(_BINAIR_LENGTE.pack(len(tekst)))
+            stukken.append(tekst)
+            positie += _BINAIR_LENGTE.size + len(tekst)
+        f.write(b"".join(stukken))
+
+    f.write(_naar_bytes(starts))
+    f.write(_naar_bytes(lengtes))
+    f.write(_BINAIR_VOET.pack(len(starts), positie, BINAIR_MAGIC))
+    return len(starts)
+
+
+class BinaireBasis:
+    """
+    Alleen-lezen toegang tot een databasebestand in het binaire formaat via een memory map.
+
+    Bij het openen wordt alleen de tabel gelezen; de positie en lengte van elke
+    tekst staan daarin, dus een tekst opvragen kost O(1). `ruw` geeft een memoryview
+    op de map, zonder de bytes te kopiëren.
+    """
+
+    formaat = FORMAAT_BINAIR
+    op_volgorde = True
+
+    def __init__(self, bestandsnaam):
+        """
+        Args:
+            bestandsnaam (str): Het pad naar het databasebestand.
+
+        Raises:
+            ValueError: Als het bestand geen geldig binair databasebestand is.
+        """
+        self.bestandsnaam = bestandsnaam
+        with open(bestandsnaam, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._lees_tabel()
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError(f"'{bestandsnaam}' is geen geldig binair databasebestand.") from None
+
+    def _lees_tabel(self):
+        """Leest de voet en de tabel met posities en lengtes."""
+        grootte = len(self._mmap)
+        aantal, tabel_positie, magic = _BINAIR_VOET.unpack_from(self._mmap, grootte - _BINAIR_VOET.size)
+        if (
+            _BINAIR_KOP.unpack_from(self._mmap)[0] != BINAIR_MAGIC
+            or magic != BINAIR_MAGIC
+            or tabel_positie + 12 * aantal + _BINAIR_VOET.size != grootte
+        ):
+            raise ValueError
+        self.starts = _uit_bytes("q", self._mmap[tabel_positie : tabel_positie + 8 * aantal])
+        self.lengtes = _uit_bytes("I", self._mmap[tabel_positie + 8 * aantal : tabel_positie + 12 * aantal])
+        if aantal and self.starts[-1] + self.lengtes[-1] != tabel_positie:
+            raise ValueError
+
+    def heropen(self):
+        """Geeft een nieuwe basis voor hetzelfde bestand terug (na `close()`)."""
+        return type(self)(self.bestandsnaam)
+
+    def __len__(self):
+        """Geeft het aantal teksten in het bestand terug."""
+        return len(self.starts)
+
+    def ruw(self, blok):
+        """Geeft de bytes van een tekst terug als memoryview op de map (zonder kopie)."""
+        start = self.starts[blok]
+        return memoryview(self._mmap)[start : start + self.lengtes[blok]]
+
+    def ruw_bytes(self, blok):
+        """Geeft een kopie van de bytes van een tekst terug."""
+        start = self.starts[blok]
+        return self._mmap[start : start + self.lengtes[blok]]
+
+    def tekst(self, blok):
+        """Decodeert de tekst van één item."""
+        with self.ruw(blok) as tekst_bytes:
+            return str(tekst_bytes, "utf-8")
+
+    def begin(self, blok, tekens):
+        """Decodeert alleen het begin van een tekst: hooguit `tekens` tekens, uit hooguit 4 bytes per teken."""
+        start = self.starts[blok]
+        stuk = self._mmap[start : start + min(self.lengtes[blok], 4 * tekens)]
+        # Niet `final`: een teken dat door de grens wordt afgebroken, valt weg
+        return codecs.getincrementaldecoder("utf-8")().decode(stuk)[:tekens]
+
+    def teksten(self, voortgang=None):
+        """
+        Levert alle teksten op volgorde.
+
+        `voortgang` wordt ongeveer na elke BINAIR_VOORTGANG_BYTES aangeroepen met de
+        bestandspositie tot waar gelezen is.
+        """
+        gemeld = 0
+        with memoryview(self._mmap) as view:
+            for start, lengte in zip(self.starts, self.lengtes):
+                yield str(view[start : start + lengte], "utf-8")
+                if voortgang is not None and start + lengte - gemeld >= BINAIR_VOORTGANG_BYTES:
+                    gemeld = start + lengte
+                    voortgang(gemeld)
+
+    def close(self):
+        """Sluit de memory map."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
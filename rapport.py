@@ -25,8 +25,8 @@ def maak_rapport(bestandsnaam, index_to_get):
 
     try:
         # Maak een object van de TextDatabase class.
-        # De __init__ methode wordt hier aangeroepen en het bestand wordt geladen.
-        db = TextDatabase(bestandsnaam)
+        # In lazy-modus wordt het bestand alleen gescand; alleen het opgevraagde item wordt gelezen.
+        db = TextDatabase(bestandsnaam, lazy=True)
     except FileNotFoundError:
         print(f"Fout: Het databasebestand '{bestandsnaam}' is niet gevonden.", file=sys.stderr)
         sys.exit(1)
@@ -47,6 +47,7 @@ def maak_rapport(bestandsnaam, index_to_get):
 
     # Gebruik de nieuwe __len__ methode voor een meer Pythonic aanpak.
     print(f"\nHet totaal aantal items in de database is: {len(db)}")
+    db.close()
     print("\n--- Einde van het rapportageprogramma ---")
 
 
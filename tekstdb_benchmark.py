@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Benchmarks voor de TextDatabase class.
+
+Dit script genereert een (tijdelijke) testdatabase van instelbare grootte en meet
+hoe lang de operaties van `database.py` duren en hoeveel geheugen ze maximaal
+gebruiken. Waar zinvol wordt de huidige implementatie vergeleken met de
+oorspronkelijke, die hieronder als referentie bewaard is.
+
+Voorbeeld:
+    python tekstdb_benchmark.py laden --items 200000
+    python tekstdb_benchmark.py opslaan
+    python tekstdb_benchmark.py bewerken --items 500000
+    python tekstdb_benchmark.py zoeken
+    python tekstdb_benchmark.py formaten
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from database import PARALLEL_MIN_BYTES, TextDatabase
+from opslagformaten import FORMATEN
+from tekstdb_converteer import converteer
+
+
+def _lees_bestand_origineel(bestandsnaam):
+    """De oorspronkelijke parser: het hele bestand in één string, daarna split en regex."""
+    with open(bestandsnaam, encoding="utf-8") as f:
+        content = f.read()
+
+    geindexeerde_data = {}
+    blokken = content.split("###INDEX:")[1:]
+    for blok in blokken:
+        match = re.match(r"\s*(\d+)\s*\n(.*)", blok, re.DOTALL)
+        if match:
+            geindexeerde_data[int(match.group(1))] = match.group(2).strip()
+    return geindexeerde_data
+
+
+def _schrijf_bestand_origineel(bestandsnaam, data):
+    """De oorspronkelijke `save()`: het bestand direct overschrijven, drie writes per item."""
+    with open(bestandsnaam, "w", encoding="utf-8") as f:
+        for index, tekst in sorted(data.items()):
+            f.write(f"###INDEX: {index}\n")
+            f.write(tekst)
+            f.write("\n\n")
+
+
+def _verplaats_origineel(data, source_index, dest_index):
+    """Het oorspronkelijke `move_item`: lijst opbouwen, verplaatsen en de dict opnieuw opbouwen."""
+    items = [data[i] for i in range(1, len(data) + 1)]
+    items.insert(dest_index - 1, items.pop(source_index - 1))
+    return {i: text for i, text in enumerate(items, 1)}
+
+
+def maak_benchmark_bestand(bestandsnaam, aantal_items, tekst_lengte):
+    """Schrijft een databasebestand met `aantal_items` items van ongeveer `tekst_lengte` tekens."""
+    regel = "Dit is een regel voorbeeldtekst voor de benchmark, met één accent. "
+    herhalingen = max(1, tekst_lengte // len(regel))
+    with open(bestandsnaam, "w", encoding="utf-8") as f:
+        for index in range(1, aantal_items + 1):
+            f.write(f"###INDEX: {index}\n")
+            f.write(f"Item {index}.\n" + regel * herhalingen)
+            f.write("\n\n")
+
+
+def meet(functie, *args):
+    """Voert `functie` uit en geeft (resultaat, seconden, piekgeheugen in bytes) terug."""
+    start = time.perf_counter()
+    resultaat = functie(*args)
+    seconden = time.perf_counter() - start
+    if hasattr(resultaat, "close"):
+        resultaat.close()
+    del resultaat
+
+    # Meet het geheugen in een aparte run: tracemalloc vertraagt de uitvoering.
+    tracemalloc.start()
+    resultaat = functie(*args)
+    _, piek = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultaat, seconden, piek
+
+
+def _rapporteer(naam, seconden, piek, bestandsgrootte):
+    """Print één resultaatregel."""
+    mb = bestandsgrootte / 1e6
+    print(f"{naam:<28} {seconden:8.3f} s {mb / seconden:9.1f} MB/s   piek {piek / 1e6:9.1f} MB")
+
+
+def bench_laden(bestandsnaam):
+    """Vergelijkt de oorspronkelijke parser met de stream-parser van TextDatabase."""
+    grootte = os.path.getsize(bestandsnaam)
+    print(f"Bestand: {bestandsnaam} ({grootte / 1e6:.1f} MB)")
+
+    oud, seconden, piek = meet(_lees_bestand_origineel, bestandsnaam)
+    _rapporteer("origineel (split + regex)", seconden, piek, grootte)
+
+    db, seconden, piek = meet(TextDatabase, bestandsnaam)
+    _rapporteer("stream-parser", seconden, piek, grootte)
+
+    if dict(db.data) != oud:
+        print("WAARSCHUWING: de parsers leveren verschillende resultaten op!")
+
+    lazy_db, seconden, piek = meet(lambda: TextDatabase(bestandsnaam, lazy=True))
+    _rapporteer("lazy-modus (alleen scannen)", seconden, piek, grootte)
+    lazy_db.close()
+
+    # Alleen bestanden vanaf PARALLEL_MIN_BYTES worden parallel gelezen; het piekgeheugen
+    # is dat van het hoofdproces.
+    for processen in (2, 4, 8, 16):
+        if processen > (os.cpu_count() or 1) or grootte < PARALLEL_MIN_BYTES:
+            break
+        parallel_db, seconden, piek = meet(lambda: TextDatabase(bestandsnaam, processen=processen))
+        _rapporteer(f"parallel, {processen} processen", seconden, piek, grootte)
+        if list(parallel_db.data.values()) != list(db.data.values()):
+            print("WAARSCHUWING: parallel laden levert een ander resultaat op!")
+
+
+def _sla_volledig_op(db):
+    """Slaat de hele database op; door het eerste item te 'wijzigen' wordt alles herschreven."""
+    db.wijzig_tekst(1, db.get_tekst(1))
+    db.save()
+
+
+def _sla_laatste_op(db):
+    """Wijzigt alleen het laatste item en slaat op; alleen de staart wordt herschreven."""
+    db.wijzig_tekst(len(db), db.get_tekst(len(db)))
+    db.save()
+
+
+def bench_opslaan(bestandsnaam, tmpdir):
+    """Vergelijkt de oorspronkelijke `save()` met het gebufferde, atomaire opslaan."""
+    kopie = os.path.join(tmpdir, "opslaan.txt")
+    shutil.copyfile(bestandsnaam, kopie)
+    grootte = os.path.getsize(kopie)
+    print(f"Bestand: {bestandsnaam} ({grootte / 1e6:.1f} MB)")
+
+    db = TextDatabase(kopie)
+    _, seconden, piek = meet(_schrijf_bestand_origineel, kopie, db.data)
+    _rapporteer("origineel (3 writes/item)", seconden, piek, grootte)
+
+    db = TextDatabase(kopie)
+    _, seconden, piek = meet(_sla_volledig_op, db)
+    _rapporteer("gebufferd + fsync + replace", seconden, piek, grootte)
+
+    _, seconden, piek = meet(_sla_laatste_op, db)
+    _rapporteer("alleen laatste item", seconden, piek, grootte)
+
+    with TextDatabase(kopie, lazy=True) as lazy_db:
+        _, seconden, piek = meet(_sla_volledig_op, lazy_db)
+        _rapporteer("lazy-modus", seconden, piek, grootte)
+
+
+def bench_bewerken(bestandsnaam, aantal=200):
+    """Meet de tijd per verplaatsing (een verwijdering plus een invoeging) op willekeurige posities."""
+    db = TextDatabase(bestandsnaam)
+    print(f"Database: {bestandsnaam} ({len(db)} items)")
+    willekeurig = random.Random(0)
+    paren = [(willekeurig.randint(1, len(db)), willekeurig.randint(1, len(db))) for _ in range(aantal)]
+
+    data = dict(db.data)
+    start = time.perf_counter()
+    for bron, doel in paren:
+        data = _verplaats_origineel(data, bron, doel)
+    seconden = time.perf_counter() - start
+    print(f"{'origineel (dict opnieuw)':<28} {seconden / aantal * 1e3:10.3f} ms per verplaatsing")
+
+    start = time.perf_counter()
+    for bron, doel in paren:
+        db.move_item(bron, doel)
+    seconden = time.perf_counter() - start
+    print(f"{'blokkenlijst':<28} {seconden / aantal * 1e3:10.3f} ms per verplaatsing")
+
+    if dict(db.data) != data:
+        print("WAARSCHUWING: de implementaties leveren verschillende resultaten op!")
+
+
+def _zoek_origineel(data, zoekterm):
+    """De oorspronkelijke zoekfunctie van de GUI: elke tekst doorzoeken."""
+    zoekterm = zoekterm.lower()
+    return [index for index, tekst in data.items() if zoekterm in tekst.lower()]
+
+
+def bench_zoeken(bestandsnaam, zoektermen=("accent", "voorbeeldtekst", "egel voor", "Item 12345")):
+    """
+    Vergelijkt de manieren van zoeken, inclusief het geheugengebruik van de indexen.
+
+    Het doorzoeken van de teksten wordt gemeten zonder en met de casefold-cache
+    (`casefold_cache=True`): de cache kost geheugen, maar scheelt bij elke
+    zoekopdracht het casefolden van alle teksten.
+    """
+    kaal = TextDatabase(bestandsnaam)
+    db = TextDatabase(bestandsnaam, trigramindex=True, casefold_cache=True)
+    print(f"Database: {bestandsnaam} ({len(db)} items)")
+
+    def met_cache(zoekterm):
+        db.trigramindex = False
+        try:
+            return db.zoek(zoekterm, substring=True)
+        finally:
+            db.trigramindex = True
+
+    for naam, functie in (
+        ("woordindex", db.zoek),
+        ("casefold-cache", met_cache),
+        ("trigram-index", lambda zoekterm: db.zoek(zoekterm, substring=True)),
+    ):
+        start = time.perf_counter()
+        functie("opbouwen")
+        print(f"{naam + ' opbouwen':<28} {time.perf_counter() - start:8.3f} s")
+
+    data = dict(db.data)
+    for zoekterm in zoektermen:
+        print(f"Zoekterm {zoekterm!r}:")
+        for naam, functie, args in (
+            ("origineel (alles doorzoeken)", _zoek_origineel, (data, zoekterm)),
+            ("woordindex", db.zoek, (zoekterm,)),
+            ("doorzoeken zonder cache", kaal.zoek, (zoekterm, True, True)),
+            ("doorzoeken met cache", met_cache, (zoekterm,)),
+            ("trigram-index + cache", db.zoek, (zoekterm, True, True)),
+        ):
+            start = time.perf_counter()
+            gevonden = functie(*args)
+            seconden = time.perf_counter() - start
+            print(f"  {naam:<26} {seconden * 1e3:10.3f} ms {len(gevonden):9d} items")
+
+    for naam, grootte in db.zoekindex_geheugen().items():
+        print(f"{'geheugen ' + naam:<28} {grootte / 1e6:8.1f} MB")
+
+
+def bench_formaten(bestandsnaam, tmpdir, aantal=1000):
+    """Vergelijkt per opslagformaat de bestandsgrootte, het laden en het opvragen van losse items (lazy)."""
+    grootte = os.path.getsize(bestandsnaam)
+    print(f"Bestand: {bestandsnaam} ({grootte / 1e6:.1f} MB)")
+    for formaat in FORMATEN:
+        doel = os.path.join(tmpdir, f"formaat.{formaat}")
+        with contextlib.redirect_stdout(None):
+            converteer(bestandsnaam, doel, formaat)
+        print(f"{formaat}: {os.path.getsize(doel) / 1e6:.1f} MB ({grootte / os.path.getsize(doel):.1f}x)")
+
+        _, seconden, piek = meet(TextDatabase, doel)
+        _rapporteer("  laden", seconden, piek, grootte)
+
+        with TextDatabase(doel, lazy=True) as lazy_db:
+            willekeurig = random.Random(0)
+            indexen = [willekeurig.randint(1, len(lazy_db)) for _ in range(aantal)]
+            start = time.perf_counter()
+            for index_nummer in indexen:
+                lazy_db.get_tekst(index_nummer)
+            seconden = time.perf_counter() - start
+        print(f"{'  lazy get_tekst':<28} {seconden / aantal * 1e3:10.3f} ms per willekeurig item")
+
+
+def main():
+    """Verwerkt de command-line argumenten en start de gekozen benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmarks voor de TextDatabase class.")
+    parser.add_argument(
+        "benchmark", choices=["laden", "opslaan", "bewerken", "zoeken", "formaten"], help="De uit te voeren benchmark."
+    )
+    parser.add_argument("-f", "--bestand", help="Gebruik een bestaand databasebestand in plaats van testdata.")
+    parser.add_argument("-n", "--items", type=int, default=100_000, help="Aantal items in de testdata.")
+    parser.add_argument("-l", "--lengte", type=int, default=500, help="Gemiddelde tekstlengte in de testdata.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bestandsnaam = args.bestand
+        if not bestandsnaam:
+            bestandsnaam = os.path.join(tmpdir, "benchmark.txt")
+            maak_benchmark_bestand(bestandsnaam, args.items, args.lengte)
+
+        match args.benchmark:
+            case "laden":
+                bench_laden(bestandsnaam)
+            case "opslaan":
+                bench_opslaan(bestandsnaam, tmpdir)
+            case "bewerken":
+                bench_bewerken(bestandsnaam)
+            case "zoeken":
+                bench_zoeken(bestandsnaam)
+            case "formaten":
+                bench_formaten(bestandsnaam, tmpdir)
+
+
+if __name__ == "__main__":
+    main()
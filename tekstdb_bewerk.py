@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # Importeer de class uit de nieuwe module
 import argparse
+import multiprocessing
 import os
 import sys
 
@@ -138,6 +139,19 @@ def main():
         action="store_true",  # Gebruik een flag om aan te geven of een nieuw bestand moet worden aangemaakt
         help="Creëer een nieuw, leeg databasebestand. Overschrijft een bestaand bestand na bevestiging.",
     )
+    parser.add_argument(
+        "-j",
+        "--journal",
+        action="store_true",
+        help="Sla wijzigingen op in een journaal in plaats van het hele bestand te herschrijven.",
+    )
+    parser.add_argument(
+        "-p",
+        "--processen",
+        type=int,
+        default=1,
+        help="Lees een groot databasebestand met dit aantal processen tegelijk in (standaard: 1).",
+    )
 
     args = parser.parse_args()
 
@@ -153,7 +167,7 @@ def main():
                 sys.exit(0)
 
     # Maak één database object aan. Alle operaties gaan via dit object.
-    db = TextDatabase(bestandsnaam, create_new=create_new)
+    db = TextDatabase(bestandsnaam, create_new=create_new, journal=args.journal, processen=args.processen)
     toon_menu()  # Toon het menu direct bij de start
 
     while True:
@@ -221,4 +235,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Nodig voor --processen in een PyInstaller-executable op Windows
     main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Zet een databasebestand om naar een ander opslagformaat.
+
+Het formaat van het bronbestand wordt zelf herkend. Het doelformaat is het
+leesbare tekstformaat met `###INDEX:`-markeringen, een formaat met los
+gecomprimeerde blokken of het binaire formaat met een tabel van posities (zie
+`opslagformaten.py`). Het tekstformaat blijft het formaat om bestanden uit te
+wisselen. De bron wordt in lazy-modus geopend, zodat niet alle teksten tegelijk
+in het geheugen staan.
+
+Voorbeeld:
+    python tekstdb_converteer.py archief.txt archief.tdbz --formaat zlib
+    python tekstdb_converteer.py archief.txt archief.tdbb --formaat binair
+    python tekstdb_converteer.py archief.tdbb archief.txt --formaat tekst
+"""
+
+import argparse
+import os
+import sys
+
+from database import INDEX_MARKER, TextDatabase
+from opslagformaten import FORMAAT_TEKST, FORMATEN
+
+
+def converteer(bron, doel, formaat):
+    """
+    Schrijft alle items uit `bron` in `formaat` naar `doel`.
+
+    Args:
+        bron (str): Het pad naar het bestaande databasebestand (elk formaat).
+        doel (str): Het pad naar het nieuwe databasebestand; een bestaand bestand
+                    wordt overschreven.
+        formaat (str): Het doelformaat, een van `opslagformaten.FORMATEN`.
+
+    Returns:
+        bool: True als het omzetten gelukt is.
+
+    Raises:
+        ValueError: Als een tekst in het tekstformaat niet terug te lezen zou zijn,
+                    omdat hij zelf `###INDEX:` bevat.
+    """
+    with TextDatabase(bron, lazy=True) as db:
+        aantal = len(db)
+        if formaat == FORMAAT_TEKST:
+            marker = INDEX_MARKER.decode()
+            for index_nummer, tekst in db.data.items():
+                if marker in tekst:
+                    raise ValueError(f"Item {index_nummer} bevat '{marker}' en past niet in het tekstformaat.")
+        # Net als "Opslaan als" in de GUI: hetzelfde object onder een nieuwe naam opslaan
+        db.bestandsnaam = doel
+        db.formaat = formaat
+        if not db.save():
+            return False
+    print(f"{aantal} items omgezet van '{bron}' ({os.path.getsize(bron)} bytes)", end="")
+    print(f" naar '{doel}' ({formaat}, {os.path.getsize(doel)} bytes).")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zet een tekst-database om naar een ander opslagformaat.")
+    parser.add_argument("bron", help="Het databasebestand om te lezen (het formaat wordt zelf herkend).")
+    parser.add_argument("doel", help="Het databasebestand om te schrijven.")
+    parser.add_argument("-F", "--formaat", choices=FORMATEN, required=True, help="Het formaat van het doelbestand.")
+    args = parser.parse_args()
+
+    if os.path.abspath(args.bron) == os.path.abspath(args.doel):
+        print("Fout: bron en doel moeten verschillende bestanden zijn.", file=sys.stderr)
+        sys.exit(1)
+    if not os.path.exists(args.bron):
+        print(f"Fout: Het databasebestand '{args.bron}' is niet gevonden.", file=sys.stderr)
+        sys.exit(1)
+    try:
+        gelukt = converteer(args.bron, args.doel, args.formaat)
+    except ValueError as e:
+        print(f"Fout: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not gelukt:
+        print(f"Fout: Kon '{args.doel}' niet schrijven.", file=sys.stderr)
+        sys.exit(1)
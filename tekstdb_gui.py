@@ -5,10 +5,21 @@ Gebaseerd op tekstdb_bewerk.py.
 """
 
 import argparse
+import bisect
+import collections
+import queue
+import threading
 import tkinter as tk
+from array import array
 from tkinter import filedialog, messagebox, ttk
+from tkinter import font as tkfont
 
-from database import TextDatabase
+from database import PREVIEW_BREEDTE, TextDatabase
+
+# Hoe vaak (in ms) de GUI de resultaten van een lopende zoek- of laadopdracht ophaalt.
+ZOEK_POLL_INTERVAL = 50
+# Hoeveel tekens het preview-paneel per keer inlaadt; daartussen verwerkt Tk de events.
+PREVIEW_STUK_GROOTTE = 64 * 1024
 
 
 class TextEntryDialog(tk.Toplevel):
@@ -83,33 +94,432 @@ class TextEntryDialog(tk.Toplevel):
         self.destroy()
 
 
+class Zoektaak:
+    """
+    Een zoekopdracht die in een achtergrondthread loopt.
+
+    De thread doorloopt de stukken van `TextDatabase.zoek_per_stuk` en zet de
+    gevonden indexnummers per stuk in `resultaten`; de GUI haalt ze daar met
+    `after` op, zodat Tk nooit op het zoeken hoeft te wachten. Na het laatste stuk
+    volgt None, of de exceptie als het zoeken mislukt. `annuleer()` stopt de thread
+    na het stuk waar hij mee bezig is.
+    """
+
+    def __init__(self, stukken, nummers=(), zoekopdracht=None):
+        self.resultaten = queue.Queue()
+        self.zoekopdracht = zoekopdracht  # Waarmee gezocht wordt; de GUI bewaart dit bij het resultaat
+        # Indexnummers die ook getoond moeten worden (zoals "12" -> item 12, 120, ...)
+        self.nummers = collections.deque(sorted(nummers))
+        self.gevonden = set()  # De tot nu toe gevonden items (zonder `nummers`)
+        self._geannuleerd = threading.Event()
+        self._thread = threading.Thread(target=self._zoek, args=(stukken,), daemon=True)
+        self._thread.start()
+
+    def _zoek(self, stukken):
+        """Draait in de achtergrondthread."""
+        try:
+            for stuk in stukken:
+                if self._geannuleerd.is_set():
+                    return
+                self.resultaten.put(stuk)
+            self.resultaten.put(None)
+        except Exception as e:
+            self.resultaten.put(e)
+
+    def rijen(self, indices):
+        """
+        Geeft de rijen voor een stuk (oplopende) zoekresultaten.
+
+        De passende indexnummers tot en met het laatste resultaat worden ertussen
+        gevoegd, zodat de lijst op volgorde blijft. Een leeg stuk levert niets op: de
+        nummers kunnen nog vóór resultaten uit latere stukken horen.
+        """
+        if not indices:
+            return []
+        nummers = []
+        while self.nummers and self.nummers[0] <= indices[-1]:
+            nummers.append(self.nummers.popleft())
+        return sorted(set(indices).union(nummers))
+
+    def overige_rijen(self):
+        """Geeft na het laatste stuk de indexnummers die nog niet getoond zijn."""
+        nummers = list(self.nummers)
+        self.nummers.clear()
+        return nummers
+
+    def annuleer(self):
+        """Laat de thread stoppen; resultaten die al klaarstaan worden genegeerd."""
+        self._geannuleerd.set()
+
+
+class LadenGeannuleerd(Exception):
+    """Breekt het laden van een database af (zie `Laadtaak.annuleer`)."""
+
+
+class Laadtaak:
+    """
+    Het openen van een database in een achtergrondthread.
+
+    De thread maakt het TextDatabase-object met een `voortgang`-functie en zet de
+    meldingen in `berichten`: ("voortgang", gelezen, totaal, regels) met de
+    previews van de items die sinds de vorige melding zijn ingelezen, en tot slot
+    ("klaar", db) of ("fout", exceptie). De GUI haalt ze met `after` op en bewaart
+    de previews in `regels`, zodat de lijst al tijdens het laden gevuld wordt.
+    `annuleer()` breekt het laden af bij de volgende melding; daarna volgt niets meer.
+    """
+
+    def __init__(self, bestandsnaam, opties, bevestig=False):
+        self.bestandsnaam = bestandsnaam
+        self.bevestig = bevestig  # Na het laden een melding tonen (bij "Open...")
+        self.berichten = queue.Queue()
+        # Bijgewerkt door de GUI-thread: per ingelezen item de preview, en de gelezen en totale bytes
+        self.regels = []
+        self.gelezen = self.totaal = 0
+        self._geannuleerd = threading.Event()
+        self._thread = threading.Thread(target=self._laad, args=(opties,), daemon=True)
+        self._thread.start()
+
+    def _laad(self, opties):
+        """Draait in de achtergrondthread."""
+        try:
+            db = TextDatabase(self.bestandsnaam, voortgang=self._voortgang, **opties)
+        except LadenGeannuleerd:
+            return
+        except Exception as e:
+            self.berichten.put(("fout", e))
+            return
+        self.berichten.put(("klaar", db))
+
+    def _voortgang(self, gelezen, totaal, teksten):
+        if self._geannuleerd.is_set():
+            raise LadenGeannuleerd
+        # Dezelfde regel als `TextDatabase.preview`, die er pas na het laden is
+        regels = [tekst[:PREVIEW_BREEDTE].replace("\n", " ").strip() for tekst in teksten]
+        self.berichten.put(("voortgang", gelezen, totaal, regels))
+
+    def annuleer(self):
+        """Laat de thread stoppen; berichten die al klaarstaan worden genegeerd."""
+        self._geannuleerd.set()
+
+
+class VirtueleLijst(ttk.Frame):
+    """
+    Een lijst die alleen de zichtbare regels als Listbox-regels aanmaakt.
+
+    De lijst bevat rijen (indexnummers van de database): een range voor de hele
+    database, of een array('I') voor zoekresultaten (4 bytes per rij in plaats
+    van een Python-int per rij). `rij(positie)` geeft zo in O(1) het indexnummer
+    van een regel, zonder de tekst van de regel uit Tk terug te lezen. De tekst
+    van een regel wordt pas met `regel(rij)` opgevraagd als de regel in beeld
+    komt. Zo kost het tonen van een database met honderdduizenden items evenveel
+    als het tonen van een handvol. De binnenste `tk.Listbox` (`lijst`) toont alleen het venster op
+    de rijen; scrollen, selecteren en de toetsenbordnavigatie worden hier
+    afgehandeld, zodat de selectie ook buiten beeld behouden blijft.
+
+    De methodes volgen waar mogelijk `tk.Listbox` (`curselection`, `selection_set`,
+    `see`, `nearest`, `bbox`, ...), met posities in de hele lijst. `bind` koppelt
+    aan de binnenste Listbox; bij een selectie door de gebruiker volgt het event
+    `<<ListboxSelect>>`.
+    """
+
+    def __init__(self, master, regel, **kwargs):
+        super().__init__(master)
+        self._regel = regel
+        self._rijen = []
+        self._boven = 0  # De eerste rij in beeld
+        self._selectie = None  # De geselecteerde positie in de lijst
+        self._melding = None  # Tekst die getoond wordt als de lijst leeg is
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self._v_scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self._v_scrollbar.grid(row=0, column=1, sticky="ns")
+        h_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL)
+        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.lijst = tk.Listbox(
+            self, selectmode=tk.SINGLE, exportselection=False, xscrollcommand=h_scrollbar.set, **kwargs
+        )
+        self.lijst.grid(row=0, column=0, sticky="nsew")
+        h_scrollbar["command"] = self.lijst.xview
+        # Een schatting van de regelhoogte in pixels; na het tekenen wordt die gemeten
+        self._regelhoogte = tkfont.Font(root=self, font=self.lijst["font"]).metrics("linespace") + 1
+
+        # Vervang de standaard Listbox-bindingen (die alleen de zichtbare regels kennen)
+        # door die van deze lijst; bindingen via `bind` gaan daar nog aan vooraf.
+        tag = f"VirtueleLijst{id(self)}"
+        self.lijst.bindtags((str(self.lijst), tag, str(self.winfo_toplevel()), "all"))
+        self.lijst.bind_class(tag, "<Configure>", lambda event: self._teken())
+        self.lijst.bind_class(tag, "<Button-1>", self._on_klik)
+        self.lijst.bind_class(tag, "<MouseWheel>", self._on_wiel)
+        self.lijst.bind_class(tag, "<Button-4>", lambda event: self.yview_scroll(-3, "units"))
+        self.lijst.bind_class(tag, "<Button-5>", lambda event: self.yview_scroll(3, "units"))
+        for toets, stap in (("Up", -1), ("Down", 1), ("Prior", "pagina-"), ("Next", "pagina+")):
+            self.lijst.bind_class(tag, f"<{toets}>", lambda event, stap=stap: self._on_toets(stap))
+        self.lijst.bind_class(tag, "<Home>", lambda event: self._selecteer(0))
+        self.lijst.bind_class(tag, "<End>", lambda event: self._selecteer(len(self._rijen) - 1))
+
+    def bind(self, sequence=None, func=None, add=None):
+        """Koppelt een event aan de binnenste Listbox (waar de muis- en toetsevents binnenkomen)."""
+        return self.lijst.bind(sequence, func, add)
+
+    # --- De rijen ---
+
+    def zet_rijen(self, rijen):
+        """Toont `rijen` (een reeks indexnummers, bijvoorbeeld een range); de selectie vervalt."""
+        self._rijen = rijen
+        self._boven = 0
+        self._selectie = None
+        self._melding = None
+        self._teken()
+
+    def vervang_rijen(self, rijen, geselecteerd=None):
+        """
+        Vervangt de rijen zonder terug te scrollen, bijvoorbeeld na een wijziging in de database.
+
+        `geselecteerd` is de rij (het indexnummer) die daarna geselecteerd is, of None.
+        Alleen de regels in beeld worden opnieuw opgevraagd.
+        """
+        self._rijen = rijen
+        self._selectie = None if geselecteerd is None else self.positie_van(geselecteerd)
+        self._melding = None
+        self._teken()
+
+    def voeg_rijen_toe(self, rijen):
+        """Voegt rijen achteraan toe (de rijen moeten dan een array of list zijn, geen range)."""
+        self._rijen.extend(rijen)
+        self._teken()
+
+    def toon_melding(self, tekst):
+        """Maakt de lijst leeg en toont in plaats daarvan een (grijze) melding."""
+        self.zet_rijen(())
+        self._melding = tekst
+        self._teken()
+
+    def rij(self, positie):
+        """Geeft het indexnummer op een positie in de lijst, of None."""
+        if 0 <= positie < len(self._rijen):
+            return self._rijen[positie]
+        return None
+
+    @property
+    def rijen(self):
+        """De getoonde indexnummers (niet aanpassen; gebruik `zet_rijen` of `vervang_rijen`)."""
+        return self._rijen
+
+    def positie_van(self, index_nummer):
+        """Geeft de positie van een indexnummer in de lijst, of None; de rijen staan altijd op volgorde."""
+        positie = bisect.bisect_left(self._rijen, index_nummer)
+        if positie < len(self._rijen) and self._rijen[positie] == index_nummer:
+            return positie
+        return None
+
+    def size(self):
+        return len(self._rijen)
+
+    # --- Selectie ---
+
+    def curselection(self):
+        return () if self._selectie is None else (self._selectie,)
+
+    def selection_set(self, positie):
+        if 0 <= positie < len(self._rijen):
+            self._selectie = positie
+            self._teken()
+
+    def selection_clear(self, *args):
+        self._selectie = None
+        self._teken()
+
+    def activate(self, positie):
+        """Voor de compatibiliteit met Listbox: de actieve regel is hier altijd de geselecteerde."""
+
+    def _selecteer(self, positie):
+        """Selecteert een positie namens de gebruiker: in beeld brengen en `<<ListboxSelect>>` sturen."""
+        if not self._rijen:
+            return "break"
+        positie = max(0, min(positie, len(self._rijen) - 1))
+        if positie != self._selectie:
+            self._selectie = positie
+            self.see(positie)
+            self.lijst.event_generate("<<ListboxSelect>>")
+        return "break"
+
+    def _on_klik(self, event):
+        self.lijst.focus_set()
+        positie = self.nearest(event.y)
+        if positie != -1:
+            # Net als bij een Listbox volgt het event ook als de regel al geselecteerd was
+            self._selectie = positie
+            self.see(positie)
+            self.lijst.event_generate("<<ListboxSelect>>")
+
+    def _on_wiel(self, event):
+        # Windows geeft veelvouden van 120, macOS kleine stappen
+        stappen = max(1, abs(event.delta) // 120) * 3
+        self.yview_scroll(-stappen if event.delta > 0 else stappen, "units")
+
+    def _on_toets(self, stap):
+        if isinstance(stap, str):
+            stap = self._zichtbaar() if stap == "pagina+" else -self._zichtbaar()
+        if self._selectie is None:
+            return self._selecteer(self._boven)
+        return self._selecteer(self._selectie + stap)
+
+    # --- Scrollen en tekenen ---
+
+    def _zichtbaar(self):
+        """Het aantal regels dat volledig in beeld past."""
+        rand = 2 * (int(self.lijst["borderwidth"]) + int(self.lijst["highlightthickness"]))
+        return max(1, (self.lijst.winfo_height() - rand) // self._regelhoogte)
+
+    def _begrens(self, boven):
+        return max(0, min(boven, len(self._rijen) - self._zichtbaar()))
+
+    def see(self, positie):
+        zichtbaar = self._zichtbaar()
+        if positie < self._boven:
+            self._boven = positie
+        elif positie >= self._boven + zichtbaar:
+            self._boven = positie - zichtbaar + 1
+        self._teken()
+
+    def nearest(self, y):
+        """Geeft de positie (in de hele lijst) van de regel het dichtst bij `y`, of -1."""
+        if not self._rijen:
+            return -1
+        return min(self._boven + self.lijst.nearest(y), len(self._rijen) - 1)
+
+    def bbox(self, positie):
+        """Geeft de bbox van de regel op `positie` als die in beeld is, anders None."""
+        if positie < self._boven:
+            return None
+        return self.lijst.bbox(positie - self._boven)
+
+    def yview(self, *args):
+        """Het commando van de verticale scrollbar ("moveto" of "scroll")."""
+        match args:
+            case ("moveto", fractie):
+                self._boven = self._begrens(int(float(fractie) * len(self._rijen)))
+                self._teken()
+            case ("scroll", aantal, wat):
+                self.yview_scroll(int(aantal), wat)
+
+    def yview_scroll(self, aantal, wat):
+        if wat == "pages":
+            aantal *= self._zichtbaar()
+        self._boven = self._begrens(self._boven + aantal)
+        self._teken()
+
+    def _teken(self):
+        """Zet de regels die in beeld zijn in de Listbox en werkt de scrollbar bij."""
+        self.lijst.delete(0, tk.END)
+        if self._melding is not None:
+            self.lijst.insert(tk.END, self._melding)
+            self.lijst["fg"] = "gray"
+            self._v_scrollbar.set(0, 1)
+            return
+        self.lijst["fg"] = "black"
+        # Eén regel extra, voor een gedeeltelijk zichtbare regel onderaan
+        self._boven = self._begrens(self._boven)
+        tot = min(len(self._rijen), self._boven + self._zichtbaar() + 1)
+        for positie in range(self._boven, tot):
+            self.lijst.insert(tk.END, self._regel(self._rijen[positie]))
+        eerste, tweede = self.lijst.bbox(0), self.lijst.bbox(1)
+        if eerste and tweede:
+            self._regelhoogte = tweede[1] - eerste[1]
+        if self._selectie is not None and self._boven <= self._selectie < tot:
+            self.lijst.selection_set(self._selectie - self._boven)
+        if self._rijen:
+            self._v_scrollbar.set(self._boven / len(self._rijen), tot / len(self._rijen))
+        else:
+            self._v_scrollbar.set(0, 1)
+
+
+class IndexbouwGeannuleerd(Exception):
+    """Breekt het opbouwen van de zoekindexen af (zie `Indexbouw.annuleer`)."""
+
+
+class Indexbouw:
+    """
+    Het opbouwen van de zoekindexen in een achtergrondthread.
+
+    Bij een grote database duurt de eerste zoekopdracht seconden, omdat de
+    zoekindexen dan worden opgebouwd (zie `TextDatabase.zoekindex_bouwer`). De
+    thread zet ("voortgang", gedaan, totaal) in `berichten` en tot slot
+    ("klaar", installeer) of ("fout", exceptie); de GUI roept `installeer()` aan
+    en zoekt dan opnieuw. `annuleer()` breekt het opbouwen af bij de volgende
+    melding; daarna volgt niets meer.
+    """
+
+    def __init__(self, bouw):
+        self.berichten = queue.Queue()
+        self.gedaan, self.totaal = 0, 1  # Bijgewerkt door de GUI-thread
+        self._geannuleerd = threading.Event()
+        self._thread = threading.Thread(target=self._bouw, args=(bouw,), daemon=True)
+        self._thread.start()
+
+    def _bouw(self, bouw):
+        """Draait in de achtergrondthread."""
+        try:
+            installeer = bouw(self._voortgang)
+        except IndexbouwGeannuleerd:
+            return
+        except Exception as e:
+            self.berichten.put(("fout", e))
+            return
+        self.berichten.put(("klaar", installeer))
+
+    def _voortgang(self, gedaan, totaal):
+        if self._geannuleerd.is_set():
+            raise IndexbouwGeannuleerd
+        self.berichten.put(("voortgang", gedaan, totaal))
+
+    def annuleer(self):
+        """Laat de thread stoppen; berichten die al klaarstaan worden genegeerd."""
+        self._geannuleerd.set()
+
+
 class TekstDbGuiApp:
     """De Tkinter GUI voor de TekstDB bewerker."""
 
     DATABASE_FILETYPES = (
-        ("Databasebestanden", "*.txt *.TXT *.dat *.DAT"),
+        ("Databasebestanden", "*.txt *.TXT *.dat *.DAT *.tdbz *.TDBZ *.tdbb *.TDBB"),
         ("Tekstbestanden", "*.txt"),
         ("Alle bestanden", "*.*"),
     )
+    # Zoekopties voor de database: sneller zoeken midden in woorden, ten koste van geheugen. De
+    # trigram-index wordt pas bij de eerste zoekopdracht "Midden in woorden" opgebouwd; de
+    # casefold-cache staat uit, want met de index worden alleen de kandidaten doorzocht.
+    DATABASE_OPTIES = {"trigramindex": True}
+    # De (lege) database waarmee de GUI start, tot het opgegeven bestand geladen is.
+    NAAMLOZE_DATABASE = "naamloos.txt"
 
     def __init__(self, master, filepath=None):
         """Initialiseert de applicatie."""
         self.master = master
         master.geometry("800x600")  # Startgrootte (iets groter voor de preview)
 
-        # Variabele voor de zoekbalk
+        # Variabelen voor de zoekbalk
         self.search_var = tk.StringVar()
+        self.substring_var = tk.BooleanVar(value=False)  # Ook midden in woorden zoeken (zonder index)
         self.preview_text = None  # Placeholder voor de preview widget
+        self._preview_job = None  # Het inladen van het volgende stuk preview (zie `_laad_preview`)
         self._search_debounce_job = None  # Voor de zoek-debounce
+        self._zoektaak = None  # De lopende zoekopdracht (zie Zoektaak)
+        # (database, versie, substring, zoekterm, gevonden indices) van de vorige zoekopdracht
+        self._vorige_zoekopdracht = None
         # Variabelen voor drag-and-drop
         self._clipboard_item = None
         self._drag_source_index = None
         self._drop_indicator = None
+        self._laadtaak = None  # Het laden van een database (zie Laadtaak)
+        self._indexbouw = None  # Het opbouwen van de zoekindexen (zie Indexbouw)
 
         # --- Database initialisatie ---
+        # Het bestand wordt op de achtergrond geladen; tot dan is de database leeg.
         db_file = filepath or "mijn_tekstdatabase.txt"
-        self.db = TextDatabase(db_file)
-        self._update_title()
+        self.db = None
+        self._gebruik_database(TextDatabase(self.NAAMLOZE_DATABASE, create_new=True, **self.DATABASE_OPTIES))
 
         # Hoofdframe
         self.main_frame = ttk.Frame(master, padding="10")
@@ -119,18 +529,115 @@ class TekstDbGuiApp:
         self.status_bar = ttk.Label(master, text="", relief=tk.SUNKEN, anchor=tk.W, padding=2)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
+        # Voortgangsbalk voor het laden van een database (alleen zichtbaar tijdens het laden)
+        self.laad_frame = ttk.Frame(master, padding=(10, 0, 10, 5))
+        self.laad_balk = ttk.Progressbar(self.laad_frame, mode="determinate")
+        self.laad_balk.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(self.laad_frame, text="Annuleren", command=self.annuleer_laden).pack(side=tk.LEFT, padx=(5, 0))
+
         self.create_menu()
         self.create_widgets()
         self.bind_keys()
         # Laad de data in de lijst bij het opstarten
         self.refresh_item_list()
         self._update_ui_state()
+        self._laad_database(db_file)
+
+    def _gebruik_database(self, db):
+        """Maakt `db` de database van de GUI; de lijst volgt voortaan de wijzigingen ervan."""
+        if self.db is not None:
+            self.db.verwijder_luisteraar(self._on_db_wijziging)
+        if self._indexbouw is not None:
+            self._indexbouw.annuleer()
+            self._indexbouw = None
+        self.db = db
+        db.voeg_luisteraar_toe(self._on_db_wijziging)
 
     def _update_title(self):
         """Updates the window title with the current database filename."""
+        if self._laadtaak is not None:
+            self.master.title(f"TekstDB Bewerker - {self._laadtaak.bestandsnaam} (laden…)")
+            return
         dirty_marker = "*" if self.db.dirty else ""
         self.master.title(f"TekstDB Bewerker - {self.db.bestandsnaam}{dirty_marker}")
 
+    def _laad_database(self, bestandsnaam, bevestig=False):
+        """
+        Opent een database in een achtergrondthread (zie `Laadtaak`).
+
+        Tijdens het laden toont de lijst de items die al zijn ingelezen en geeft de
+        balk onderaan de voortgang in bytes. Bewerken en zoeken kan pas als het laden
+        klaar is; met "Annuleren" blijft de vorige database open.
+        """
+        if self._laadtaak is not None:
+            self._laadtaak.annuleer()
+        if self._zoektaak is not None:
+            self._zoektaak.annuleer()
+            self._zoektaak = None
+        taak = self._laadtaak = Laadtaak(bestandsnaam, self.DATABASE_OPTIES, bevestig)
+
+        self.search_var.set("")
+        self.laad_balk["value"] = 0
+        self.laad_frame.pack(side=tk.BOTTOM, fill=tk.X, before=self.main_frame)
+        self.item_listbox.zet_rijen(range(1, 1))
+        self._update_ui_state()
+        self._update_preview_pane()
+        self._verwerk_laadberichten(taak)
+
+    def _verwerk_laadberichten(self, taak):
+        """Toont de voortgang van het laden en de items die tot nu toe zijn ingelezen (via `after`)."""
+        if taak is not self._laadtaak:
+            return  # Geannuleerd
+        try:
+            while True:
+                match taak.berichten.get_nowait():
+                    case ("voortgang", gelezen, totaal, regels):
+                        taak.regels.extend(regels)
+                        taak.gelezen, taak.totaal = gelezen, totaal
+                        self.laad_balk.configure(maximum=max(totaal, 1), value=gelezen)
+                    case ("klaar", db):
+                        self._rond_laden_af(taak, db)
+                        return
+                    case ("fout", fout):
+                        self._rond_laden_af(taak, fout=fout)
+                        return
+        except queue.Empty:
+            pass
+        # De lijst groeit mee; de scrollpositie en selectie blijven staan
+        self.item_listbox.vervang_rijen(range(1, len(taak.regels) + 1), self._get_selected_index())
+        self._update_status_bar()
+        self.master.after(ZOEK_POLL_INTERVAL, self._verwerk_laadberichten, taak)
+
+    def _rond_laden_af(self, taak, db=None, fout=None):
+        """Neemt de geladen database in gebruik, of meldt waarom het laden mislukt is."""
+        self._laadtaak = None
+        self.laad_frame.pack_forget()
+        if db is not None:
+            self._gebruik_database(db)
+        self.refresh_item_list()
+        self._update_ui_state()
+        if fout is not None:
+            messagebox.showerror("Fout bij openen", f"Kon het bestand niet laden.\nFout: {fout}")
+        elif taak.bevestig:
+            messagebox.showinfo("Succes", f"Database '{taak.bestandsnaam}' succesvol geladen.")
+
+    def annuleer_laden(self):
+        """Breekt het laden van een database af; de vorige database blijft open."""
+        if self._laadtaak is None:
+            return
+        self._laadtaak.annuleer()
+        self._laadtaak = None
+        self.laad_frame.pack_forget()
+        self.refresh_item_list()
+        self._update_ui_state()
+
+    def _laden_bezig(self):
+        """Geeft True (met een piep) als er een database geladen wordt; de lijst toont dan nog niet `self.db`."""
+        if self._laadtaak is None:
+            return False
+        self.master.bell()
+        return True
+
     def create_menu(self):
         """Maakt de menubalk voor de applicatie."""
         menubar = tk.Menu(self.master)
@@ -205,38 +712,18 @@ class TekstDbGuiApp:
         # Gebruik debouncing voor live zoeken om UI-vertraging te voorkomen
         self.search_var.trace_add("write", self._on_search_change)
 
+        ttk.Checkbutton(
+            search_frame, text="Midden in woorden", variable=self.substring_var, command=self.perform_search
+        ).pack(side=tk.LEFT, padx=(5, 0))
         ttk.Button(search_frame, text="Wissen", command=self.clear_search).pack(side=tk.LEFT, padx=(5, 0))
 
         # --- PanedWindow voor een resizable scheiding tussen lijst en preview ---
         paned_window = ttk.PanedWindow(self.main_frame, orient=tk.VERTICAL)
         paned_window.pack(pady=5, padx=0, fill=tk.BOTH, expand=True, side=tk.TOP)
 
-        # --- Frame voor de lijst en scrollbar (bovenste paneel) ---
-        list_frame = ttk.Frame(paned_window)
-        paned_window.add(list_frame, weight=4)
-
-        # Configureer grid layout voor de list_frame om beide scrollbars te plaatsen
-        list_frame.grid_rowconfigure(0, weight=1)
-        list_frame.grid_columnconfigure(0, weight=1)
-
-        # Verticale Scrollbar
-        v_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
-
-        # Horizontale Scrollbar
-        h_scrollbar = ttk.Scrollbar(list_frame, orient=tk.HORIZONTAL)
-        h_scrollbar.grid(row=1, column=0, sticky="ew")
-
-        # Listbox voor de items
-        self.item_listbox = tk.Listbox(
-            list_frame,
-            selectmode=tk.SINGLE,
-            exportselection=False,
-            height=25,  # Stel een initiële hoogte in (in tekstregels)
-            yscrollcommand=v_scrollbar.set,
-            xscrollcommand=h_scrollbar.set,
-        )
-        self.item_listbox.grid(row=0, column=0, sticky="nsew")
+        # --- De lijst met items (bovenste paneel); alleen de zichtbare regels worden getoond ---
+        self.item_listbox = VirtueleLijst(paned_window, regel=self._lijstregel, height=25)
+        paned_window.add(self.item_listbox, weight=4)
 
         # --- Frame voor de preview (onderste paneel) ---
         preview_frame = ttk.Frame(paned_window)
@@ -254,9 +741,7 @@ class TekstDbGuiApp:
         )
         self.preview_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        # Koppel scrollbars aan widgets
-        v_scrollbar["command"] = self.item_listbox.yview
-        h_scrollbar["command"] = self.item_listbox.xview
+        # Koppel de scrollbar aan de preview
         preview_scrollbar["command"] = self.preview_text.yview  # pyright: ignore[reportOptionalMemberAccess]
 
         # Voeg dubbelklik-event toe om een item te wijzigen
@@ -264,10 +749,7 @@ class TekstDbGuiApp:
 
         # Update de knopstatus en preview wanneer de selectie verandert.
         # <<ListboxSelect>> wordt geactiveerd door zowel muisklikken als pijltjestoetsen.
-        # <<ListboxSelect>> wordt geactiveerd door zowel muisklikken als pijltjestoetsen.
         self.item_listbox.bind("<<ListboxSelect>>", self._on_selection_change)
-        self.item_listbox.bind("<KeyRelease-Up>", self._force_selection_on_arrow)
-        self.item_listbox.bind("<KeyRelease-Down>", self._force_selection_on_arrow)
 
     def bind_keys(self):
         """Bindt toetsen aan de commando's."""
@@ -297,40 +779,237 @@ class TekstDbGuiApp:
         # Zorgt ervoor dat de zoekbalk leeg is en de volledige lijst wordt getoond.
         self.clear_search()
 
-    def _populate_listbox(self, items_to_display):
-        """Hulpfunctie om de listbox te vullen met een gegeven set items."""
-        # Maak de lijst leeg
-        self.item_listbox.delete(0, tk.END)
+    def _populate_listbox(self, indices):
+        """
+        Hulpfunctie om de lijst te vullen met de items met de gegeven (oplopende) indexnummers.
+
+        `indices` mag een range zijn: de lijst vraagt alleen de teksten van de
+        regels op die in beeld zijn (zie `VirtueleLijst`).
+        """
+        if not indices:
+            self.item_listbox.toon_melding("Database is leeg. Gebruik 'Nieuw' om een item toe te voegen.")
+        else:
+            self.item_listbox.zet_rijen(indices)
+
+        self._update_button_states()
+        self._update_preview_pane()
+        self._update_status_bar()
+
+    def _on_db_wijziging(self, operatie, positie, waarde):
+        """
+        Werkt de lijst bij na een wijziging in de database (zie `TextDatabase.voeg_luisteraar_toe`).
+
+        De zoekopdracht wordt niet opnieuw uitgevoerd: het filter blijft staan en
+        alleen de indexnummers na de wijziging schuiven op. Een nieuw item wordt
+        altijd getoond en een gewijzigd item blijft staan, ook als het niet (meer)
+        aan de zoekterm voldoet. De regels zelf worden pas bij het tekenen opnieuw
+        opgevraagd, dus alleen voor de regels die in beeld zijn.
+        """
+        if self._zoektaak is not None or self._indexbouw is not None:
+            self.perform_search()  # De lopende zoekopdracht werkt nog met de oude posities
+            return
+        geselecteerd = self._get_selected_index()
+        if geselecteerd is not None:
+            geselecteerd = self._nieuwe_positie(geselecteerd, operatie, positie, waarde)
 
-        if not items_to_display:
-            self.item_listbox.insert(tk.END, "Database is leeg. Gebruik 'Nieuw' om een item toe te voegen.")
-            self.item_listbox["fg"] = "gray"  # Maak de tekst grijs
+        rijen = self.item_listbox.rijen
+        if isinstance(rijen, range) or not self.search_var.get():
+            rijen = range(1, len(self.db) + 1)
         else:
-            self.item_listbox["fg"] = "black"  # Zet de kleur terug naar standaard
-            # Sorteer op index en vul de lijst
-            for index, tekst in sorted(items_to_display.items()):
-                preview = tekst.replace("\n", " ").strip()
-                self.item_listbox.insert(tk.END, f"{index: >3}: {preview}")
+            rijen = self._verschuif_rijen(array("I", rijen), operatie, positie, waarde)
 
+        if not rijen:
+            self._populate_listbox(rijen)
+            return
+        self.item_listbox.vervang_rijen(rijen, geselecteerd)
         self._update_button_states()
         self._update_preview_pane()
         self._update_status_bar()
 
+    @staticmethod
+    def _nieuwe_positie(index_nummer, operatie, positie, waarde):
+        """Geeft het indexnummer van een item na een wijziging in de database, of None als het verwijderd is."""
+        match operatie:
+            case "voeg_in" if index_nummer >= positie:
+                return index_nummer + waarde
+            case "verwijder" if index_nummer >= positie:
+                return None if index_nummer < positie + waarde else index_nummer - waarde
+            case "verplaats":
+                if index_nummer == positie:
+                    return waarde
+                if positie < index_nummer <= waarde:
+                    return index_nummer - 1
+                if waarde <= index_nummer < positie:
+                    return index_nummer + 1
+        return index_nummer
+
+    @classmethod
+    def _verschuif_rijen(cls, rijen, operatie, positie, waarde):
+        """Past een oplopende array('I') indexnummers aan na een wijziging; alleen het deel erna wordt herschreven."""
+        match operatie:
+            case "voeg_in":
+                begin = bisect.bisect_left(rijen, positie)
+                rijen[begin:] = array(
+                    "I", [*range(positie, positie + waarde), *(rij + waarde for rij in rijen[begin:])]
+                )
+            case "verwijder":
+                begin = bisect.bisect_left(rijen, positie)
+                eind = bisect.bisect_left(rijen, positie + waarde)
+                rijen[begin:] = array("I", (rij - waarde for rij in rijen[eind:]))
+            case "verplaats":
+                # Alleen de items tussen de oude en de nieuwe positie schuiven op
+                begin = bisect.bisect_left(rijen, min(positie, waarde))
+                eind = bisect.bisect_right(rijen, max(positie, waarde))
+                rijen[begin:eind] = array(
+                    "I", sorted(cls._nieuwe_positie(rij, operatie, positie, waarde) for rij in rijen[begin:eind])
+                )
+        return rijen
+
+    def _selecteer_item(self, index_nummer):
+        """Selecteert het item met `index_nummer` (als het in de lijst staat) en brengt het in beeld."""
+        positie = self.item_listbox.positie_van(index_nummer)
+        if positie is not None:
+            self.item_listbox.selection_set(positie)
+            self.item_listbox.see(positie)
+        self._perform_selection_update()
+
+    def _lijstregel(self, index):
+        """Geeft de regel voor een item in de lijst: het indexnummer en het begin van de tekst op één regel."""
+        if self._laadtaak is not None:
+            return f"{index: >3}: {self._laadtaak.regels[index - 1]}"
+        return f"{index: >3}: {self.db.preview(index)}"
+
     def perform_search(self, *args):
-        """Filtert de lijst op basis van de zoekterm in de tekst of het indexnummer."""
+        """
+        Filtert de lijst op basis van de zoekterm in de tekst of het indexnummer.
+
+        De woorden uit de zoekterm worden via de woordindex van de database gezocht
+        als woordbegin ("data" vindt ook "database"), zodat zoeken niet meer elke
+        tekst doorloopt. Met "Midden in woorden" wordt, zoals vroeger, op de
+        letterlijke zoekterm gezocht; de trigram-index van de database beperkt dan
+        de teksten die doorzocht worden. Die index wordt pas bij de eerste zo'n
+        zoekopdracht opgebouwd.
+
+        Is de zoekterm een verlenging van de vorige (bijvoorbeeld "afs" -> "afsp"), dan
+        worden alleen de resultaten van de vorige zoekopdracht opnieuw doorzocht. Na
+        een wijziging van de database (zie `TextDatabase.versie`) wordt weer alles doorzocht.
+
+        Het doorzoeken zelf gebeurt in een achtergrondthread (zie `Zoektaak`); de
+        resultaten verschijnen stukje bij beetje in de lijst. Een nieuwe zoekopdracht
+        annuleert de lopende. Ontbreken er zoekindexen, dan worden die eerst in een
+        achtergrondthread opgebouwd (zie `Indexbouw`), met de voortgang in de
+        statusbalk; daarna wordt met de zoekterm van dat moment gezocht.
+        """
+        if self._zoektaak is not None:
+            self._zoektaak.annuleer()
+            self._zoektaak = None
+        if self._laadtaak is not None:
+            return  # Na het laden wordt de lijst opnieuw gevuld
         search_term = self.search_var.get()
 
         if not search_term:
-            items_to_show = self.db.data
+            self._vorige_zoekopdracht = None
+            self._populate_listbox(range(1, len(self.db) + 1))
+            return
+
+        if self._indexbouw is not None:
+            self._update_status_bar()
+            return  # Als de indexen klaar zijn, wordt er opnieuw gezocht
+        substring = self.substring_var.get()
+        binnen = self._vorige_resultaten(search_term, substring)
+        if (bouw := self.db.zoekindex_bouwer(search_term, substring, binnen)) is not None:
+            taak = self._indexbouw = Indexbouw(bouw)
+            self.item_listbox.zet_rijen(array("I"))
+            self._update_button_states()
+            self._update_preview_pane()
+            self._update_status_bar()
+            self._verwerk_indexberichten(taak)
+            return
+        stukken = self.db.zoek_per_stuk(search_term, substring=substring, binnen=binnen)
+        nummers = self._indices_met_begin(search_term.strip(), len(self.db))
+        taak = self._zoektaak = Zoektaak(stukken, nummers, (self.db, self.db.versie, substring, search_term))
+
+        self.item_listbox.zet_rijen(array("I"))
+        self._update_button_states()
+        self._update_preview_pane()
+        self._update_status_bar()
+        self._verwerk_zoekresultaten(taak)
+
+    def _verwerk_zoekresultaten(self, taak):
+        """Zet de resultaten die de zoekthread tot nu toe heeft gevonden in de lijst (via `after`)."""
+        if taak is not self._zoektaak:
+            return  # Geannuleerd
+        try:
+            while True:
+                stuk = taak.resultaten.get_nowait()
+                if stuk is None or isinstance(stuk, Exception):
+                    self._rond_zoekopdracht_af(taak, stuk)
+                    return
+                taak.gevonden.update(stuk)
+                if rijen := taak.rijen(stuk):
+                    self.item_listbox.voeg_rijen_toe(rijen)
+        except queue.Empty:
+            self.master.after(ZOEK_POLL_INTERVAL, self._verwerk_zoekresultaten, taak)
+
+    def _rond_zoekopdracht_af(self, taak, fout):
+        """Verwerkt het einde van een zoekopdracht: de laatste resultaten, de cache en de statusbalk."""
+        self._zoektaak = None
+        if fout is not None:
+            self._update_status_bar()
+            self.status_bar["text"] += f"  |  Zoeken mislukt: {fout}"
+            return
+        self.item_listbox.voeg_rijen_toe(taak.overige_rijen())
+        self._vorige_zoekopdracht = (*taak.zoekopdracht, frozenset(taak.gevonden))
+        if self.item_listbox.size() == 0:
+            self._populate_listbox([])
         else:
-            search_term_lower = search_term.lower()
-            items_to_show = {
-                index: text
-                for index, text in self.db.data.items()
-                if search_term_lower in text.lower() or str(index).startswith(search_term)
-            }
+            self._update_button_states()
+            self._update_status_bar()
+
+    def _verwerk_indexberichten(self, taak):
+        """Toont de voortgang van het opbouwen van de zoekindexen en zoekt als ze klaar zijn (via `after`)."""
+        if taak is not self._indexbouw:
+            return  # Geannuleerd
+        try:
+            while True:
+                match taak.berichten.get_nowait():
+                    case ("voortgang", gedaan, totaal):
+                        taak.gedaan, taak.totaal = gedaan, totaal
+                    case ("klaar", installeer):
+                        self._indexbouw = None
+                        # Is de database intussen gewijzigd, dan bouwt de volgende zoekopdracht opnieuw
+                        installeer()
+                        if self.search_var.get():
+                            self.perform_search()
+                        return
+                    case ("fout", fout):
+                        self._indexbouw = None
+                        self._update_status_bar()
+                        self.status_bar["text"] += f"  |  Zoekindex opbouwen mislukt: {fout}"
+                        return
+        except queue.Empty:
+            pass
+        self._update_status_bar()
+        self.master.after(ZOEK_POLL_INTERVAL, self._verwerk_indexberichten, taak)
 
-        self._populate_listbox(items_to_show)
+    def _vorige_resultaten(self, search_term, substring):
+        """Geeft de resultaten van de vorige zoekopdracht als `search_term` daar een verlenging van is, anders None."""
+        if self._vorige_zoekopdracht is None:
+            return None
+        db, versie, vorige_substring, vorige_term, gevonden = self._vorige_zoekopdracht
+        if db is not self.db or versie != self.db.versie or vorige_substring != substring:
+            return None  # De database is gewijzigd of er wordt anders gezocht
+        return gevonden if search_term.startswith(vorige_term) else None
+
+    @staticmethod
+    def _indices_met_begin(begin, aantal_items):
+        """Geeft de indexnummers (1 t/m aantal_items) die met de cijfers in `begin` beginnen."""
+        if not begin.isdecimal() or not begin.isascii() or begin.startswith("0"):
+            return
+        eerste, breedte = int(begin), 1
+        while eerste <= aantal_items:
+            yield from range(eerste, min(eerste + breedte, aantal_items + 1))
+            eerste, breedte = eerste * 10, breedte * 10
 
     def _on_search_change(self, *args):
         """
@@ -348,50 +1027,11 @@ class TekstDbGuiApp:
         selection = self.item_listbox.curselection()
         if not selection:
             return None
-
-        selected_line = self.item_listbox.get(selection[0])
-        try:
-            # De lijn is opgebouwd als "   1: Preview van de tekst..."
-            index_str = selected_line.split(":")[0].strip()
-            return int(index_str)
-        except (ValueError, IndexError):
-            return None  # Mocht er iets misgaan met de parsing
+        return self.item_listbox.rij(selection[0])
 
     def _get_db_index_from_list_index(self, list_index):
         """Haalt het database-indexnummer op van een item op een gegeven listbox-index."""
-        if list_index < 0 or list_index >= self.item_listbox.size():
-            return None
-        line = self.item_listbox.get(list_index)
-        try:
-            index_str = line.split(":", 1)[0].strip()
-            return int(index_str)
-        except (ValueError, IndexError):
-            return None
-
-    def _force_selection_on_arrow(self, event=None):
-        """
-        Werkt de selectie bij om overeen te komen met het actieve item (focus met stippellijn).
-
-        Dit wordt aangeroepen na een pijltjestoets-event. De standaard `Listbox`
-        verandert alleen het 'actieve' item, niet de 'selectie'. Deze methode
-        synchroniseert de twee, wat er vervolgens voor zorgt dat het
-        `<<ListboxSelect>>` event wordt geactiveerd.
-        """
-        try:
-            # Haal de index op van het item dat de focus heeft (stippellijn)
-            active_index = self.item_listbox.index(tk.ACTIVE)
-            current_selection = self.item_listbox.curselection()
-
-            # Voer alleen uit als de selectie niet al overeenkomt met het actieve item
-            if not current_selection or current_selection[0] != active_index:
-                self.item_listbox.selection_clear(0, tk.END)
-                self.item_listbox.selection_set(active_index)
-                # Genereer het event handmatig om de update-keten te starten
-                self.item_listbox.event_generate("<<ListboxSelect>>")
-
-        except tk.TclError:
-            # Dit kan gebeuren als er geen items in de lijst zijn of geen actief item is.
-            pass
+        return self.item_listbox.rij(list_index)
 
     def _on_selection_change(self, event=None):
         """
@@ -411,23 +1051,44 @@ class TekstDbGuiApp:
         self._update_preview_pane()
 
     def _update_preview_pane(self):
-        """Werkt het preview-paneel bij met de tekst van het geselecteerde item."""
+        """
+        Werkt het preview-paneel bij met de tekst van het geselecteerde item.
+
+        Een lange tekst wordt in stukken van PREVIEW_STUK_GROOTTE tekens ingeladen
+        (zie `_laad_preview`), zodat bladeren met de pijltjestoetsen langs items van
+        vele megabytes het venster niet blokkeert. Het inladen van de vorige
+        selectie wordt hier afgebroken.
+        """
+        if self._preview_job is not None:
+            self.master.after_cancel(self._preview_job)
+            self._preview_job = None
+
         # Maak de preview eerst leeg
         self.preview_text["state"] = tk.NORMAL  # pyright: ignore[reportOptionalSubscript]
         self.preview_text.delete("1.0", tk.END)  # pyright: ignore[reportOptionalMemberAccess]
+        # Maak het tekstveld weer read-only om onbedoelde wijzigingen te voorkomen
+        self.preview_text["state"] = tk.DISABLED  # pyright: ignore[reportOptionalSubscript]
 
         index_nummer = self._get_selected_index()
-        if index_nummer:
+        if index_nummer and self._laadtaak is None:
             tekst = self.db.get_tekst(index_nummer)
-            if tekst is not None:
-                self.preview_text.insert(tk.END, tekst)  # pyright: ignore[reportOptionalMemberAccess]
+            if tekst:
+                self._laad_preview(tekst, 0)
 
-        # Maak het tekstveld weer read-only om onbedoelde wijzigingen te voorkomen
+    def _laad_preview(self, tekst, begin):
+        """Voegt het stuk van `tekst` vanaf `begin` toe aan het preview-paneel en plant het volgende stuk in."""
+        self._preview_job = None
+        eind = begin + PREVIEW_STUK_GROOTTE
+        self.preview_text["state"] = tk.NORMAL  # pyright: ignore[reportOptionalSubscript]
+        self.preview_text.insert(tk.END, tekst[begin:eind])  # pyright: ignore[reportOptionalMemberAccess]
         self.preview_text["state"] = tk.DISABLED  # pyright: ignore[reportOptionalSubscript]
+        if eind < len(tekst):
+            # `after` in plaats van `after_idle`: zo komen toets- en muisevents er tussendoor
+            self._preview_job = self.master.after(1, self._laad_preview, tekst, eind)
 
     def _update_button_states(self, event=None):
         """Updates de status van knoppen en menu-items op basis van de selectie."""
-        if self.item_listbox.curselection():
+        if self.item_listbox.curselection() and self._laadtaak is None:
             new_state = tk.NORMAL
         else:
             new_state = tk.DISABLED
@@ -442,8 +1103,21 @@ class TekstDbGuiApp:
 
     def _update_status_bar(self):
         """Updates de tekst in de statusbalk."""
+        if self._laadtaak is not None:
+            taak = self._laadtaak
+            self.status_bar["text"] = (
+                f"  Laden: {len(taak.regels)} items ({taak.gelezen / 1e6:.1f} van {taak.totaal / 1e6:.1f} MB)"
+            )
+            return
         aantal_items = len(self.db.data)
         status_text = f"  Totaal: {aantal_items} items"
+        if self._indexbouw is not None:
+            status_text += f"  |  Zoekindex opbouwen… {100 * self._indexbouw.gedaan // self._indexbouw.totaal}%"
+        if self._zoektaak is not None:
+            status_text += "  |  Zoeken…"
+        if self.search_var.get().strip() and not self.substring_var.get():
+            # Vroeger vond de zoekbalk ook stukken midden in woorden; maak het verschil zichtbaar
+            status_text += "  |  Gezocht op woordbegin; 'Midden in woorden' zoekt overal in de tekst"
         self.status_bar["text"] = status_text
 
     def focus_search(self, event=None):
@@ -472,10 +1146,11 @@ class TekstDbGuiApp:
         if not filepath:
             return  # Gebruiker heeft geannuleerd
 
+        self.annuleer_laden()
         try:
             # Maak een nieuw, leeg database object aan.
             # Het bestand zelf wordt pas aangemaakt bij de eerste schrijf-actie.
-            self.db = TextDatabase(filepath, create_new=True)
+            self._gebruik_database(TextDatabase(filepath, create_new=True, **self.DATABASE_OPTIES))
             self._update_title()
             self.refresh_item_list()  # Toont de lege staat in de GUI
 
@@ -497,12 +1172,7 @@ class TekstDbGuiApp:
         if not filepath:
             return  # Gebruiker heeft geannuleerd
 
-        try:
-            self.db = TextDatabase(filepath)
-            self.refresh_item_list()
-            messagebox.showinfo("Succes", f"Database '{filepath}' succesvol geladen.")
-        except Exception as e:
-            messagebox.showerror("Fout bij openen", f"Kon het bestand niet laden.\nFout: {e}")
+        self._laad_database(filepath, bevestig=True)
 
     def save_database(self):
         """Slaat de huidige database op naar het huidige bestand."""
@@ -535,13 +1205,16 @@ class TekstDbGuiApp:
 
     def nieuw_item(self):
         """Opent een dialoogvenster om een nieuw item toe te voegen."""
+        if self._laden_bezig():
+            return
         dialog = TextEntryDialog(self.master, title="Nieuw Item", prompt="Voer de nieuwe tekst in:")
         nieuwe_tekst = dialog.result
 
         if nieuwe_tekst:  # Controleer of er tekst is ingevoerd
             if self.db.voeg_tekst_toe(nieuwe_tekst):
                 messagebox.showinfo("Succes", "Nieuw item succesvol toegevoegd.")
-                self.refresh_item_list()
+                # De lijst is al bijgewerkt (zie `_on_db_wijziging`)
+                self._selecteer_item(len(self.db))
                 self._update_ui_state()
             else:
                 messagebox.showerror("Fout", "Kon het nieuwe item niet opslaan in het bestand.")
@@ -549,6 +1222,8 @@ class TekstDbGuiApp:
 
     def wijzig_item(self):
         """Opent een dialoogvenster om een geselecteerd item te wijzigen."""
+        if self._laden_bezig():
+            return
         index_nummer = self._get_selected_index()
         if index_nummer is None:
             messagebox.showwarning("Geen selectie", "Selecteer eerst een item om te wijzigen.")
@@ -579,13 +1254,14 @@ class TekstDbGuiApp:
 
         if self.db.wijzig_tekst(index_nummer, nieuwe_tekst):
             messagebox.showinfo("Succes", f"Item {index_nummer} succesvol gewijzigd.")
-            self.refresh_item_list()
             self._update_ui_state()
         else:
             messagebox.showerror("Fout", f"Kon item {index_nummer} niet wijzigen.")
 
     def verwijder_item(self):
         """Verwijdert het geselecteerde item na bevestiging."""
+        if self._laden_bezig():
+            return
         index_nummer = self._get_selected_index()
         if index_nummer is None:
             messagebox.showwarning("Geen selectie", "Selecteer eerst een item om te verwijderen.")
@@ -601,13 +1277,14 @@ class TekstDbGuiApp:
                 messagebox.showinfo(
                     "Succes", f"Item {index_nummer} succesvol verwijderd.\nDe database is geherindexeerd."
                 )
-                self.refresh_item_list()
                 self._update_ui_state()
             else:
                 messagebox.showerror("Fout", f"Kon item {index_nummer} niet verwijderen.")
 
     def cut_item(self, event=None):
         """Knipt het geselecteerde item naar het klembord."""
+        if self._laden_bezig():
+            return
         index_nummer = self._get_selected_index()
         if index_nummer is None:
             return
@@ -618,7 +1295,6 @@ class TekstDbGuiApp:
 
         # Verwijder het item uit de database
         if self.db.verwijder_tekst(index_nummer):
-            self.refresh_item_list()
             self._update_ui_state()
         else:
             # Dit zou niet moeten gebeuren als we net de index hebben gekregen
@@ -628,6 +1304,8 @@ class TekstDbGuiApp:
 
     def paste_item(self, event=None):
         """Plakt het geknipte item op de geselecteerde positie."""
+        if self._laden_bezig():
+            return
         if not self._clipboard_item:
             return
 
@@ -645,15 +1323,15 @@ class TekstDbGuiApp:
         tekst_to_paste = self._clipboard_item["text"]
         if self.db.voeg_tekst_op_index_toe(dest_db_index, tekst_to_paste):
             self._clipboard_item = None  # Maak klembord leeg na plakken
-            self.refresh_item_list()
-            self.item_listbox.selection_set(dest_db_index - 1)
-            self.item_listbox.see(dest_db_index - 1)
+            self._selecteer_item(dest_db_index)
             self._update_ui_state()
         else:
             messagebox.showerror("Fout", "Kon het item niet plakken.")
 
     def _on_drag_start(self, event):
         """Start van een drag-and-drop operatie."""
+        if self._laadtaak is not None:
+            return  # Tijdens het laden kan alleen geselecteerd worden
         list_index = self.item_listbox.nearest(event.y)
         if list_index != -1:
             self._drag_source_index = list_index
@@ -666,6 +1344,12 @@ class TekstDbGuiApp:
         if self._drag_source_index is None:
             return
 
+        # Scroll mee als er boven of onder de lijst wordt gesleept
+        if event.y < 0:
+            self.item_listbox.yview_scroll(-1, "units")
+        elif event.y > self.item_listbox.lijst.winfo_height():
+            self.item_listbox.yview_scroll(1, "units")
+
         dest_list_index = self.item_listbox.nearest(event.y)
         if dest_list_index == -1:
             if self._drop_indicator:
@@ -673,7 +1357,7 @@ class TekstDbGuiApp:
             return
 
         if not self._drop_indicator:
-            self._drop_indicator = tk.Frame(self.item_listbox, height=2, bg="blue", relief=tk.SOLID)
+            self._drop_indicator = tk.Frame(self.item_listbox.lijst, height=2, bg="blue", relief=tk.SOLID)
 
         item_bbox = self.item_listbox.bbox(dest_list_index)
         if item_bbox:
@@ -682,7 +1366,7 @@ class TekstDbGuiApp:
             if event.y > midpoint:
                 indicator_y += item_bbox[3]
 
-            self._drop_indicator.place(x=0, y=indicator_y - 1, width=self.item_listbox.winfo_width(), height=2)
+            self._drop_indicator.place(x=0, y=indicator_y - 1, width=self.item_listbox.lijst.winfo_width(), height=2)
 
     def _on_drag_release(self, event):
         """Handelt het loslaten van de muisknop na drag-and-drop af."""
@@ -709,18 +1393,19 @@ class TekstDbGuiApp:
         if item_bbox and event.y > (item_bbox[1] + item_bbox[3] / 2):
             final_list_index += 1
 
-        # Corrigeer de doel-index voor de `pop` operatie in `move_item`
+        # Bepaal de nieuwe positie in de database. Met een zoekfilter liggen de regels
+        # niet naast elkaar in de database: het item komt dan direct na (omlaag slepen)
+        # of direct voor (omhoog slepen) het item op de doelregel.
         if source_list_index < final_list_index:
-            target_insert_index = final_list_index - 1
+            dest_db_index = self._get_db_index_from_list_index(final_list_index - 1)
         else:
-            target_insert_index = final_list_index
-
-        dest_db_index = target_insert_index + 1
+            dest_db_index = self._get_db_index_from_list_index(final_list_index)
+        if dest_db_index is None or dest_db_index == source_db_index:
+            return
 
+        # De lijst wordt door `_on_db_wijziging` bijgewerkt, met het filter en de selectie
         if self.db.move_item(source_db_index, dest_db_index):
-            self.refresh_item_list()
-            self.item_listbox.selection_set(target_insert_index)
-            self.item_listbox.see(target_insert_index)
+            self._selecteer_item(dest_db_index)
             self._update_ui_state()
 
     def sluit_applicatie(self):
@@ -758,6 +1443,7 @@ class TekstDbGuiApp:
         self._update_title()
         self._update_status_bar()
         self._update_button_states()
+        self.btn_nieuw["state"] = tk.DISABLED if self._laadtaak is not None else tk.NORMAL
         paste_state = tk.NORMAL if self._clipboard_item else tk.DISABLED
         self.edit_menu.entryconfig("Plakken", state=paste_state)
 
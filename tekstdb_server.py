@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Een server die één geladen TextDatabase deelt met veel korte clients.
+
+Het laden van een grote database kost seconden; een server doet dat één keer en
+beantwoordt daarna de vragen van clients via een Unix-socket of via TCP op
+localhost. Een `TekstDbClient` houdt zijn verbinding open, zodat een opzoeking
+niet meer kost dan één heen-en-weer over de socket.
+
+Starten:
+    python -m database serve db.txt                  (Unix-socket db.txt.sock)
+    python -m database serve db.txt --poort 7337     (TCP op 127.0.0.1)
+
+Het protocol is JSON per regel. Een verzoek is {"id": 1, "op": "get_tekst",
+"args": [5]}, het antwoord {"id": 1, "ok": true, "resultaat": "..."} of
+{"id": 1, "ok": false, "fout": "..."}. De operaties hebben de namen van de
+methodes van `TextDatabase` (zie `LEES_OPERATIES` en `SCHRIJF_OPERATIES`), plus
+"len" en "teksten" (een reeks items in één antwoord).
+
+Voorbeeld:
+    with TekstDbClient("db.txt.sock") as db:
+        print(len(db), db.get_tekst(1))
+        db.voeg_tekst_toe("Nieuwe tekst")
+        db.save()
+
+Antwoorden op leesvragen worden bewaard tot de database verandert, zodat
+dezelfde vraag van veel clients maar één keer wordt uitgerekend. Wijzigingen die
+bij het stoppen van de server nog niet zijn opgeslagen, worden dan opgeslagen.
+"""
+
+import argparse
+import asyncio
+import collections
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+
+from async_database import AsyncTextDatabase
+from database import PREVIEW_BREEDTE
+
+STANDAARD_HOST = "127.0.0.1"
+STANDAARD_POORT = 7337
+# De langste regel (verzoek of antwoord) die de server accepteert: een tekst moet er in één keer in passen
+MAX_REGEL_BYTES = 1 << 28
+# Het aantal bytes aan bewaarde antwoorden op leesvragen
+CACHE_BYTES = 64 << 20
+
+LEES_OPERATIES = {"len", "get_tekst", "teksten", "preview", "zoek"}
+# Per schrijfoperatie de types van de argumenten. Ze worden gecontroleerd vóórdat de
+# database iets wijzigt: een getal als tekst zou bijvoorbeeld het opslaan laten mislukken.
+SCHRIJF_OPERATIES = {
+    "voeg_tekst_toe": (str,),
+    "voeg_tekst_op_index_toe": (int, str),
+    "wijzig_tekst": (int, str),
+    "verwijder_tekst": (int,),
+    "move_item": (int, int),
+    "voeg_teksten_toe": (list,),
+    "apply_operations": (list,),
+    "save": (),
+    "checkpoint": (),
+}
+
+
+class ServerFout(Exception):
+    """Een fout die de server voor een verzoek heeft teruggegeven."""
+
+
+def standaard_adres(bestandsnaam):
+    """Een Unix-socket naast de database, of TCP op localhost waar Unix-sockets ontbreken."""
+    return f"{bestandsnaam}.sock" if hasattr(socket, "AF_UNIX") else STANDAARD_POORT
+
+
+def _tcp_adres(adres):
+    """Een poortnummer of een (host, poort)-paar als (host, poort)."""
+    return (STANDAARD_HOST, adres) if isinstance(adres, int) else tuple(adres)
+
+
+def _codeer(waarde):
+    """Zet een waarde om naar compacte JSON-bytes."""
+    return json.dumps(waarde, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class TekstDbServer:
+    """
+    Beantwoordt verzoeken van clients voor één `AsyncTextDatabase`.
+
+    Elke verbinding krijgt zijn eigen taak; de verzoeken van één verbinding worden
+    op volgorde beantwoord. Het lees-schrijfslot van `AsyncTextDatabase` houdt de
+    database consistent tussen verbindingen.
+    """
+
+    def __init__(self, adb, cache_bytes=CACHE_BYTES):
+        """
+        Args:
+            adb (AsyncTextDatabase): De database die de server deelt.
+            cache_bytes (int): Het aantal bytes aan bewaarde antwoorden; 0 zet het bewaren uit.
+        """
+        self.adb = adb
+        self._cache = collections.OrderedDict()
+        self._cache_bytes = 0
+        self._cache_max = cache_bytes
+        self._cache_versie = adb.db.versie
+        self._server = None
+        self._verbindingen = set()
+
+    async def start(self, adres):
+        """
+        Begint te luisteren op `adres` en geeft de `asyncio.Server` terug.
+
+        Args:
+            adres: Het pad van een Unix-socket (str), een poort op localhost (int)
+                   of een (host, poort)-paar.
+
+        Raises:
+            OSError: Als het adres in gebruik is, ook door een andere server op dezelfde socket.
+        """
+        if not isinstance(adres, str):
+            self._server = await asyncio.start_server(
+                self.verwerk_verbinding, *_tcp_adres(adres), limit=MAX_REGEL_BYTES
+            )
+            return self._server
+        # asyncio verwijdert een bestaande socket zonder te vragen; een draaiende server laten we staan
+        with socket.socket(socket.AF_UNIX) as proef:
+            try:
+                proef.connect(adres)
+            except OSError:
+                pass
+            else:
+                raise OSError(f"Er luistert al een server op '{adres}'.")
+        self._server = await asyncio.start_unix_server(self.verwerk_verbinding, adres, limit=MAX_REGEL_BYTES)
+        return self._server
+
+    @property
+    def adres(self):
+        """Het adres waarop de server luistert, met de gekozen poort bij poort 0; None als hij niet luistert."""
+        if self._server is None or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()
+
+    def stop(self):
+        """Stopt met luisteren en sluit alle verbindingen; `asyncio.Server.wait_closed()` eindigt daarna."""
+        if self._server is not None:
+            self._server.close()
+        for writer in self._verbindingen:
+            writer.close()
+
+    async def verwerk_verbinding(self, reader, writer):
+        """Beantwoordt de verzoeken van één client tot die de verbinding sluit."""
+        self._verbindingen.add(writer)
+        try:
+            while regel := await reader.readline():
+                writer.write(await self.verwerk_regel(regel))
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            # ValueError: een regel langer dan MAX_REGEL_BYTES
+            logging.warning("Verbinding met client verbroken: %s", e)
+        finally:
+            self._verbindingen.discard(writer)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def verwerk_regel(self, regel):
+        """Voert één verzoek uit en geeft de antwoordregel terug (als bytes, met newline)."""
+        try:
+            verzoek = json.loads(regel)
+            verzoek_id = verzoek.get("id")
+            op, args = verzoek["op"], verzoek.get("args", [])
+            if not isinstance(args, list):
+                raise TypeError("'args' moet een lijst zijn.")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return _codeer({"id": None, "ok": False, "fout": f"Ongeldig verzoek: {e}"}) + b"\n"
+        try:
+            resultaat = await self._voer_uit(op, args)
+        except Exception as e:  # Een fout in één verzoek mag de server niet stoppen
+            return _codeer({"id": verzoek_id, "ok": False, "fout": f"{type(e).__name__}: {e}"}) + b"\n"
+        return b'{"id":' + _codeer(verzoek_id) + b',"ok":true,"resultaat":' + resultaat + b"}\n"
+
+    async def _voer_uit(self, op, args):
+        """Voert een operatie uit en geeft het resultaat als JSON-bytes terug."""
+        if op in SCHRIJF_OPERATIES:
+            _controleer_argumenten(op, args)
+            return _codeer(await getattr(self.adb, op)(*args))
+        if op not in LEES_OPERATIES:
+            raise ValueError(f"Onbekende operatie: {op!r}")
+        versie = self.adb.db.versie
+        if versie != self._cache_versie:
+            self._cache.clear()
+            self._cache_bytes = 0
+            self._cache_versie = versie
+        sleutel = (op, _codeer(args))
+        if (resultaat := self._cache.get(sleutel)) is not None:
+            self._cache.move_to_end(sleutel)
+            return resultaat
+        resultaat = _codeer(len(self.adb) if op == "len" else await getattr(self.adb, op)(*args))
+        # Alleen bewaren als er tijdens het lezen niets is gewijzigd
+        if self.adb.db.versie == versie and len(resultaat) <= self._cache_max:
+            self._cache[sleutel] = resultaat
+            self._cache_bytes += len(resultaat)
+            while self._cache_bytes > self._cache_max:
+                self._cache_bytes -= len(self._cache.popitem(last=False)[1])
+        return resultaat
+
+
+async def serveer(bestandsnaam, adres=None, gestart=None, **opties):
+    """
+    Laadt de database en beantwoordt verzoeken tot `TekstDbServer.stop()`.
+
+    Niet-opgeslagen wijzigingen worden bij het stoppen opgeslagen, ook als de taak
+    wordt geannuleerd (Ctrl+C).
+
+    Args:
+        bestandsnaam (str): Het databasebestand.
+        adres: Zie `TekstDbServer.start`; standaard `standaard_adres(bestandsnaam)`.
+        gestart (callable): Wordt aangeroepen met de `TekstDbServer` zodra die luistert.
+        **opties: Gaan naar `TextDatabase` (bijvoorbeeld `lazy=True`).
+    """
+    if adres is None:
+        adres = standaard_adres(bestandsnaam)
+    adb = await AsyncTextDatabase.open(bestandsnaam, **opties)
+    try:
+        tekst_server = TekstDbServer(adb)
+        server = await tekst_server.start(adres)
+        try:
+            logging.info("'%s' (%d items) luistert op %s", bestandsnaam, len(adb), tekst_server.adres)
+            if gestart:
+                gestart(tekst_server)
+            await server.wait_closed()
+        finally:
+            tekst_server.stop()
+            if isinstance(adres, str):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(adres)
+    finally:
+        if adb.dirty:
+            logging.info("Niet-opgeslagen wijzigingen in '%s' worden opgeslagen.", bestandsnaam)
+            await adb.save()
+        await adb.close()
+
+
+def _is_type(waarde, soort):
+    """Zoals isinstance, maar een bool telt niet als int (JSON true is geen index)."""
+    return isinstance(waarde, soort) and not (soort is int and isinstance(waarde, bool))
+
+
+def _controleer_argumenten(op, args):
+    """Geeft een TypeError als de argumenten van een schrijfoperatie niet de juiste types hebben."""
+    types = SCHRIJF_OPERATIES[op]
+    if len(args) != len(types) or not all(map(_is_type, args, types)):
+        verwacht = ", ".join(soort.__name__ for soort in types)
+        gekregen = ", ".join(type(arg).__name__ for arg in args)
+        raise TypeError(f"{op} verwacht ({verwacht}), niet ({gekregen}).")
+    if op == "voeg_teksten_toe" and not all(isinstance(tekst, str) for tekst in args[0]):
+        raise TypeError("voeg_teksten_toe verwacht een lijst teksten.")
+    if op == "apply_operations":
+        # De database controleert de operaties zelf; hier alleen dat er geen bool als index in staat
+        for operatie in args[0]:
+            if not isinstance(operatie, list) or not all(_is_type(w, int) or _is_type(w, str) for w in operatie):
+                raise TypeError("apply_operations verwacht een lijst operaties met indexen en teksten.")
+
+
+class TekstDbClient:
+    """
+    Een verbinding met een `TekstDbServer`, met dezelfde methodes als `TextDatabase`.
+
+    Een fout in een verzoek wordt een `ServerFout`; methodes die bij `TextDatabase`
+    False of None teruggeven, doen dat hier ook.
+    """
+
+    def __init__(self, adres, timeout=None):
+        """
+        Args:
+            adres: Het pad van de Unix-socket (str), een poort op localhost (int) of een (host, poort)-paar.
+            timeout (float): Het maximale aantal seconden per verzoek; standaard onbeperkt.
+        """
+        if isinstance(adres, str):
+            self._socket = socket.socket(socket.AF_UNIX)
+            self._socket.settimeout(timeout)
+            self._socket.connect(adres)
+        else:
+            self._socket = socket.create_connection(_tcp_adres(adres), timeout)
+            # Korte verzoeken meteen versturen in plaats van te wachten op meer data
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._bestand = self._socket.makefile("rwb")
+        self._volgend_id = 0
+
+    def _vraag(self, op, *args):
+        """Stuurt één verzoek en wacht op het antwoord."""
+        self._volgend_id += 1
+        self._bestand.write(_codeer({"id": self._volgend_id, "op": op, "args": args}) + b"\n")
+        self._bestand.flush()
+        regel = self._bestand.readline()
+        if not regel:
+            raise ConnectionError("De server heeft de verbinding gesloten.")
+        antwoord = json.loads(regel)
+        if not antwoord["ok"]:
+            raise ServerFout(antwoord["fout"])
+        return antwoord["resultaat"]
+
+    def close(self):
+        """Sluit de verbinding; de database op de server blijft open."""
+        self._bestand.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Geeft het aantal items in de database terug."""
+        return self._vraag("len")
+
+    def get_tekst(self, index_nummer):
+        """Haalt een tekst op basis van indexnummer op."""
+        return self._vraag("get_tekst", index_nummer)
+
+    def teksten(self, begin, eind):
+        """Haalt de teksten met indexnummer `begin` tot en met `eind` in één verzoek op."""
+        return self._vraag("teksten", begin, eind)
+
+    def preview(self, index_nummer, breedte=PREVIEW_BREEDTE):
+        """Geeft het begin van een tekst als één regel (zie `TextDatabase.preview`)."""
+        return self._vraag("preview", index_nummer, breedte)
+
+    def zoek(self, zoekterm, prefix=True, substring=False, binnen=None):
+        """Zoekt op de server (zie `TextDatabase.zoek`)."""
+        return self._vraag("zoek", zoekterm, prefix, substring, None if binnen is None else list(binnen))
+
+    def voeg_tekst_toe(self, tekst):
+        """Voegt een tekst toe aan het einde van de database."""
+        return self._vraag("voeg_tekst_toe", tekst)
+
+    def voeg_tekst_op_index_toe(self, index, tekst):
+        """Voegt een tekst in op een specifieke index."""
+        return self._vraag("voeg_tekst_op_index_toe", index, tekst)
+
+    def wijzig_tekst(self, index_nummer, nieuwe_tekst):
+        """Wijzigt de tekst van een bestaand item."""
+        return self._vraag("wijzig_tekst", index_nummer, nieuwe_tekst)
+
+    def verwijder_tekst(self, index_nummer):
+        """Verwijdert een item."""
+        return self._vraag("verwijder_tekst", index_nummer)
+
+    def move_item(self, source_index, dest_index):
+        """Verplaatst een item naar een nieuwe positie."""
+        return self._vraag("move_item", source_index, dest_index)
+
+    def voeg_teksten_toe(self, teksten):
+        """Voegt alle teksten uit `teksten` achteraan toe."""
+        return self._vraag("voeg_teksten_toe", list(teksten))
+
+    def apply_operations(self, operaties):
+        """Voert een lijst operaties in één keer uit (zie `TextDatabase.apply_operations`)."""
+        return self._vraag("apply_operations", [list(operatie) for operatie in operaties])
+
+    def save(self):
+        """Laat de server de database opslaan."""
+        return self._vraag("save")
+
+    def checkpoint(self):
+        """Laat de server het journaal in het databasebestand verwerken."""
+        return self._vraag("checkpoint")
+
+
+def main(argv=None):
+    """Start een server vanaf de command-line (ook via `python -m database serve`)."""
+    parser = argparse.ArgumentParser(
+        prog="python -m database serve",
+        description="Deel één geladen tekst-database met clients via een socket (zie TekstDbClient).",
+    )
+    parser.add_argument("bestandsnaam", help="Het databasebestand om te laden.")
+    groep = parser.add_mutually_exclusive_group()
+    groep.add_argument("-s", "--socket", help="Luister op deze Unix-socket (standaard: <bestandsnaam>.sock).")
+    groep.add_argument("-P", "--poort", type=int, help="Luister via TCP op deze poort.")
+    parser.add_argument("--host", default=STANDAARD_HOST, help=f"Het TCP-adres (standaard: {STANDAARD_HOST}).")
+    parser.add_argument("-l", "--lazy", action="store_true", help="Open de database in lazy-modus.")
+    parser.add_argument("-j", "--journal", action="store_true", help="Sla wijzigingen op in een journaal.")
+    parser.add_argument(
+        "-p",
+        "--processen",
+        type=int,
+        default=1,
+        help="Lees een groot databasebestand met dit aantal processen tegelijk in (standaard: 1).",
+    )
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.bestandsnaam):
+        print(f"Fout: Het databasebestand '{args.bestandsnaam}' is niet gevonden.", file=sys.stderr)
+        sys.exit(1)
+    adres = args.socket or ((args.host, args.poort) if args.poort is not None else None)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    async def hoofd():
+        # Stop netjes (met opslaan) bij SIGTERM; Windows kent geen signal handlers in asyncio
+        with contextlib.suppress(NotImplementedError, AttributeError):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        await serveer(args.bestandsnaam, adres, lazy=args.lazy, journal=args.journal, processen=args.processen)
+
+    try:
+        asyncio.run(hoofd())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    except OSError as e:
+        print(f"Fout: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Nodig voor --processen in een PyInstaller-executable op Windows
+    main()
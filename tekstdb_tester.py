@@ -7,9 +7,19 @@ van de TextDatabase class te verifiëren. Het kan direct worden uitgevoerd
 vanuit de command-line en is bedoeld voor integratie in een CI/CD-workflow.
 """
 
+import asyncio
+import io
 import os
+import threading
 import unittest
-
+from unittest import mock
+
+import database
+import maak_test_db
+import tekstdb_converteer
+import tekstdb_gui
+import tekstdb_server
+from async_database import AsyncTextDatabase
 from database import TextDatabase
 
 
@@ -22,22 +32,25 @@ class TestTextDatabase(unittest.TestCase):
     """
 
     test_db_file = "_test_database.txt"
+    test_bestanden = (test_db_file, test_db_file + ".idx", test_db_file + ".journal", test_db_file + ".staart")
 
     def setUp(self):
         """
         Wordt voor elke test uitgevoerd. Zorgt voor een schone staat door
         een eventueel oud testdatabase-bestand te verwijderen.
         """
-        if os.path.exists(self.test_db_file):
-            os.remove(self.test_db_file)
+        for bestand in self.test_bestanden:
+            if os.path.exists(bestand):
+                os.remove(bestand)
 
     def tearDown(self):
         """
         Wordt na elke test uitgevoerd. Ruimt op door het testdatabase-bestand
         te verwijderen.
         """
-        if os.path.exists(self.test_db_file):
-            os.remove(self.test_db_file)
+        for bestand in self.test_bestanden:
+            if os.path.exists(bestand):
+                os.remove(bestand)
 
     def test_initialization_and_creation(self):
         """Test het aanmaken van een nieuwe, lege database."""
@@ -78,6 +91,12 @@ class TestTextDatabase(unittest.TestCase):
         self.assertTrue(db.wijzig_tekst(1, nieuwe_tekst), "Wijzigen moet succesvol zijn")
         self.assertEqual(db.get_tekst(1), nieuwe_tekst)
         self.assertFalse(db.wijzig_tekst(99, "Zal niet werken"), "Moet falen voor niet-bestaande index")
+        for tekst in (1, None, b"bytes"):
+            with self.assertRaises(TypeError):
+                db.wijzig_tekst(1, tekst)
+            with self.assertRaises(TypeError):
+                db.voeg_tekst_op_index_toe(1, tekst)
+        self.assertEqual(list(db.data.values()), [nieuwe_tekst])
 
     def test_delete_and_reindex(self):
         """Test het verwijderen van een item en de daaropvolgende herindexering."""
@@ -157,6 +176,19 @@ class TestTextDatabase(unittest.TestCase):
             self.assertFalse(db.move_item(1, 99), "Verplaatsen naar niet-bestaande doelindex moet falen")
             self.assertIn("Doelindex 99 is buiten bereik", cm.records[0].getMessage())
 
+        # Een index die geen geheel getal is, verandert niets (ook niet aan de zoekindexen en previews)
+        self.assertEqual(db.zoek("item"), [1, 2, 3, 4])
+        db.preview(1)
+        versie = db.versie
+        with self.assertLogs(level="WARNING"):
+            self.assertFalse(db.move_item(1, 2.5))
+            self.assertFalse(db.voeg_tekst_op_index_toe(1.5, "Item 5"))
+            self.assertFalse(db.move_item("1", 2))
+        self.assertEqual(list(db.data.values()), ["Item 3", "Item 4", "Item 1", "Item 2"])
+        self.assertEqual(db.versie, versie)
+        self.assertEqual(db.zoek("item"), [1, 2, 3, 4])
+        self.assertEqual(db.preview(1), "Item 3")
+
     def test_reindex_on_load(self):
         """Test of de database zichzelf herindexeert bij het laden van een 'rommelig' bestand."""
         # Maak handmatig een bestand met niet-opeenvolgende indices
@@ -180,6 +212,779 @@ class TestTextDatabase(unittest.TestCase):
         # Controleer of de 'dirty' flag is gezet, omdat er een wijziging (herindexering) heeft plaatsgevonden
         self.assertTrue(db.dirty, "Dirty flag moet True zijn na herindexering")
 
+    def test_stream_parser_over_buffergrenzen(self):
+        """Test of de stream-parser markers herkent die over de grens van twee leesbuffers vallen."""
+        content = (
+            "Voorafgaande tekst wordt genegeerd.\r\n"
+            "###INDEX: 1\r\nEerste item\r\nmet twee regels\r\n\r\n"
+            "###INDEX: 2\nTweede item met één accent\n\n"
+            "###INDEX: geen nummer\nDit blok wordt overgeslagen\n\n"
+            "###INDEX: 3\n  Derde item  \n"
+            # Unicode-witruimte en -cijfers in de kopregel, zoals de oorspronkelijke parser op str ze las
+            "###INDEX:\u00a0\u0664\u2003\r\n\u00a0Vierde item\n"
+        )
+        with open(self.test_db_file, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+
+        verwacht = {
+            1: "Eerste item\nmet twee regels",
+            2: "Tweede item met één accent",
+            3: "Derde item",
+            4: "Vierde item",
+        }
+        for buffer_grootte in (1, 4, 9, 10, 1 << 20):
+            with mock.patch("database.LEES_BUFFER_GROOTTE", buffer_grootte):
+                db = TextDatabase(self.test_db_file)
+            self.assertEqual(dict(db.data), verwacht, f"Onjuist resultaat bij buffergrootte {buffer_grootte}")
+        with TextDatabase(self.test_db_file, lazy=True) as db:
+            self.assertEqual(dict(db.data), verwacht)
+
+    def test_parallel_laden(self):
+        """Test of parallel laden precies hetzelfde oplevert als serieel laden, ook bij een 'rommelig' bestand."""
+        blokken = [f"###INDEX: {i % 37 * 2 + 1}\r\nItem {i}, één regel\r\n\r\n" for i in range(200)]
+        blokken[50] = "###INDEX: geen nummer\nDit blok wordt overgeslagen\n\n"
+        with open(self.test_db_file, "w", encoding="utf-8", newline="") as f:
+            f.write("Voorafgaande tekst\n" + "".join(blokken))
+        serieel = TextDatabase(self.test_db_file)
+
+        meldingen = []
+        with mock.patch("database.PARALLEL_MIN_BYTES", 0):
+            db = TextDatabase(self.test_db_file, processen=3, voortgang=lambda *melding: meldingen.append(melding))
+        self.assertEqual(list(db.data.values()), list(serieel.data.values()))
+        self.assertTrue(db.dirty, "Dirty flag moet True zijn na herindexering")
+        self.assertEqual(len(meldingen), 3 * database.PARALLEL_BEREIKEN_PER_PROCES)
+        self.assertEqual(meldingen[-1][:2], (os.path.getsize(self.test_db_file),) * 2)
+
+        # Bij een bestand op volgorde kan daarna ook alleen de staart worden opgeslagen
+        db.save()
+        with mock.patch("database.PARALLEL_MIN_BYTES", 0):
+            db = TextDatabase(self.test_db_file, processen=2)
+        self.assertFalse(db.dirty)
+        self.assertTrue(db.wijzig_tekst(len(db), "Laatste"))
+        self.assertIsNotNone(db._staart_positie())
+
+    def test_laden_met_voortgang(self):
+        """Test de voortgangsmeldingen tijdens het laden, en het afbreken van het laden."""
+        db = TextDatabase(self.test_db_file, create_new=True)
+        db.voeg_teksten_toe(f"Item {i}" for i in range(1, 101))
+        db.save()
+        grootte = os.path.getsize(self.test_db_file)
+
+        meldingen = []
+        with mock.patch("database.LEES_BUFFER_GROOTTE", 64):
+            TextDatabase(self.test_db_file, voortgang=lambda *melding: meldingen.append(melding))
+        self.assertGreater(len(meldingen), 10)
+        self.assertEqual([gelezen for gelezen, _, _ in meldingen], sorted(gelezen for gelezen, _, _ in meldingen))
+        self.assertEqual(meldingen[-1][:2], (grootte, grootte))
+        self.assertEqual([tekst for *_, teksten in meldingen for tekst in teksten], list(db.data.values()))
+
+        def breek_af(gelezen, totaal, teksten):
+            raise KeyboardInterrupt
+
+        os.remove(self.test_db_file + ".idx")  # Anders hoeft de lazy-modus niet te scannen
+        for lazy in (False, True):
+            with self.assertRaises(KeyboardInterrupt):
+                TextDatabase(self.test_db_file, lazy=lazy, voortgang=breek_af)
+
+    def test_lazy_modus(self):
+        """Test het lezen, wijzigen en opslaan van een database in lazy-modus."""
+        db = TextDatabase(self.test_db_file, create_new=True)
+        for tekst in ("Item 1", "Item 2\nmet één tweede regel", "Item 3", "Item 4"):
+            db.voeg_tekst_toe(tekst)
+        db.save()
+
+        with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+            self.assertEqual(len(lazy_db), 4)
+            self.assertEqual(lazy_db.get_tekst(2), "Item 2\nmet één tweede regel")
+            self.assertIsNone(lazy_db.get_tekst(5))
+            self.assertEqual(list(lazy_db.data.keys()), [1, 2, 3, 4])
+
+            # Een int als tekst zou hier als blok-nummer gelezen worden (de tekst van een ander item)
+            for wijziging in (lambda: lazy_db.wijzig_tekst(1, 1), lambda: lazy_db.voeg_tekst_toe(0)):
+                with self.assertRaises(TypeError):
+                    wijziging()
+            self.assertEqual(lazy_db.get_tekst(1), "Item 1")
+            self.assertFalse(lazy_db.dirty)
+
+            # Wijzigingen worden bovenop het gemapte bestand bijgehouden
+            self.assertTrue(lazy_db.wijzig_tekst(1, "Item 1 gewijzigd"))
+            self.assertTrue(lazy_db.voeg_tekst_op_index_toe(2, "Nieuw item"))
+            self.assertTrue(lazy_db.verwijder_tekst(4))
+            self.assertTrue(lazy_db.move_item(4, 1))
+            verwacht = ["Item 4", "Item 1 gewijzigd", "Nieuw item", "Item 2\nmet één tweede regel"]
+            self.assertEqual(list(lazy_db.data.values()), verwacht)
+            self.assertTrue(lazy_db.dirty)
+
+            self.assertTrue(lazy_db.save())
+            self.assertFalse(lazy_db.dirty)
+            self.assertEqual(list(lazy_db.data.values()), verwacht, "Data moet uit het nieuwe bestand komen")
+
+        db = TextDatabase(self.test_db_file)
+        self.assertEqual(list(db.data.values()), verwacht)
+
+    def test_lazy_modus_herindexeert(self):
+        """Test of de lazy-modus een 'rommelig' bestand in dezelfde volgorde toont als volledig laden."""
+        with open(self.test_db_file, "w", encoding="utf-8") as f:
+            f.write("###INDEX: 5\nVijf\n\n###INDEX: 2\nTwee\n\n###INDEX: 5\nNieuwe vijf\n\n")
+
+        with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+            self.assertEqual(dict(lazy_db.data), dict(TextDatabase(self.test_db_file).data))
+            self.assertEqual(lazy_db.get_tekst(2), "Nieuwe vijf")
+            self.assertTrue(lazy_db.dirty, "Dirty flag moet True zijn na herindexering")
+
+    def test_indexbestand(self):
+        """Test of het indexbestand bij opslaan wordt geschreven en bij het openen wordt gebruikt."""
+        db = TextDatabase(self.test_db_file, create_new=True)
+        db.voeg_tekst_toe("Item 1")
+        db.voeg_tekst_toe("Item 2")
+        db.save()
+        self.assertTrue(os.path.exists(self.test_db_file + ".idx"), "Opslaan moet een indexbestand schrijven")
+
+        # Met een geldig indexbestand hoeft het databasebestand niet gescand te worden
+        with mock.patch("database._lees_blokken") as lees_blokken:
+            with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+                self.assertEqual(list(lazy_db.data.values()), ["Item 1", "Item 2"])
+            lees_blokken.assert_not_called()
+
+        # Na een wijziging buiten de database om is de index verouderd en wordt opnieuw gescand
+        with open(self.test_db_file, "a", encoding="utf-8") as f:
+            f.write("###INDEX: 3\nItem 3\n\n")
+        with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+            self.assertEqual(list(lazy_db.data.values()), ["Item 1", "Item 2", "Item 3"])
+        with mock.patch("database._lees_blokken") as lees_blokken:
+            with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+                self.assertEqual(lazy_db.get_tekst(3), "Item 3")
+            lees_blokken.assert_not_called()
+
+        # Na het opslaan van alleen de staart wordt ook het indexbestand alleen vanaf daar bijgewerkt
+        index_naam = self.test_db_file + ".idx"
+        db = TextDatabase(self.test_db_file)
+        db.voeg_teksten_toe(f"Item {i}" for i in range(4, 101))
+        db.save()
+        inode = os.stat(index_naam).st_ino
+        db.wijzig_tekst(100, "Laatste item, gewijzigd")
+        db.voeg_tekst_toe("Item 101")
+        with mock.patch("database.os.replace", wraps=os.replace) as vervang:
+            self.assertTrue(db.save())
+        self.assertNotIn(index_naam, [call.args[1] for call in vervang.call_args_list])
+        self.assertEqual(os.stat(index_naam).st_ino, inode)
+        with mock.patch("database._lees_blokken") as lees_blokken:
+            with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+                self.assertEqual(len(lazy_db), 101)
+                self.assertEqual(lazy_db.get_tekst(100), "Laatste item, gewijzigd")
+                self.assertEqual(lazy_db.get_tekst(101), "Item 101")
+            lees_blokken.assert_not_called()
+
+        # Een indexbestand waarvan de lengte niet bij het aantal items past, wordt afgekeurd
+        with open(index_naam, "r+b") as f:
+            f.truncate(os.path.getsize(index_naam) - 24)
+        self.assertIsNone(database._lees_index(self.test_db_file))
+        with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+            self.assertEqual(lazy_db.get_tekst(101), "Item 101")
+
+    def test_gecomprimeerd_formaat(self):
+        """Test het opslaan, herkennen en omzetten van het formaat met los gecomprimeerde blokken."""
+        teksten = [f"  Item {i} met één spatie aan het begin\r\n" for i in range(1, 101)]
+        for formaat in ("zlib", "lzma"):
+            db = TextDatabase(self.test_db_file, create_new=True, formaat=formaat)
+            db.voeg_teksten_toe(teksten)
+            with mock.patch("opslagformaten.COMPRESSIE_BLOK_BYTES", 200):  # Veel kleine blokken
+                self.assertTrue(db.save())
+            self.assertFalse(os.path.exists(self.test_db_file + ".idx"))
+
+            # Het formaat wordt bij het laden herkend en de teksten komen ongewijzigd terug
+            db = TextDatabase(self.test_db_file)
+            self.assertEqual(db.formaat, formaat)
+            self.assertEqual(list(db.data.values()), teksten)
+
+            # Een tekst opvragen decomprimeert alleen het blok waar hij in staat
+            with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+                with mock.patch.object(lazy_db._basis, "_decomprimeer", wraps=lazy_db._basis._decomprimeer) as dec:
+                    self.assertEqual(lazy_db.get_tekst(50), teksten[49])
+                    self.assertEqual(lazy_db.preview(50), teksten[49].strip())
+                    self.assertEqual(dec.call_count, 1)
+                self.assertTrue(lazy_db.wijzig_tekst(100, "Laatste"))
+                self.assertTrue(lazy_db.save())
+                self.assertEqual(lazy_db.get_tekst(100), "Laatste")
+            teksten[-1] = "Laatste"
+
+        # Omzetten naar het tekstformaat en terug
+        tekst_bestand = self.test_db_file + ".txt"
+        self.addCleanup(lambda: [os.remove(naam) for naam in (tekst_bestand, tekst_bestand + ".idx")])
+        with mock.patch("builtins.print"):
+            self.assertTrue(tekstdb_converteer.converteer(self.test_db_file, tekst_bestand, "tekst"))
+            self.assertTrue(tekstdb_converteer.converteer(tekst_bestand, self.test_db_file, "zlib"))
+        self.assertEqual(TextDatabase(tekst_bestand).formaat, "tekst")
+        db = TextDatabase(self.test_db_file)
+        self.assertEqual(db.formaat, "zlib")
+        # Het tekstformaat haalt de witruimte rond elke tekst weg
+        self.assertEqual(list(db.data.values()), [tekst.strip() for tekst in teksten])
+
+    def test_binair_formaat(self):
+        """Test het binaire formaat: exact terug te lezen, ook met `###INDEX:` in een tekst."""
+        teksten = ["Item 1", "", "  witruimte\r\n", "###INDEX: 7\nGeen nieuw item", "één 😀"]
+        db = TextDatabase(self.test_db_file, create_new=True, formaat="binair")
+        db.voeg_teksten_toe(teksten)
+        self.assertTrue(db.save())
+
+        db = TextDatabase(self.test_db_file)
+        self.assertEqual(db.formaat, "binair")
+        self.assertEqual(list(db.data.values()), teksten)
+        with db.get_bytes(3) as ruw:
+            self.assertEqual(bytes(ruw), teksten[2].encode("utf-8"))
+
+        with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+            with lazy_db.get_bytes(5) as ruw:  # Zonder kopie uit de map
+                self.assertEqual(bytes(ruw), teksten[4].encode("utf-8"))
+                self.assertIs(ruw.obj, lazy_db._basis._mmap)
+            with self.assertRaises(ValueError):
+                bytes(ruw)  # Na het with-blok vrijgegeven
+            with lazy_db.get_bytes(len(teksten) + 1) as ruw:
+                self.assertIsNone(ruw)
+            self.assertEqual(lazy_db.get_tekst(4), teksten[3])
+            self.assertEqual(lazy_db.preview(5, breedte=5), "één 😀")
+            self.assertTrue(lazy_db.voeg_tekst_op_index_toe(1, "Nieuw"))
+            self.assertTrue(lazy_db.save())
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), ["Nieuw", *teksten])
+
+        # Omzetten naar het tekstformaat weigert een tekst die daar niet in past
+        tekst_bestand = self.test_db_file + ".txt"
+        with self.assertRaises(ValueError):
+            tekstdb_converteer.converteer(self.test_db_file, tekst_bestand, "tekst")
+        self.assertFalse(os.path.exists(tekst_bestand))
+
+    def _lees_ruw(self, bestandsnaam):
+        """Hulpfunctie: geeft de inhoud van een bestand als bytes terug."""
+        with open(bestandsnaam, "rb") as f:
+            return f.read()
+
+    def test_journaal_modus(self):
+        """Test of wijzigingen in journaal-modus alleen aan het journaal worden toegevoegd."""
+        db = TextDatabase(self.test_db_file, create_new=True, journal=True)
+        for tekst in ("Item 1", "Item 2", "Item 3"):
+            db.voeg_tekst_toe(tekst)
+        self.assertTrue(db.save(), "De eerste keer opslaan schrijft het volledige bestand")
+        self.assertFalse(os.path.exists(self.test_db_file + ".journal"))
+        origineel = self._lees_ruw(self.test_db_file)
+
+        db.wijzig_tekst(1, "Item 1 met één wijziging")
+        db.voeg_tekst_op_index_toe(2, "Nieuw item")
+        db.verwijder_tekst(4)
+        db.move_item(3, 1)
+        self.assertTrue(db.save())
+        self.assertFalse(db.dirty)
+        self.assertEqual(self._lees_ruw(self.test_db_file), origineel, "Het databasebestand mag niet wijzigen")
+        verwacht = ["Item 2", "Item 1 met één wijziging", "Nieuw item"]
+
+        # Het journaal wordt bij het laden toegepast, ook zonder journaal-modus en in lazy-modus
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), verwacht)
+        with TextDatabase(self.test_db_file, lazy=True) as lazy_db:
+            self.assertEqual(list(lazy_db.data.values()), verwacht)
+            self.assertFalse(lazy_db.dirty)
+
+        # Een half geschreven laatste record wordt genegeerd
+        with open(self.test_db_file + ".journal", "ab") as f:
+            f.write(b'["verwijder",')
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), verwacht)
+
+        # Een checkpoint verwerkt het journaal in het databasebestand
+        self.assertTrue(db.checkpoint())
+        self.assertFalse(os.path.exists(self.test_db_file + ".journal"))
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), verwacht)
+
+        # Het herhaalde journaal geeft dezelfde teksten als het tekstformaat na een checkpoint
+        db.voeg_tekst_toe("  spaties  \r\nen een regel\r")
+        db.wijzig_tekst(1, "\tItem 2\r\n")
+        with self.assertLogs(level="WARNING"):
+            self.assertFalse(db.voeg_tekst_toe("a\n###INDEX: 9\nb"))
+        self.assertTrue(db.save())
+        herhaald = list(TextDatabase(self.test_db_file).data.values())
+        self.assertEqual(herhaald, [*verwacht, "spaties  \nen een regel"])
+        self.assertTrue(TextDatabase(self.test_db_file, journal=True).checkpoint())
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), herhaald)
+
+        # Een record dat niet in het formaat past (uit een ouder journaal) stopt het herhalen
+        db = TextDatabase(self.test_db_file, journal=True)
+        db.voeg_tekst_toe("Na het checkpoint")
+        self.assertTrue(db.save())
+        with open(self.test_db_file + ".journal", "a", encoding="utf-8") as f:
+            f.write('["voeg_in", 1, "a ###INDEX: 9"]\n["verwijder", 1]\n')
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), [*herhaald, "Na het checkpoint"])
+
+    def test_journaal_checkpoint_op_grootte(self):
+        """Test of een te groot journaal bij het opslaan automatisch wordt verwerkt."""
+        db = TextDatabase(self.test_db_file, create_new=True, journal=True)
+        db.voeg_tekst_toe("Item 1")
+        db.save()
+
+        db.voeg_tekst_toe("Item 2")
+        with mock.patch("database.JOURNAL_MAX_BYTES", 10):
+            self.assertTrue(db.save())
+        self.assertFalse(os.path.exists(self.test_db_file + ".journal"))
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), ["Item 1", "Item 2"])
+
+        # Een journaal van een ander databasebestand wordt genegeerd
+        with open(self.test_db_file + ".journal", "wb") as f:
+            f.write(b'{"basis":[1,"00"]}\n["verwijder",1]\n')
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(len(TextDatabase(self.test_db_file)), 2)
+
+    def test_opslaan_alleen_staart(self):
+        """Test of opslaan het bestand pas vanaf het eerste gewijzigde item herschrijft."""
+        teksten = [f"Item {i}" for i in range(1, 11)]
+        db = TextDatabase(self.test_db_file, create_new=True)
+        for tekst in teksten:
+            db.voeg_tekst_toe(tekst)
+        db.save()
+
+        for lazy in (False, True):
+            with TextDatabase(self.test_db_file, lazy=lazy) as db:
+                db.wijzig_tekst(9, "Negen, gewijzigd")
+                db.move_item(10, 8)
+                db.voeg_tekst_toe("Nieuw item")
+                with mock.patch("database._schrijf_blokken", wraps=database._schrijf_blokken) as schrijf:
+                    self.assertTrue(db.save())
+                self.assertEqual(schrijf.call_args.args[2], 8)  # Vanaf item 8
+                teksten[8] = "Negen, gewijzigd"
+                teksten.insert(7, teksten.pop(9))
+                teksten.append("Nieuw item")
+                self.assertEqual(list(db.data.values()), teksten)
+
+                # Zonder wijzigingen wordt er niets geschreven
+                with mock.patch("database._schrijf_blokken") as schrijf:
+                    self.assertTrue(db.save())
+                schrijf.assert_not_called()
+
+            # Het resultaat is gelijk aan volledig opnieuw inlezen, ook zonder indexbestand
+            os.remove(self.test_db_file + ".idx")
+            self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), teksten)
+
+        # Een bestand dat buiten de database om is gewijzigd, wordt volledig herschreven
+        db = TextDatabase(self.test_db_file)
+        with open(self.test_db_file, "a", encoding="utf-8") as f:
+            f.write("###INDEX: 99\nExtern toegevoegd\n\n")
+        db.wijzig_tekst(len(db), "Laatste")
+        with mock.patch("database._schrijf_blokken", wraps=database._schrijf_blokken) as schrijf:
+            self.assertTrue(db.save())
+        self.assertEqual(len(schrijf.call_args.args), 2)
+        self.assertEqual(len(TextDatabase(self.test_db_file)), len(teksten))
+
+    def test_opslaan_na_crash(self):
+        """Test of een onderbroken opslag nooit een half geschreven databasebestand achterlaat."""
+        teksten = [f"Item {i}" for i in range(1, 11)]
+        db = TextDatabase(self.test_db_file, create_new=True)
+        for tekst in teksten:
+            db.voeg_tekst_toe(tekst)
+        db.save()
+        origineel = self._lees_ruw(self.test_db_file)
+
+        # Volledig opslaan: het origineel wordt pas aan het einde in één keer vervangen
+        db.wijzig_tekst(1, "Gewijzigd")
+        with mock.patch("os.replace", side_effect=OSError("crash")), self.assertLogs(level="ERROR"):
+            self.assertFalse(db.save())
+        self.assertEqual(self._lees_ruw(self.test_db_file), origineel)
+        self.assertEqual([f for f in os.listdir() if f.endswith(".tmp")], [])
+        db.wijzig_tekst(1, "Item 1")
+        self.assertTrue(db.save())
+
+        # Staart opslaan: na een crash maakt het volgende openen het opslaan af
+        db.wijzig_tekst(9, "Negen, gewijzigd")
+        with mock.patch("database._kopieer_staart", side_effect=OSError("crash")), self.assertLogs(level="ERROR"):
+            self.assertFalse(db.save())
+        self.assertTrue(os.path.exists(self.test_db_file + ".staart"))
+        teksten[8] = "Negen, gewijzigd"
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), teksten)
+        self.assertFalse(os.path.exists(self.test_db_file + ".staart"))
+
+        # Een onvolledig herstelbestand wordt genegeerd
+        with open(self.test_db_file + ".staart", "wb") as f:
+            f.write(b"###INDEX: 10\nHalf geschreven")
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), teksten)
+        self.assertFalse(os.path.exists(self.test_db_file + ".staart"))
+
+    def test_positionele_opslag(self):
+        """Test invoegen, verwijderen en verplaatsen over de grenzen van de interne delen heen."""
+        with mock.patch("database.BLOK_GROOTTE", 2):
+            db = TextDatabase(self.test_db_file, create_new=True)
+            verwacht = []
+            for i in range(20):
+                self.assertTrue(db.voeg_tekst_op_index_toe(i // 2 + 1, f"Item {i}"))
+                verwacht.insert(i // 2, f"Item {i}")
+            for index in (1, 7, 18):
+                self.assertTrue(db.verwijder_tekst(index))
+                del verwacht[index - 1]
+            for bron, doel in ((1, 17), (17, 1), (5, 12)):
+                self.assertTrue(db.move_item(bron, doel))
+                verwacht.insert(doel - 1, verwacht.pop(bron - 1))
+            self.assertEqual([db.get_tekst(i) for i in range(1, len(db) + 1)], verwacht)
+            self.assertEqual(list(db.data.items()), list(enumerate(verwacht, 1)))
+
+        # `data` is een alleen-lezen weergave
+        with self.assertRaises(TypeError):
+            db.data[1] = "Niet toegestaan"
+        self.assertNotIn(0, db.data)
+        self.assertNotIn(len(db) + 1, db.data)
+
+    def test_apply_operations(self):
+        """Test het in één keer uitvoeren van een reeks wijzigingen, met terugdraaien bij fouten."""
+        db = TextDatabase(self.test_db_file, create_new=True)
+        for tekst in ("Item 1", "Item 2", "Item 3"):
+            db.voeg_tekst_toe(tekst)
+        db.save()
+
+        for lazy in (False, True):
+            with TextDatabase(self.test_db_file, lazy=lazy, journal=True) as db:
+                # Een ongeldige operatie: er verandert niets, ook `dirty` niet
+                ongeldig = [("verwijder", 1), ("wijzig", 3, "Buiten bereik na het verwijderen")]
+                with self.assertLogs(level="WARNING"):
+                    self.assertFalse(db.apply_operations(ongeldig))
+                self.assertFalse(db.dirty)
+                self.assertEqual(list(db.data.values()), ["Item 1", "Item 2", "Item 3"])
+
+                # Een exceptie binnen een batch draait alle wijzigingen terug
+                with self.assertRaises(RuntimeError), db.batch():
+                    db.wijzig_tekst(1, "Gewijzigd")
+                    db.move_item(1, 3)
+                    db.verwijder_tekst(2)
+                    db.voeg_tekst_op_index_toe(1, "Nieuw")
+                    raise RuntimeError("afgebroken")
+                self.assertFalse(db.dirty)
+                self.assertEqual(list(db.data.values()), ["Item 1", "Item 2", "Item 3"])
+                self.assertEqual(db._journal_wachtrij, [])
+
+                # Een ongeldige wijziging en opslaan binnen een batch draaien de batch ook terug
+                with self.assertRaises(ValueError), db.batch():
+                    db.wijzig_tekst(1, "Gewijzigd")
+                    db.verwijder_tekst(9)
+                with self.assertRaises(ValueError), db.batch():
+                    db.verwijder_tekst(1)
+                    db.apply_operations([("verplaats", 1, 3)])
+                with self.assertRaises(RuntimeError), db.batch():
+                    db.wijzig_tekst(1, "Gewijzigd")
+                    db.save()
+                self.assertFalse(db.dirty)
+                self.assertEqual(list(db.data.values()), ["Item 1", "Item 2", "Item 3"])
+
+                operaties = [("voeg_in", 1, "Item 0"), ("verplaats", 4, 1), ("verwijder", 3), ("wijzig", 3, "Drie")]
+                self.assertTrue(db.apply_operations(operaties))
+                self.assertTrue(db.dirty)
+                self.assertEqual(list(db.data.values()), ["Item 3", "Item 0", "Drie"])
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), ["Item 1", "Item 2", "Item 3"])
+
+    def test_voeg_teksten_toe(self):
+        """Test het in één keer toevoegen van (gegenereerde) teksten, ook vanuit een importbestand."""
+        with mock.patch("database.BLOK_GROOTTE", 4):
+            db = TextDatabase(self.test_db_file, create_new=True, journal=True)
+            db.voeg_tekst_toe("Eerste")
+            self.assertEqual(db.voeg_teksten_toe(f"Item {i}" for i in range(1, 11)), 10)
+            self.assertEqual(db.voeg_teksten_toe(iter(())), 0)
+            self.assertEqual(len(db), 11)
+            self.assertEqual(db.get_tekst(11), "Item 10")
+            self.assertEqual(len(db._journal_wachtrij), 11)
+        self.assertTrue(db.save())
+        self.assertEqual(
+            list(TextDatabase(self.test_db_file).data.values()), ["Eerste"] + [f"Item {i}" for i in range(1, 11)]
+        )
+
+        # De importformaten van maak_test_db
+        alineas = io.StringIO("Een\nmet twee regels\n\n\nTwee\n")
+        self.assertEqual(list(maak_test_db.lees_alineas(alineas)), ["Een\nmet twee regels", "Twee"])
+        jsonl = io.StringIO('"Een\\n\\nmet lege regel"\n\n{"tekst": "Twee"}\n')
+        self.assertEqual(list(maak_test_db.lees_jsonl(jsonl)), ["Een\n\nmet lege regel", "Twee"])
+        for regel in ("{}", '{"tekst": 5}', '{"tekst": null}', "7"):
+            with self.assertRaisesRegex(ValueError, "regel 2"):
+                list(maak_test_db.lees_jsonl(io.StringIO(f'"Een"\n{regel}\n')))
+
+        # Een tekst die geen str is, wordt geweigerd voordat zijn stuk wordt toegevoegd
+        db = TextDatabase(self.test_db_file, create_new=True)
+        with self.assertRaises(TypeError):
+            db.voeg_teksten_toe(["Een", 5])
+        self.assertEqual(len(db), 0)
+        self.assertFalse(db.dirty)
+
+    def test_zoek_woordindex(self):
+        """Test zoeken met de woordindex, ook nadat de database na de eerste zoekopdracht is gewijzigd."""
+        db = TextDatabase(self.test_db_file, create_new=True)
+        db.voeg_teksten_toe(["De database is snel.", "Een DATA-bestand", "Niets te zien", "Data en databases"])
+        db.save()
+
+        for lazy in (False, True):
+            with TextDatabase(self.test_db_file, lazy=lazy) as db:
+                self.assertEqual(db.zoek("data"), [1, 2, 4])
+                self.assertEqual(db.zoek("data", prefix=False), [2, 4])
+                self.assertEqual(db.zoek("data bases"), [])
+                self.assertEqual(db.zoek("DATA snel"), [1])
+                self.assertEqual(db.zoek("abase", substring=True), [1, 4])
+                self.assertEqual(db.zoek("-"), [2])  # Geen woorden: doorzoek de teksten
+
+                # De index volgt de wijzigingen, ook als die worden teruggedraaid
+                db.wijzig_tekst(3, "Nu wel data")
+                db.verwijder_tekst(1)
+                db.move_item(3, 1)
+                db.voeg_tekst_op_index_toe(2, "Nog meer data")
+                self.assertEqual(db.zoek("data"), [1, 2, 3, 4])
+                self.assertEqual(db.zoek("snel"), [])
+                with self.assertRaises(RuntimeError), db.batch():
+                    db.verwijder_tekst(1)
+                    db.wijzig_tekst(1, "Snel")
+                    raise RuntimeError("afgebroken")
+                self.assertEqual(db.zoek("meer"), [2])
+                self.assertEqual(db.zoek("snel"), [])
+
+    def test_zoek_trigramindex(self):
+        """Test zoeken midden in woorden met de trigram-index en de casefold-cache: dezelfde resultaten als zonder."""
+        teksten = ["Straße en strasse", "Een database", "Niets", "Afspraak: DATAbase"] * 3
+        db = TextDatabase(self.test_db_file, create_new=True, trigramindex=True)
+        met_cache = TextDatabase(self.test_db_file, create_new=True, casefold_cache=True)
+        zonder_index = TextDatabase(self.test_db_file, create_new=True)
+        for d in (db, met_cache, zonder_index):
+            d.voeg_teksten_toe(teksten)
+
+        # Zoeken op woorden bouwt de (grote) trigram-index en de casefold-cache niet op
+        self.assertEqual(db.zoek("data"), met_cache.zoek("data"))
+        self.assertEqual(set(db.zoekindex_geheugen()), {"woorden", "ids"})
+        self.assertEqual(set(met_cache.zoekindex_geheugen()), {"woorden", "ids"})
+
+        for stap in range(3):
+            for zoekterm in ("abas", "ASSE", "a", "spraak: d", "xyz", "ß"):
+                verwacht = zonder_index.zoek(zoekterm, substring=True)
+                self.assertEqual(db.zoek(zoekterm, substring=True), verwacht)
+                self.assertEqual(met_cache.zoek(zoekterm, substring=True), verwacht)
+            for d in (db, met_cache, zonder_index):
+                d.apply_operations([("wijzig", 3, "Nu een basis"), ("verplaats", 1, len(d)), ("verwijder", 2)])
+        self.assertEqual(db.zoek("abas", substring=True), zonder_index.zoek("abas", substring=True))
+        self.assertEqual(met_cache.zoek("abas", substring=True), zonder_index.zoek("abas", substring=True))
+        self.assertEqual(list(db.data.values()), list(zonder_index.data.values()))
+        self.assertEqual(set(db.zoekindex_geheugen()), {"woorden", "trigrammen", "ids"})
+        self.assertTrue(all(grootte > 0 for grootte in db.zoekindex_geheugen().values()))
+        self.assertEqual(set(met_cache.zoekindex_geheugen()), {"woorden", "ids", "casefold"})
+
+        # Een verlengde zoekterm hoeft alleen de vorige resultaten te doorzoeken
+        vorige = db.zoek("aba", substring=True)
+        self.assertEqual(db.zoek("abas", substring=True, binnen=vorige), zonder_index.zoek("abas", substring=True))
+        self.assertEqual(db.zoek("abas", substring=True, binnen={3}), [])
+        versie = db.versie
+        db.voeg_teksten_toe(["Nog een database"])
+        self.assertGreater(db.versie, versie)
+
+        # Per stuk zoeken werkt op een momentopname, ook als de database intussen wijzigt
+        stukken = db.zoek_per_stuk("a", substring=True, stukgrootte=4)
+        verwacht = db.zoek("a", substring=True)
+        db.verwijder_tekst(1)
+        stukken = list(stukken)
+        self.assertEqual(len(stukken), (len(db) + 1 + 3) // 4)
+        self.assertEqual([index for stuk in stukken for index in stuk], verwacht)
+
+    def test_zoekindex_bouwer(self):
+        """Test het opbouwen van de zoekindexen in een andere thread, en het weggooien ervan na een wijziging."""
+        db = TextDatabase(self.test_db_file, create_new=True, trigramindex=True, casefold_cache=True)
+        db.voeg_teksten_toe([f"Tekst {i} over databases" for i in range(10000)])
+        verwacht = TextDatabase(self.test_db_file, create_new=True)
+        verwacht.voeg_teksten_toe(db.data.values())
+
+        bouw = db.zoekindex_bouwer("base", substring=True)
+        meldingen, resultaat = [], []
+        thread = threading.Thread(target=lambda: resultaat.append(bouw(lambda *melding: meldingen.append(melding))))
+        thread.start()
+        thread.join()
+        installeer = resultaat[0]
+        self.assertTrue(meldingen)
+        self.assertTrue(all(0 < gedaan <= totaal == 2 * len(db) for gedaan, totaal in meldingen))
+        self.assertEqual(db.zoekindex_geheugen(), {})
+        self.assertTrue(installeer())
+        self.assertEqual(set(db.zoekindex_geheugen()), {"trigrammen", "ids", "casefold"})
+        self.assertIsNone(db.zoekindex_bouwer("base", substring=True))
+        self.assertEqual(db.zoek("base", substring=True), verwacht.zoek("base", substring=True))
+        self.assertEqual(db.zoek("tekst 12"), verwacht.zoek("tekst 12"))
+
+        # Na een wijziging tijdens het opbouwen worden de indexen niet gebruikt
+        db = TextDatabase(self.test_db_file, create_new=True)
+        db.voeg_teksten_toe(["Een", "Twee"])
+        installeer = db.zoekindex_bouwer("een")()
+        db.wijzig_tekst(1, "Drie")
+        self.assertFalse(installeer())
+        self.assertEqual(db.zoekindex_geheugen(), {})
+        self.assertEqual(db.zoek("een"), [])
+        self.assertEqual(db.zoek("drie"), [1])
+
+    def test_preview(self):
+        """Test de previews: alleen het begin van de tekst, bijgewerkt voor precies de gewijzigde items."""
+        db = TextDatabase(self.test_db_file, create_new=True)
+        db.voeg_teksten_toe(["Eerste regel\nTweede regel", "é" * 300, "Kort"])
+        db.save()
+
+        for lazy in (False, True):
+            with TextDatabase(self.test_db_file, lazy=lazy) as db:
+                self.assertEqual(db.preview(1), "Eerste regel Tweede regel")
+                self.assertEqual(db.preview(2, 5), "é" * 5)  # Niet afgebroken midden in een teken
+                self.assertEqual(db.preview(2), "é" * 100)
+                self.assertIsNone(db.preview(4))
+
+                db.wijzig_tekst(3, "Gewijzigd")
+                db.move_item(1, 3)
+                db.voeg_tekst_op_index_toe(1, "Nieuw")
+                self.assertEqual(
+                    [db.preview(i, 8) for i in range(1, 5)], ["Nieuw", "éééééééé", "Gewijzig", "Eerste r"]
+                )
+                with self.assertRaises(RuntimeError), db.batch():
+                    db.verwijder_tekst(1)
+                    db.wijzig_tekst(1, "Anders")
+                    raise RuntimeError("afgebroken")
+                self.assertEqual(db.preview(2, 3), "ééé")
+                self.assertEqual(db.preview(1, 3), "Nie")
+
+    def test_zoektaak_volgorde(self):
+        """Test of de GUI-zoektaak resultaten en passende indexnummers op volgorde aanlevert, ook na lege stukken."""
+        taak = tekstdb_gui.Zoektaak(iter(()), nummers=[7999, 5, 50, 12000])
+        rijen = []
+        for stuk in ([1, 3], [], [4000], [], [], [8000, 8001]):
+            rijen += taak.rijen(stuk)
+        rijen += taak.overige_rijen()
+        self.assertEqual(rijen, [1, 3, 5, 50, 4000, 7999, 8000, 8001, 12000])
+
+    def test_luisteraars(self):
+        """Test dat elke wijziging, ook het terugdraaien van een batch, aan de luisteraars wordt gemeld."""
+        db = TextDatabase(self.test_db_file, create_new=True)
+        meldingen = []
+
+        def luisteraar(*melding):
+            meldingen.append((*melding, len(db)))  # De database is al bijgewerkt
+
+        db.voeg_luisteraar_toe(luisteraar)
+
+        db.voeg_teksten_toe(["Een", "Twee", "Drie"])
+        db.voeg_tekst_op_index_toe(2, "Anderhalf")
+        db.wijzig_tekst(4, "Vier")
+        db.move_item(1, 3)
+        db.verwijder_tekst(2)
+        self.assertFalse(db.verwijder_tekst(9))  # Mislukt: geen melding
+        self.assertEqual(
+            meldingen,
+            [
+                ("voeg_in", 1, 3, 3),
+                ("voeg_in", 2, 1, 4),
+                ("wijzig", 4, 1, 4),
+                ("verplaats", 1, 3, 4),
+                ("verwijder", 2, 1, 3),
+            ],
+        )
+
+        meldingen.clear()
+        with self.assertRaises(RuntimeError), db.batch():
+            db.verwijder_tekst(1)
+            raise RuntimeError("afgebroken")
+        self.assertEqual(meldingen, [("verwijder", 1, 1, 2), ("voeg_in", 1, 1, 3)])
+
+        db.verwijder_luisteraar(luisteraar)
+        db.verwijder_luisteraar(luisteraar)  # Niet (meer) geregistreerd: geen fout
+        db.voeg_tekst_toe("Vijf")
+        self.assertEqual(len(meldingen), 2)
+
+    def test_async_database(self):
+        """Test de asyncio-laag: lezen wacht niet op een save, een wijziging wel."""
+        db = TextDatabase(self.test_db_file, create_new=True)
+        db.voeg_teksten_toe(["Item 1", "Item 2"])
+        db.save()
+
+        async def scenario():
+            async_db = await AsyncTextDatabase.open(self.test_db_file)
+            self.assertEqual(len(async_db), 2)
+            self.assertEqual(await async_db.zoek("item"), [1, 2])
+
+            # Houd de save in de executor vast tot `klaar` gezet wordt
+            klaar = threading.Event()
+            save = async_db.db.save
+            async_db.db.save = lambda: klaar.wait() and save()
+            opslaan = asyncio.create_task(async_db.save())
+            await asyncio.sleep(0.01)
+            wijzigen = asyncio.create_task(async_db.wijzig_tekst(1, "Gewijzigd"))
+            self.assertEqual(await asyncio.wait_for(async_db.get_tekst(1), 1), "Item 1")
+            self.assertEqual(await asyncio.wait_for(async_db.preview(2), 1), "Item 2")
+            self.assertFalse(wijzigen.done(), "Een wijziging moet wachten tot de save klaar is")
+
+            klaar.set()
+            self.assertTrue(await opslaan)
+            self.assertTrue(await wijzigen)
+            self.assertEqual(await async_db.get_tekst(1), "Gewijzigd")
+            self.assertEqual(await async_db.voeg_teksten_toe(["Item 3"]), 1)
+            self.assertTrue(await async_db.save())
+            await async_db.close()
+
+            # In lazy-modus lezen get_tekst, teksten en preview het bestand, dus niet op de event loop
+            async with await AsyncTextDatabase.open(self.test_db_file, lazy=True) as lazy_db:
+                threads = set()
+                tekst, begin = lazy_db.db._basis.tekst, lazy_db.db._basis.begin
+                lazy_db.db._basis.tekst = lambda blok: threads.add(threading.get_ident()) or tekst(blok)
+                lazy_db.db._basis.begin = lambda *args: threads.add(threading.get_ident()) or begin(*args)
+                self.assertEqual(await lazy_db.get_tekst(2), "Item 2")
+                self.assertEqual(await lazy_db.teksten(2, 5), ["Item 2", "Item 3"])
+                self.assertEqual(await lazy_db.preview(3), "Item 3")
+                self.assertTrue(threads)
+                self.assertNotIn(threading.get_ident(), threads)
+
+        asyncio.run(scenario())
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), ["Gewijzigd", "Item 2", "Item 3"])
+
+    def test_server(self):
+        """Test de server met een client: lezen, wijzigen, fouten en opslaan bij het stoppen."""
+        db = TextDatabase(self.test_db_file, create_new=True)
+        db.voeg_teksten_toe(["Item 1", "Item 2", "Item 3"])
+        db.save()
+
+        gestart = threading.Event()
+        servers = []
+
+        def bij_start(server):
+            servers.append((asyncio.get_running_loop(), server))
+            gestart.set()
+
+        # Poort 0: het besturingssysteem kiest een vrije poort
+        thread = threading.Thread(
+            target=asyncio.run, args=(tekstdb_server.serveer(self.test_db_file, 0, gestart=bij_start),)
+        )
+        thread.start()
+        self.assertTrue(gestart.wait(10), "De server is niet gestart")
+        lus, server = servers[0]
+        try:
+            with tekstdb_server.TekstDbClient(server.adres, timeout=10) as client:
+                self.assertEqual(len(client), 3)
+                self.assertEqual(client.get_tekst(2), "Item 2")
+                self.assertEqual(client.get_tekst(2), "Item 2")  # nu uit de cache van de server
+                self.assertIsNone(client.get_tekst(9))
+                self.assertEqual(client.teksten(2, 9), ["Item 2", "Item 3"])
+                self.assertEqual(client.zoek("item 3"), [3])
+
+                # Een wijziging maakt de bewaarde antwoorden ongeldig
+                self.assertTrue(client.wijzig_tekst(2, "Gewijzigd"))
+                self.assertEqual(client.get_tekst(2), "Gewijzigd")
+                self.assertTrue(client.apply_operations([("voeg_in", 1, "Nieuw"), ("verwijder", 4)]))
+                self.assertFalse(client.apply_operations([("verwijder", 99)]))
+                with self.assertRaises(tekstdb_server.ServerFout):
+                    client._vraag("bestaat_niet")
+                # Argumenten van het verkeerde type veranderen niets (ook het opslaan bij het stoppen niet)
+                for op, *args in [
+                    ("voeg_tekst_toe", 0),
+                    ("voeg_tekst_op_index_toe", True, "x"),
+                    ("wijzig_tekst", "1", "x"),
+                    ("move_item", 1, 2.5),
+                    ("verwijder_tekst",),
+                    ("voeg_teksten_toe", ["x", None]),
+                    ("apply_operations", [["verwijder", True]]),
+                    ("save", 1),
+                ]:
+                    with self.subTest(op=op), self.assertRaises(tekstdb_server.ServerFout):
+                        client._vraag(op, *args)
+                self.assertEqual(len(client), 3)
+                self.assertEqual(client.teksten(1, 3), ["Nieuw", "Item 1", "Gewijzigd"])
+        finally:
+            lus.call_soon_threadsafe(server.stop)
+            thread.join(10)
+        self.assertFalse(thread.is_alive(), "De server is niet gestopt")
+        # Niet-opgeslagen wijzigingen worden bij het stoppen opgeslagen
+        self.assertEqual(list(TextDatabase(self.test_db_file).data.values()), ["Nieuw", "Item 1", "Gewijzigd"])
+
 
 if __name__ == "__main__":
     # Dit maakt het script uitvoerbaar en start de test runner.
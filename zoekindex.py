@@ -0,0 +1,182 @@
+"""
+Zoekindexen voor de TextDatabase class.
+
+De indexen werken met vaste item-id's in plaats van posities: zo blijft een
+index geldig als items worden ingevoegd, verwijderd of verplaatst, en hoeft
+alleen de tekst van een gewijzigd item opnieuw verwerkt te worden. De database
+vertaalt de id's naar indexnummers (zie `TextDatabase.zoek`).
+"""
+
+import bisect
+import itertools
+import re
+import sys
+from array import array
+
+# Een woord: een aaneengesloten reeks letters, cijfers of underscores.
+WOORD_PATROON = re.compile(r"\w+")
+# De lengte van de stukjes tekst in de trigram-index.
+TRIGRAM_LENGTE = 3
+
+
+def woorden(tekst):
+    """Geeft de verschillende woorden in een tekst terug, hoofdletterongevoelig (casefold)."""
+    return set(WOORD_PATROON.findall(tekst.casefold()))
+
+
+def trigrammen(tekst):
+    """
+    Geeft alle verschillende stukjes van drie tekens in een tekst terug, hoofdletterongevoelig (casefold).
+
+    De tekst wordt eerst genormaliseerd zoals het databasebestand dat doet (regeleinden,
+    witruimte aan begin en eind): een tekst die na het opslaan opnieuw uit het bestand
+    wordt gelezen, levert zo dezelfde trigrammen op. Bevat een tekst een zoekterm, dan
+    bevat de genormaliseerde tekst ook alle trigrammen van de genormaliseerde zoekterm.
+    """
+    if "\r" in tekst:
+        tekst = tekst.replace("\r\n", "\n").replace("\r", "\n")
+    tekst = tekst.strip().casefold()
+    return {tekst[i : i + TRIGRAM_LENGTE] for i in range(len(tekst) - TRIGRAM_LENGTE + 1)}
+
+
+class _Index:
+    """
+    Basis voor een geïnverteerde index: per sleutel de id's van de items waarin hij voorkomt.
+
+    De id's per sleutel staan gesorteerd in een array('I') (4 bytes per vermelding)
+    in plaats van een set, omdat een database met honderdduizenden items al snel
+    miljoenen vermeldingen heeft. Dankzij de sortering kost het verwijderen van een
+    id een binaire zoekactie en één verschuiving in C, ook bij lange lijsten.
+    Subclasses bepalen met `_sleutels` welke sleutels een tekst heeft.
+    """
+
+    def __init__(self):
+        self._vermeldingen = {}
+
+    def _sleutels(self, tekst):
+        raise NotImplementedError
+
+    def _nieuwe_sleutel(self, sleutel):
+        """Wordt aangeroepen als een sleutel voor het eerst in de index komt."""
+
+    def _vervallen_sleutel(self, sleutel):
+        """Wordt aangeroepen als het laatste item met een sleutel uit de index gaat."""
+
+    def voeg_toe(self, item_id, tekst):
+        """Neemt een (nieuwe of gewijzigde) tekst op in de index."""
+        for sleutel in self._sleutels(tekst):
+            ids = self._vermeldingen.get(sleutel)
+            if ids is None:
+                self._vermeldingen[sleutel] = array("I", (item_id,))
+                self._nieuwe_sleutel(sleutel)
+            elif ids[-1] < item_id:
+                ids.append(item_id)  # Het gewone geval: nieuwe items krijgen het hoogste id
+            else:
+                ids.insert(bisect.bisect_left(ids, item_id), item_id)
+
+    def verwijder(self, item_id, tekst):
+        """Haalt een (verwijderde of oude) tekst uit de index."""
+        for sleutel in self._sleutels(tekst):
+            ids = self._vermeldingen.get(sleutel)
+            if ids is None:
+                continue
+            i = bisect.bisect_left(ids, item_id)
+            if i == len(ids) or ids[i] != item_id:
+                continue  # Stond niet in de index
+            del ids[i]
+            if not ids:
+                del self._vermeldingen[sleutel]
+                self._vervallen_sleutel(sleutel)
+
+    @staticmethod
+    def _doorsnede(verzamelingen):
+        """Geeft de id's die in alle verzamelingen voorkomen, te beginnen bij de kleinste."""
+        verzamelingen = sorted(verzamelingen, key=len)
+        gevonden = set(verzamelingen[0])
+        for ids in verzamelingen[1:]:
+            if not gevonden:
+                break
+            gevonden.intersection_update(ids)
+        return gevonden
+
+    def geheugen(self):
+        """Schat het geheugengebruik van de index in bytes: de dict, de sleutels en de arrays."""
+        return sys.getsizeof(self._vermeldingen) + sum(
+            sys.getsizeof(sleutel) + sys.getsizeof(ids) for sleutel, ids in self._vermeldingen.items()
+        )
+
+
+class WoordIndex(_Index):
+    """
+    Index op woorden, voor zoeken op hele woorden of op woordbegin.
+
+    Voor zoeken op woordbegin wordt naast de vermeldingen een gesorteerde lijst van
+    alle woorden bijgehouden.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._gesorteerd = []
+
+    def _sleutels(self, tekst):
+        return woorden(tekst)
+
+    def _nieuwe_sleutel(self, sleutel):
+        bisect.insort(self._gesorteerd, sleutel)
+
+    def _vervallen_sleutel(self, sleutel):
+        del self._gesorteerd[bisect.bisect_left(self._gesorteerd, sleutel)]
+
+    def _met_begin(self, begin):
+        """Geeft de id's van alle items met een woord dat met `begin` begint."""
+        eerste = bisect.bisect_left(self._gesorteerd, begin)
+        gevonden = set()
+        for woord in itertools.islice(self._gesorteerd, eerste, None):
+            if not woord.startswith(begin):
+                break
+            gevonden.update(self._vermeldingen[woord])
+        return gevonden
+
+    def zoek(self, zoekterm, prefix=True):
+        """
+        Geeft de id's van de items die alle woorden uit `zoekterm` bevatten.
+
+        Met `prefix=True` is het genoeg als een woord in de tekst met het gezochte
+        woord begint. Geeft None terug als de zoekterm geen woorden bevat; de index
+        kan de vraag dan niet beantwoorden.
+        """
+        gezocht = woorden(zoekterm)
+        if not gezocht:
+            return None
+        if prefix:
+            return self._doorsnede([self._met_begin(woord) for woord in gezocht])
+        return self._doorsnede([self._vermeldingen.get(woord, ()) for woord in gezocht])
+
+    def geheugen(self):
+        return super().geheugen() + sys.getsizeof(self._gesorteerd)
+
+
+class TrigramIndex(_Index):
+    """
+    Index op stukjes van drie tekens, voor zoeken op een willekeurig stuk tekst.
+
+    Een tekst die de zoekterm bevat, bevat ook alle trigrammen van de zoekterm. De
+    index geeft dus de kandidaten; de database controleert daarna bij elke kandidaat
+    of de zoekterm er echt in staat. Deze index is veel groter dan de woordindex
+    (ruwweg één vermelding per teken tekst), zie `geheugen()`.
+    """
+
+    def _sleutels(self, tekst):
+        return trigrammen(tekst)
+
+    def zoek(self, zoekterm):
+        """
+        Geeft de id's van de items die alle trigrammen van `zoekterm` bevatten.
+
+        Geeft None terug als de zoekterm korter is dan TRIGRAM_LENGTE tekens; de
+        index kan de vraag dan niet beantwoorden.
+        """
+        gezocht = trigrammen(zoekterm)
+        if not gezocht:
+            return None
+        return self._doorsnede([self._vermeldingen.get(trigram, ()) for trigram in gezocht])